@@ -0,0 +1,76 @@
+"""
+Micro-benchmark of cache key construction: the string keys used before versus the frozen keys of machine.cache.
+
+Usage:
+    uv run python -m benchmarks.cache_keys [--number N]
+"""
+
+import argparse
+import hashlib
+import json
+import timeit
+
+from law_mcp.cache import generate_cache_key
+from machine.cache import freeze
+
+# Parameters of service references as they occur in the laws
+PARAMETERS = {
+    "BSN only": {"BSN": "999993653"},
+    "BSN and year": {"BSN": "999993653", "JAAR": 2025, "KVK_NUMMER": None},
+    "household": {
+        "BSN": "999993653",
+        "BSNS": ["999993653", "999993654", "999993655"],
+        "HUISHOUDEN": {"partner": "999993654", "kinderen": ["999993655"]},
+    },
+}
+
+
+def string_key(path: str, parameters: dict, reference_date: str) -> str:
+    """The key RuleContext._resolve_from_service used to build"""
+
+    def param_to_str(v):
+        if isinstance(v, list | dict):
+            return str(v)
+        return v
+
+    return f"{path}({','.join([f'{k}:{param_to_str(v)}' for k, v in sorted(parameters.items())])},{reference_date})"
+
+
+def frozen_key(path: str, parameters: dict, reference_date: str) -> tuple:
+    """The key RuleContext._resolve_from_service builds now"""
+    return path, freeze(parameters), reference_date
+
+
+def md5_key(prefix: str, **kwargs) -> str:
+    """The key law_mcp.cache.generate_cache_key used to build"""
+    key_data = f"{prefix}:{json.dumps(sorted(kwargs.items()), sort_keys=True)}"
+    return hashlib.md5(key_data.encode()).hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000, help="Number of keys to build per measurement")
+    args = parser.parse_args()
+
+    print(f"{'key':<40} {'before (ns)':>12} {'after (ns)':>12} {'speedup':>8}")
+    for name, parameters in PARAMETERS.items():
+        candidates = {
+            f"service reference, {name}": (
+                lambda p=parameters: string_key("INKOMEN", p, "2025-01-01"),
+                lambda p=parameters: frozen_key("INKOMEN", p, "2025-01-01"),
+            ),
+            f"law_mcp execution, {name}": (
+                lambda p=parameters: md5_key("law_execution", parameters=p, service="TOESLAGEN", law="zorgtoeslagwet"),
+                lambda p=parameters: generate_cache_key(
+                    "law_execution", parameters=p, service="TOESLAGEN", law="zorgtoeslagwet"
+                ),
+            ),
+        }
+        for label, (before, after) in candidates.items():
+            before_ns = min(timeit.repeat(before, number=args.number, repeat=3)) / args.number * 1e9
+            after_ns = min(timeit.repeat(after, number=args.number, repeat=3)) / args.number * 1e9
+            print(f"{label:<40} {before_ns:>12.0f} {after_ns:>12.0f} {before_ns / after_ns:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
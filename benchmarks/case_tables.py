@@ -0,0 +1,78 @@
+"""
+Benchmark the "cases" source table: evaluating the Rotterdam geluidsontheffing, which counts the approved
+ontheffingen of a company this year, with a growing history of decided cases. Evaluations are timed on an
+unchanged table, and right after a new case, as in the web app where a decision is followed by an evaluation.
+
+Usage:
+    uv run python -m benchmarks.case_tables [--history 100 1000 10000] [--repeat N]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+import pandas as pd
+
+from .common import create_services, quiet_logging, timed
+
+SERVICE = "GEMEENTE_ROTTERDAM"
+LAW = "algemene_plaatselijke_verordening/ontheffingspas_geluid"
+COMPANIES = 50
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, nargs="+", default=[100, 1000, 10000], help="Numbers of cases")
+    parser.add_argument("--repeat", type=int, default=20, help="Evaluations to time per history size")
+    args = parser.parse_args()
+
+    quiet_logging()
+    # Cases count for the year they were created in, so evaluate as of today
+    today = date.today()
+    services = create_services(today.isoformat())
+    parameters = {
+        "KVK_NUMMER": "10000000",
+        "ACTIVITEITSDATUM": (today + timedelta(days=7)).isoformat(),
+        "ACTIVITEITSSTARTTIJD": "20:00",
+    }
+    services.set_source_dataframe(
+        SERVICE, "geluidsklachten", pd.DataFrame([{"kvk_nummer": "10000000", "heeft_actieve_klachten": False}])
+    )
+    # The company is active, without needing the KVK registry
+    overwrite_input = {"KVK": {"status": "Actief"}}
+
+    def evaluate() -> None:
+        for _ in range(args.repeat):
+            services.evaluate(SERVICE, LAW, parameters, overwrite_input=overwrite_input, trace=False)
+
+    seeded = 0
+
+    def seed(count: int) -> None:
+        nonlocal seeded
+        for i in range(seeded, seeded + count):
+            services.case_manager.seed_historical_case(
+                bsn=f"{100000000 + i:09d}",
+                service_type=SERVICE,
+                law=LAW,
+                parameters={"KVK_NUMMER": f"{10000000 + i % COMPANIES}", "ACTIVITEITSDATUM": today.isoformat()},
+                result={"ontheffing_verleend": True},
+            )
+        seeded += count
+
+    def seed_and_evaluate() -> None:
+        for _ in range(args.repeat):
+            seed(1)
+            services.evaluate(SERVICE, LAW, parameters, overwrite_input=overwrite_input, trace=False)
+
+    print(f"{'cases':>8} {'per evaluation (ms)':>21} {'per case and evaluation (ms)':>30}")
+    for history in sorted(args.history):
+        seed(history - seeded)
+        # The first evaluation after new cases builds the index
+        result = services.evaluate(SERVICE, LAW, parameters, overwrite_input=overwrite_input, trace=False)
+        assert result.requirements_met == (history // COMPANIES < 12)
+        evaluation = timed(evaluate) / args.repeat
+        write_and_evaluation = timed(seed_and_evaluate) / args.repeat
+        print(f"{history:>8} {evaluation * 1000:>21.2f} {write_and_evaluation * 1000:>30.2f}")
+
+
+if __name__ == "__main__":
+    main()
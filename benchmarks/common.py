@@ -0,0 +1,94 @@
+"""
+Shared setup for the benchmarks: a Services instance with a synthetic population.
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+
+from machine.service import Services
+
+# Laws that can be evaluated for the synthetic population below
+LAWS = [
+    ("TOESLAGEN", "zorgtoeslagwet"),
+    ("TOESLAGEN", "wet_op_de_huurtoeslag"),
+    ("BELASTINGDIENST", "wet_inkomstenbelasting"),
+    ("SVB", "algemene_ouderdomswet"),
+    ("KIESRAAD", "kieswet"),
+    ("GEMEENTE_AMSTERDAM", "participatiewet/bijstand"),
+]
+
+
+def create_services(reference_date: str = "2025-02-01", event_store: str | Path | None = None) -> Services:
+    """Create a Services instance, clearing the eventsourcing topic cache so this can be done repeatedly"""
+    import eventsourcing.utils
+
+    eventsourcing.utils.clear_topic_cache()
+    eventsourcing.utils._type_cache.clear()
+    return Services(reference_date, event_store=event_store)
+
+
+def population(size: int) -> list[str]:
+    """BSNs of a synthetic population"""
+    return [f"{100000000 + i:09d}" for i in range(size)]
+
+
+def load_population(services: Services, bsns: list[str]) -> None:
+    """Register source tables for a population of single citizens with varying incomes and ages"""
+    rows: dict[tuple[str, str], list[dict]] = {}
+
+    def add(service: str, table: str, row: dict) -> None:
+        rows.setdefault((service, table), []).append(row)
+
+    for i, bsn in enumerate(bsns):
+        add(
+            "RvIG",
+            "personen",
+            {
+                "bsn": bsn,
+                "geboortedatum": f"{1940 + i % 60}-01-01",
+                "verblijfsadres": "Amsterdam",
+                "land_verblijf": "NEDERLAND",
+            },
+        )
+        add("RvIG", "relaties", {"bsn": bsn, "partnerschap_type": "GEEN", "partner_bsn": None})
+        add("RVZ", "verzekeringen", {"bsn": bsn, "polis_status": "ACTIEF"})
+        add(
+            "BELASTINGDIENST",
+            "box1",
+            {
+                "bsn": bsn,
+                "loon_uit_dienstbetrekking": 10000 + (i * 1500) % 60000,
+                "uitkeringen_en_pensioenen": 0,
+                "winst_uit_onderneming": 0,
+                "resultaat_overige_werkzaamheden": 0,
+                "eigen_woning": 0,
+            },
+        )
+        add("BELASTINGDIENST", "box2", {"bsn": bsn, "reguliere_voordelen": 0, "vervreemdingsvoordelen": 0})
+        add(
+            "BELASTINGDIENST",
+            "box3",
+            {"bsn": bsn, "spaargeld": (i * 2500) % 40000, "beleggingen": 0, "onroerend_goed": 0, "schulden": 0},
+        )
+
+    for (service, table), table_rows in rows.items():
+        services.set_source_dataframe(service, table, pd.DataFrame(table_rows))
+
+
+def quiet_logging() -> None:
+    """The engine logs a warning for every unresolved value, which would dominate the timings"""
+    logging.disable(logging.WARNING)
+
+
+def timed(fn: Callable[[], object], repeat: int = 1) -> float:
+    """Best wall clock time of fn over repeat runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,50 @@
+"""
+Benchmark evaluating a law for a population with one evaluate_many call versus an evaluate call per citizen.
+
+Usage:
+    uv run python -m benchmarks.evaluate_many [--citizens N] [--repeat N]
+"""
+
+import argparse
+
+from .common import LAWS, create_services, load_population, population, quiet_logging, timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--citizens", type=int, default=200, help="Number of citizens to evaluate")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per mode, the best run counts")
+    args = parser.parse_args()
+
+    quiet_logging()
+    services = create_services()
+    bsns = population(args.citizens)
+    load_population(services, bsns)
+    parameters_list = [{"BSN": bsn} for bsn in bsns]
+    cache = services.service_reference_cache
+
+    print(f"{'law':<50} {'evaluate (ms)':>14} {'evaluate_many (ms)':>19} {'speedup':>8}")
+    for service, law in LAWS:
+        # Warm up, so compiling the law is not part of the timing
+        services.evaluate(service, law, parameters_list[0], trace=False)
+
+        def single(service: str = service, law: str = law) -> None:
+            for parameters in parameters_list:
+                services.evaluate(service, law, parameters, trace=False)
+
+        def batch(service: str = service, law: str = law) -> None:
+            services.evaluate_many(service, law, parameters_list)
+
+        timings = {}
+        for name, run in (("single", single), ("batch", batch)):
+            # Both start without cached service references
+            timings[name] = timed(lambda run=run: (cache.clear(), run()), args.repeat)
+
+        print(
+            f"{service + '.' + law:<50} {timings['single'] / len(bsns) * 1000:>14.3f} "
+            f"{timings['batch'] / len(bsns) * 1000:>19.3f} {timings['single'] / timings['batch']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark rebuilding the case and claim indexes of an application that starts on an SQLite event store, streaming the
+notification log once versus loading every aggregate from the recorder after reading the log.
+
+Usage:
+    uv run python -m benchmarks.index_rebuild [--cases N] [--page-size 1000 10000] [--repeat N]
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from eventsourcing.application import Application
+
+from .common import create_services, population, quiet_logging, timed
+
+SERVICE = "GEMEENTE_ROTTERDAM"
+LAW = "algemene_plaatselijke_verordening/ontheffingspas_geluid"
+
+
+def fill(event_store: Path, cases: int) -> None:
+    """Record an objected case and a claim for every citizen of a population"""
+    services = create_services(event_store=event_store)
+    bsns = population(cases)
+    for bsn in bsns:
+        case_id = services.case_manager.seed_historical_case(bsn, SERVICE, LAW, {"BSN": bsn}, {"ontheffing": True})
+        services.case_manager.objection_case(case_id, "Bezwaar")
+    services.claim_manager.submit_claims_bulk(
+        [
+            {
+                "service": "TOESLAGEN",
+                "key": "INKOMEN",
+                "new_value": 30000,
+                "reason": "Nieuwe baan",
+                "claimant": "BURGER",
+                "law": "zorgtoeslagwet",
+                "bsn": bsn,
+            }
+            for bsn in bsns
+        ],
+        auto_approve=True,
+    )
+    services.runner.stop()
+
+
+def load_each(app: Application, page_size: int) -> int:
+    """The aggregates in the notification log, each loaded from the recorder on its own"""
+    aggregate_ids = {}
+    position = 0
+    while True:
+        page = app.recorder.select_notifications(position, page_size, inclusive_of_start=False)
+        aggregate_ids.update(dict.fromkeys(notification.originator_id for notification in page))
+        if len(page) < page_size:
+            break
+        position = page[-1].id
+    for aggregate_id in aggregate_ids:
+        app.repository.get(aggregate_id)
+    return len(aggregate_ids)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=5000, help="Cases and claims in the event store")
+    parser.add_argument("--page-size", type=int, nargs="+", default=[1000, 10000], help="Notifications per page")
+    parser.add_argument("--repeat", type=int, default=3, help="Rebuilds to time per page size")
+    args = parser.parse_args()
+
+    quiet_logging()
+    with tempfile.TemporaryDirectory() as directory:
+        event_store = Path(directory)
+        fill(event_store, args.cases)
+        services = create_services(event_store=event_store)
+        apps = {"cases": services.case_manager, "claims": services.claim_manager}
+
+        print(f"{'page size':>10} {'application':>12} {'load each (s)':>14} {'rebuild (s)':>12}")
+        for page_size in args.page_size:
+            for name, app in apps.items():
+                load_each_time = timed(lambda app=app: load_each(app, page_size), args.repeat)
+                rebuild_time = timed(lambda app=app: app.rebuild_indexes(page_size), args.repeat)
+                print(f"{page_size:>10} {name:>12} {load_each_time:>14.3f} {rebuild_time:>12.3f}")
+        services.runner.stop()
+
+
+if __name__ == "__main__":
+    main()
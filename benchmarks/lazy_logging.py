@@ -0,0 +1,77 @@
+"""
+Benchmark the engine's debug logging while debug is disabled: the lazy IndentLogger, which skips formatting,
+the indentation and its blocks, versus formatting every message as before.
+
+Usage:
+    uv run python -m benchmarks.lazy_logging [--citizens N] [--repeat N]
+"""
+
+import argparse
+from contextlib import contextmanager
+
+import machine.context
+import machine.service
+from machine.logging_config import GlobalIndent, IndentLogger
+
+from .common import LAWS, create_services, load_population, population, quiet_logging, timed
+
+
+class EagerIndentLogger(IndentLogger):
+    """The logger before lazy logging: every message and its indentation are formatted, blocks are entered"""
+
+    def _log(self, level: int, msg, args: tuple, kwargs: dict) -> None:
+        if callable(msg):
+            msg = msg()
+        message = f"{self.indent}{msg}"
+        if args:
+            message = message % args
+        self._logger.log(level, message, **kwargs)
+
+    def indent_block(self, initial_message=None, double_line: bool = False):
+        return self._indent_block(initial_message, double_line)
+
+
+@contextmanager
+def eager_logging():
+    loggers = [machine.context.logger, machine.service.logger]
+    for logger in loggers:
+        logger.__class__ = EagerIndentLogger
+    try:
+        yield
+    finally:
+        for logger in loggers:
+            logger.__class__ = IndentLogger
+        assert GlobalIndent.get_level() == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--citizens", type=int, default=50, help="Number of citizens to evaluate")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per mode, the best run counts")
+    args = parser.parse_args()
+
+    quiet_logging()
+    services = create_services()
+    bsns = population(args.citizens)
+    load_population(services, bsns)
+    cache = services.service_reference_cache
+
+    print(f"{'law':<50} {'eager (ms)':>11} {'lazy (ms)':>10} {'saved (ms)':>11}")
+    for service, law in LAWS:
+        # Warm up, so compiling the law is not part of the timing
+        services.evaluate(service, law, {"BSN": bsns[0]}, trace=False)
+
+        def run(service: str = service, law: str = law) -> None:
+            # Without cached service references, so the referenced laws are evaluated as well
+            cache.clear()
+            for bsn in bsns:
+                services.evaluate(service, law, {"BSN": bsn}, trace=False)
+
+        with eager_logging():
+            eager = timed(run, args.repeat) / len(bsns) * 1000
+        lazy = timed(run, args.repeat) / len(bsns) * 1000
+        print(f"{service + '.' + law:<50} {eager:>11.3f} {lazy:>10.3f} {eager - lazy:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark the service reference cache on the dashboard flow: sorting all discoverable laws by impact per citizen.
+
+Usage:
+    uv run python -m benchmarks.service_reference_cache [--citizens N]
+"""
+
+import argparse
+
+from .common import create_services, load_population, population, quiet_logging, timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--citizens", type=int, default=20, help="Number of citizens to evaluate")
+    args = parser.parse_args()
+
+    quiet_logging()
+    services = create_services()
+    bsns = population(args.citizens)
+    load_population(services, bsns)
+    cache = services.service_reference_cache
+    maxsize = cache.maxsize
+
+    def run() -> None:
+        for bsn in bsns:
+            services.get_sorted_discoverable_service_laws(bsn)
+
+    # Warm up, so compiling the laws is not part of the timing
+    services.get_sorted_discoverable_service_laws(bsns[0])
+
+    timings = {}
+    for enabled in (False, True):
+        cache.clear()
+        cache.hits = cache.misses = 0
+        cache.maxsize = maxsize if enabled else 0
+        services._impact_cache = {}
+        timings[enabled] = timed(run)
+
+    print(f"{'cache':<10} {'per citizen (ms)':>18}")
+    for enabled, label in ((False, "disabled"), (True, "enabled")):
+        print(f"{label:<10} {timings[enabled] / len(bsns) * 1000:>18.2f}")
+    print(
+        f"speedup {timings[False] / timings[True]:.2f}x, hit rate {cache.hits / max(cache.hits + cache.misses, 1):.0%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark loading a case with a growing number of events, replaying all its events versus starting from its latest
+snapshot. The case goes through rounds of objection and decision, two events per round.
+
+Usage:
+    uv run python -m benchmarks.snapshots [--events 10 100 1000] [--interval N] [--repeat N]
+"""
+
+import argparse
+import os
+import time
+
+from .common import create_services, quiet_logging, timed
+
+SERVICE = "GEMEENTE_ROTTERDAM"
+LAW = "algemene_plaatselijke_verordening/ontheffingspas_geluid"
+BSN = "999993653"
+
+
+def run(interval: int, events: list[int], repeat: int) -> dict[int, tuple[float, float]]:
+    """The time to add the events and to load the case, by number of events"""
+    os.environ["SNAPSHOTTING_INTERVAL"] = str(interval)
+    try:
+        services = create_services()
+    finally:
+        del os.environ["SNAPSHOTTING_INTERVAL"]
+    case_manager = services.case_manager
+    case_id = case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing_verleend": True})
+
+    timings = {}
+    for count in sorted(events):
+        start = time.perf_counter()
+        while case_manager.get_case_by_id(case_id).version < count:
+            case_manager.objection_case(case_id, "Bezwaar")
+            case_manager.complete_manual_review(case_id, "BEOORDELAAR", approved=True, reason="Toegekend")
+        added = time.perf_counter() - start
+
+        def load() -> None:
+            for _ in range(repeat):
+                case_manager.get_case_by_id(case_id)
+
+        timings[count] = (added, timed(load) / repeat)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, nargs="+", default=[10, 100, 1000], help="Numbers of events")
+    parser.add_argument("--interval", type=int, default=50, help="Snapshotting interval")
+    parser.add_argument("--repeat", type=int, default=20, help="Loads to time per number of events")
+    args = parser.parse_args()
+
+    quiet_logging()
+    replay = run(0, args.events, args.repeat)
+    snapshots = run(args.interval, args.events, args.repeat)
+
+    print(
+        f"{'events':>8} {'add, replay (s)':>16} {'add, snapshots (s)':>19} "
+        f"{'load, replay (ms)':>18} {'load, snapshots (ms)':>21}"
+    )
+    for count in sorted(args.events):
+        print(
+            f"{count:>8} {replay[count][0]:>16.2f} {snapshots[count][0]:>19.2f} "
+            f"{replay[count][1] * 1000:>18.3f} {snapshots[count][1] * 1000:>21.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
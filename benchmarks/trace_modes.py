@@ -0,0 +1,58 @@
+"""
+Benchmark traced versus trace-free evaluation of the existing laws.
+
+Usage:
+    uv run python -m benchmarks.trace_modes [--citizens N] [--repeat N]
+"""
+
+import argparse
+
+from .common import LAWS, create_services, load_population, population, quiet_logging, timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--citizens", type=int, default=50, help="Number of citizens to evaluate")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per mode, the best run counts")
+    args = parser.parse_args()
+
+    quiet_logging()
+    services = create_services()
+    bsns = population(args.citizens)
+    load_population(services, bsns)
+
+    print(f"{'law':<50} {'trace (ms)':>12} {'no trace (ms)':>14} {'speedup':>8}")
+    totals = {True: 0.0, False: 0.0}
+    for service, law in LAWS:
+        timings = {}
+        for trace in (True, False):
+            outputs = []
+
+            def run(trace: bool = trace, outputs: list = outputs) -> None:
+                outputs.clear()
+                for bsn in bsns:
+                    outputs.append(services.evaluate(service, law, {"BSN": bsn}, trace=trace).output)
+
+            # Warm up, so compiling the law is not part of the timing
+            services.evaluate(service, law, {"BSN": bsns[0]}, trace=trace)
+            timings[trace] = timed(run, args.repeat)
+            totals[trace] += timings[trace]
+            if trace:
+                traced_outputs = list(outputs)
+            elif outputs != traced_outputs:
+                raise AssertionError(f"Outputs of {service}.{law} differ between the trace modes")
+
+        per_citizen = {trace: timings[trace] / len(bsns) * 1000 for trace in timings}
+        print(
+            f"{service + '.' + law:<50} {per_citizen[True]:>12.2f} {per_citizen[False]:>14.2f} "
+            f"{timings[True] / timings[False]:>7.2f}x"
+        )
+
+    print(
+        f"{'total':<50} {totals[True] / len(bsns) * 1000:>12.2f} {totals[False] / len(bsns) * 1000:>14.2f} "
+        f"{totals[True] / totals[False]:>7.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
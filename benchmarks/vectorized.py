@@ -0,0 +1,49 @@
+"""
+Benchmark evaluating a law for a population on columns (evaluate_many with vectorized) versus row by row.
+
+Usage:
+    uv run python -m benchmarks.vectorized [--citizens N] [--repeat N]
+"""
+
+import argparse
+
+from .common import LAWS, create_services, load_population, population, quiet_logging, timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--citizens", type=int, default=1000, help="Number of citizens to evaluate")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per mode, the best run counts")
+    args = parser.parse_args()
+
+    quiet_logging()
+    services = create_services()
+    bsns = population(args.citizens)
+    load_population(services, bsns)
+    parameters_list = [{"BSN": bsn} for bsn in bsns]
+    cache = services.service_reference_cache
+
+    print(f"{'law':<50} {'row by row (ms)':>16} {'vectorized (ms)':>16} {'speedup':>8}")
+    for service, law in LAWS:
+        # Warm up, so compiling the law is not part of the timing
+        services.evaluate(service, law, parameters_list[0], trace=False)
+
+        def rows(service: str = service, law: str = law) -> None:
+            services.evaluate_many(service, law, parameters_list)
+
+        def vectorized(service: str = service, law: str = law) -> None:
+            services.evaluate_many(service, law, parameters_list, vectorized=True)
+
+        timings = {}
+        for name, run in (("rows", rows), ("vectorized", vectorized)):
+            # Both start without cached service references
+            timings[name] = timed(lambda run=run: (cache.clear(), run()), args.repeat)
+
+        print(
+            f"{service + '.' + law:<50} {timings['rows'] / len(bsns) * 1000:>16.3f} "
+            f"{timings['vectorized'] / len(bsns) * 1000:>16.3f} {timings['rows'] / timings['vectorized']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,14 @@ Provides in-memory caching with TTL to improve performance.
 """
 
 import asyncio
-import hashlib
-import json
 import logging
 import time
+from collections.abc import Hashable
 from dataclasses import dataclass
 from typing import Any
 
+from machine.cache import freeze
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,10 +32,10 @@ class TTLCache:
 
     def __init__(self, default_ttl: int = 300):  # 5 minutes default
         self.default_ttl = default_ttl
-        self._cache: dict[str, CacheEntry] = {}
+        self._cache: dict[Hashable, CacheEntry] = {}
         self._lock = asyncio.Lock()
 
-    async def get(self, key: str) -> Any | None:
+    async def get(self, key: Hashable) -> Any | None:
         """Get value from cache if not expired"""
         async with self._lock:
             entry = self._cache.get(key)
@@ -49,7 +50,7 @@ class TTLCache:
                 logger.debug(f"Cache miss for key: {key}")
             return None
 
-    async def set(self, key: str, value: Any, ttl: int | None = None) -> None:
+    async def set(self, key: Hashable, value: Any, ttl: int | None = None) -> None:
         """Set value in cache with TTL"""
         ttl = ttl or self.default_ttl
         expires_at = time.time() + ttl
@@ -74,12 +75,9 @@ class TTLCache:
             return len(expired_keys)
 
 
-def generate_cache_key(prefix: str, **kwargs) -> str:
+def generate_cache_key(prefix: str, **kwargs) -> Hashable:
     """Generate a consistent cache key from parameters"""
-    # Sort kwargs for consistent key generation
-    sorted_kwargs = sorted(kwargs.items())
-    key_data = f"{prefix}:{json.dumps(sorted_kwargs, sort_keys=True)}"
-    return hashlib.md5(key_data.encode()).hexdigest()
+    return prefix, freeze(kwargs)
 
 
 # Global cache instance
@@ -0,0 +1,175 @@
+import threading
+from collections import OrderedDict, defaultdict
+from collections.abc import Hashable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+
+def freeze(value: Any) -> Hashable:
+    """
+    Canonical hashable form of a value, for use in cache keys.
+
+    Dicts become a frozenset of their (frozen) items, lists and tuples become tuples and sets
+    become frozensets, recursively. Equal values give equal keys regardless of the insertion
+    order of dicts. Other hashable values are paired with their type, so True, 1 and 1.0 give
+    different keys. Values that can't be frozen exactly, like DataFrames, raise TypeError.
+    """
+    if isinstance(value, str) or value is None:
+        return value
+    if isinstance(value, dict):
+        items = value.items()
+        # Fast path for the common case of a dict of strings and None, which freeze to themselves
+        if all(type(k) is str and (type(v) is str or v is None) for k, v in items):
+            return dict, frozenset(items)
+        return dict, frozenset((freeze(k), freeze(v)) for k, v in items)
+    if isinstance(value, list | tuple):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, set | frozenset):
+        return frozenset(freeze(v) for v in value)
+    try:
+        hash(value)
+    except (TypeError, NotImplementedError):
+        # Some types, like event sourced aggregates, refuse to be hashed this way
+        raise TypeError(f"Can't freeze a {type(value).__name__} into a cache key") from None
+    return type(value), value
+
+
+def service_reference_key(
+    service: str,
+    law: str,
+    field: str,
+    parameters: dict[str, Any],
+    reference_date: str | None,
+    approved: bool | None,
+    overwrite_input: dict[str, Any] | None,
+) -> tuple:
+    """Cache key for the result of a service reference. Raises TypeError for parameters that can't be frozen."""
+    return (
+        service,
+        law,
+        field,
+        freeze(parameters),
+        reference_date,
+        approved,
+        freeze(overwrite_input) if overwrite_input else None,
+    )
+
+
+class ServiceReferenceCache:
+    """
+    LRU cache of service reference results, shared by all evaluations of a Services instance.
+
+    Every entry carries the tags of the data it was computed from, e.g. ("bsn", bsn) for the
+    claims of a citizen or ("cases", service, law) for the decided cases of a law. Changing
+    that data invalidates the tag, which evicts only the entries that depend on it.
+
+    Values are computed on other threads than the one that changes the data. A value whose
+    computation started before one of its tags was invalidated may have read the old data, so
+    put drops it when it is given the generation the computation started in.
+    """
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, frozenset]] = OrderedDict()
+        self._keys_by_tag: dict[Hashable, set[Hashable]] = defaultdict(set)
+        self._lock = threading.RLock()
+        # Tags collected by the computations in progress, per thread
+        self._local = threading.local()
+        # Incremented by every invalidation and clear; the generation of the last invalidation of a tag and clear
+        self._generation = 0
+        self._invalidated: dict[Hashable, int] = {}
+        self._cleared = -1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def _recordings(self) -> list[set]:
+        recordings = getattr(self._local, "recordings", None)
+        if recordings is None:
+            recordings = self._local.recordings = []
+        return recordings
+
+    def get(self, key: Hashable) -> Any | None:
+        """Get the cached value for key, or None. The computation in progress inherits its tags."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        value, tags = entry
+        if self._recordings:
+            self._recordings[-1].update(tags)
+        return value
+
+    @contextmanager
+    def recording(self) -> Iterator[set]:
+        """Collect the tags of a computation; nested computations add theirs to the enclosing one"""
+        tags: set = set()
+        recordings = self._recordings
+        recordings.append(tags)
+        try:
+            yield tags
+        finally:
+            recordings.pop()
+            if recordings:
+                recordings[-1].update(tags)
+
+    def depends_on(self, tag: Hashable) -> None:
+        """Record that the computation in progress depends on the data tagged with tag"""
+        if self._recordings:
+            self._recordings[-1].add(tag)
+
+    @property
+    def generation(self) -> int:
+        """The current generation, to pass to put for a value computed from the data as of now"""
+        return self._generation
+
+    def put(self, key: Hashable, value: Any, tags: Iterable[Hashable] = (), generation: int | None = None) -> None:
+        """
+        Cache value for key, evicting the least recently used entries when full. A value computed since
+        generation is dropped when one of its tags was invalidated, or the cache cleared, in the meantime.
+        """
+        tags = frozenset(tags)
+        with self._lock:
+            if generation is not None and (
+                self._cleared >= generation or any(self._invalidated.get(tag, -1) >= generation for tag in tags)
+            ):
+                return
+            self._remove(key)
+            self._entries[key] = (value, tags)
+            for tag in tags:
+                self._keys_by_tag[tag].add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tag: Hashable) -> None:
+        """Evict all entries that depend on the data tagged with tag"""
+        with self._lock:
+            self._invalidated[tag] = self._generation
+            self._generation += 1
+            for key in self._keys_by_tag.pop(tag, ()):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cleared = self._generation
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
@@ -1,4 +1,5 @@
 import logging
+from contextlib import nullcontext
 from copy import copy
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -7,8 +8,9 @@ from typing import Any
 import numpy as np
 import pandas as pd
 
-from machine.events.claim.aggregate import Claim
+from machine.cache import freeze, service_reference_key
 from machine.logging_config import IndentLogger
+from machine.source_index import SourceIndex
 
 logger = IndentLogger(logging.getLogger("service"))
 
@@ -122,6 +124,43 @@ class PathNode:
     children: list["PathNode"] = field(default_factory=list)
 
 
+class _DiscardingDict(dict):
+    """Dict that ignores writes, used as the details of UNTRACED"""
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        pass
+
+    def update(self, *args, **kwargs) -> None:
+        pass
+
+
+class _DiscardingList(list):
+    """List that ignores appends, used as the children of UNTRACED"""
+
+    def append(self, item: Any) -> None:
+        pass
+
+
+class _UntracedNode:
+    """Shared stand-in for a PathNode when evaluating without trace: everything written to it is dropped"""
+
+    __slots__ = ()
+
+    type = "untraced"
+    name = ""
+    result = None
+    resolve_type = None
+    required = False
+    details = _DiscardingDict()
+    children = _DiscardingList()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+UNTRACED: Any = _UntracedNode()
+
+
 @dataclass
 class RuleContext:
     """Context for rule evaluation"""
@@ -132,9 +171,10 @@ class RuleContext:
     property_specs: dict[str, dict[str, Any]]
     output_specs: dict[str, TypeSpec]
     sources: dict[str, pd.DataFrame]
+    source_indexes: dict[str, SourceIndex] = field(default_factory=dict)
     local: dict[str, Any] = field(default_factory=dict)
     accessed_paths: set[str] = field(default_factory=set)
-    values_cache: dict[str, Any] = field(default_factory=dict)
+    values_cache: dict[tuple, Any] = field(default_factory=dict)
     path: list[PathNode] = field(default_factory=list)
     overwrite_input: dict[str, Any] = field(default_factory=dict)
     overwrite_definitions: dict[str, Any] = field(default_factory=dict)
@@ -142,9 +182,10 @@ class RuleContext:
     calculation_date: str | None = None
     resolved_paths: dict[str, Any] = field(default_factory=dict)
     service_name: str | None = None
-    claims: dict[str:Claim] = None
+    claims: dict[str, Any] = None  # new values of the claims by key
     approved: bool | None = True
     missing_required: bool | None = False
+    trace: bool = True
 
     def track_access(self, path: str) -> None:
         """Track accessed data paths"""
@@ -152,33 +193,39 @@ class RuleContext:
 
     def add_to_path(self, node: PathNode) -> None:
         """Add node to evaluation path"""
+        if not self.trace:
+            return
         if self.path:
             self.path[-1].children.append(node)
         self.path.append(node)
 
     def pop_path(self) -> None:
         """Remove last node from path"""
-        if self.path:
+        if self.trace and self.path:
             self.path.pop()
 
     def resolve_value(self, path: str) -> Any:
         value = self._resolve_value(path)
-        if isinstance(path, str):
+        if self.trace and isinstance(path, str):
             self.resolved_paths[path] = value
         return value
 
     def _resolve_value(self, path: str) -> Any:
         """Resolve a value from definitions, services, or sources"""
-        node = PathNode(
-            type="resolve",
-            name=f"Resolving value: {path}",
-            result=None,
-            details={"path": path},
+        node = (
+            PathNode(
+                type="resolve",
+                name=f"Resolving value: {path}",
+                result=None,
+                details={"path": path},
+            )
+            if self.trace
+            else UNTRACED
         )
         self.add_to_path(node)
 
         try:
-            with logger.indent_block(f"Resolving {path}"):
+            with logger.indent_block(lambda: f"Resolving {path}"):
                 # Recursively resolve arrays
                 if isinstance(path, list):
                     resolved = [self.resolve_value(item) for item in path]
@@ -201,7 +248,7 @@ class RuleContext:
                 # Resolve dates
                 value = self._resolve_date(path)
                 if value is not None:
-                    logger.debug(f"Resolved date ${path}: {value}")
+                    logger.debug("Resolved date $%s: %s", path, value)
                     node.result = value
                     return value
 
@@ -227,15 +274,14 @@ class RuleContext:
                             node.result = None
                             return None
 
-                    logger.debug(f"Resolved value ${path}: {value}")
+                    logger.debug("Resolved value $%s: %s", path, value)
                     node.result = value
                     return value
 
                 # Claims first
                 if isinstance(self.claims, dict) and path in self.claims:
-                    claim = self.claims.get(path)
-                    value = claim.new_value
-                    logger.debug(f"Resolving from CLAIM: {value}")
+                    value = self.claims[path]
+                    logger.debug("Resolving from CLAIM: %s", value)
 
                     # Coerce claim values to match the expected type from the spec
                     if path in self.property_specs:
@@ -258,37 +304,25 @@ class RuleContext:
 
                 # Check local scope
                 if path in self.local:
-                    logger.debug(f"Resolving from LOCAL: {self.local[path]}")
+                    logger.debug("Resolving from LOCAL: %s", self.local[path])
                     node.result = self.local[path]
                     node.resolve_type = "LOCAL"
                     return self.local[path]
 
                 # Check overwrite_definitions BEFORE regular definitions
                 if path in self.overwrite_definitions:
-                    logger.debug(f"Resolving from OVERRIDE DEFINITION: {self.overwrite_definitions[path]}")
+                    logger.debug("Resolving from OVERRIDE DEFINITION: %s", self.overwrite_definitions[path])
                     node.result = self.overwrite_definitions[path]
                     node.resolve_type = "OVERRIDE_DEFINITION"
                     return self.overwrite_definitions[path]
 
-                # Check definitions
+                # Check definitions (already unwrapped from their legal_basis by the engine)
                 if path in self.definitions:
                     definition_value = self.definitions[path]
-                    # If definition contains both 'value' and 'legal_basis', extract only the value
-                    if (
-                        isinstance(definition_value, dict)
-                        and "value" in definition_value
-                        and "legal_basis" in definition_value
-                    ):
-                        actual_value = definition_value["value"]
-                        logger.debug(f"Resolving from DEFINITION (extracted value): {actual_value}")
-                        node.result = actual_value
-                        node.resolve_type = "DEFINITION"
-                        return actual_value
-                    else:
-                        logger.debug(f"Resolving from DEFINITION: {definition_value}")
-                        node.result = definition_value
-                        node.resolve_type = "DEFINITION"
-                        return definition_value
+                    logger.debug("Resolving from DEFINITION: %s", definition_value)
+                    node.result = definition_value
+                    node.resolve_type = "DEFINITION"
+                    return definition_value
 
                 # Check parameters
                 if path in self.parameters:
@@ -300,7 +334,7 @@ class RuleContext:
                         spec = self.property_specs[path]
                         value = self._coerce_claim_value(value, spec)
 
-                    logger.debug(f"Resolving from PARAMETERS: {value}")
+                    logger.debug("Resolving from PARAMETERS: %s", value)
                     node.result = value
                     node.resolve_type = "PARAMETER"
 
@@ -317,7 +351,7 @@ class RuleContext:
 
                 # Check outputs
                 if path in self.outputs:
-                    logger.debug(f"Resolving from previous OUTPUT: {self.outputs[path]}")
+                    logger.debug("Resolving from previous OUTPUT: %s", self.outputs[path])
                     node.result = self.outputs[path]
                     node.resolve_type = "OUTPUT"
                     return self.outputs[path]
@@ -332,7 +366,7 @@ class RuleContext:
                         and service_ref["field"] in self.overwrite_input[service_ref["service"]]
                     ):
                         value = self.overwrite_input[service_ref["service"]][service_ref["field"]]
-                        logger.debug(f"Resolving from OVERWRITE: {value}")
+                        logger.debug("Resolving from OVERWRITE: %s", value)
                         node.result = value
                         node.resolve_type = "OVERWRITE"
                         return value
@@ -348,7 +382,7 @@ class RuleContext:
                             and path in self.overwrite_input[source_ref["source_type"]]
                         ):
                             value = self.overwrite_input[source_ref["source_type"]][path]
-                            logger.debug(f"Resolving from SOURCE OVERRIDE: {value}")
+                            logger.debug("Resolving from SOURCE OVERRIDE: %s", value)
                             node.result = value
                             node.resolve_type = "SOURCE_OVERRIDE"
                             node.required = bool(spec.get("required", False))
@@ -356,43 +390,27 @@ class RuleContext:
                             # Add type information to the node
                             if "type" in spec:
                                 node.details["type"] = spec["type"]
-                            if "type_spec" in spec:
+                            if self.trace and "type_spec" in spec:
                                 resolved_type_spec = self._resolve_type_spec_enums(spec, spec["type_spec"])
                                 node.details["type_spec"] = resolved_type_spec
 
                             return value
                         df = None
                         table = None
+                        index = None
                         if source_ref.get("source_type") == "laws":
                             table = "laws"
-                            df = self.service_provider.resolver.rules_dataframe()
+                            resolver = self.service_provider.resolver
+                            df, index = resolver.rules_dataframe(), resolver.rules_index()
                         elif source_ref.get("source_type") == "events":
                             table = "events"
-                            events = self.service_provider.case_manager.get_events()
-                            df = pd.DataFrame(events)
+                            self._depends_on(("cases",))
+                            # The whole table is only materialized when the index can't answer the query
+                            index = self.service_provider.case_manager.events_table.index()
                         elif source_ref.get("source_type") == "cases":
                             table = "cases"
-                            cases = self.service_provider.case_manager.get_all_cases()
-                            df = pd.DataFrame(
-                                [
-                                    {
-                                        "case_id": str(case.id),
-                                        "bsn": case.bsn,
-                                        "service": case.service,
-                                        "law": case.law,
-                                        "status": (
-                                            case.status.value if hasattr(case.status, "value") else str(case.status)
-                                        ),
-                                        "approved": case.approved,
-                                        "created_at": case.created_at,
-                                        "year": case.created_at.year if case.created_at else None,
-                                        # Flatten parameters for filtering
-                                        **(case.parameters or {}),
-                                    }
-                                    for case in cases
-                                    if case is not None
-                                ]
-                            )
+                            self._depends_on(("cases",))
+                            index = self.service_provider.case_manager.cases_table.index()
                         elif (
                             source_ref.get("source_type")
                             and self.service_provider
@@ -405,28 +423,31 @@ class RuleContext:
                             table = source_ref.get("table")
                             if table and table in service.source_dataframes:
                                 df = service.source_dataframes[table]
-                                logger.debug(f"Resolving from SERVICE SOURCE {service_name}.{table}")
+                                index = service.source_indexes.get(table)
+                                logger.debug("Resolving from SERVICE SOURCE %s.%s", service_name, table)
                         elif self.sources and "table" in source_ref:
                             table = source_ref.get("table")
                             if table in self.sources:
                                 df = self.sources[table]
+                                index = self.source_indexes.get(table)
 
-                        if df is not None:
+                        if df is not None or index is not None:
                             expected_type = spec.get("type")
-                            result = self._resolve_from_source(source_ref, table, df, expected_type)
-                            logger.debug(f"Resolving from SOURCE {table}: {result}")
+                            result = self._resolve_from_source(source_ref, table, df, expected_type, index)
+                            logger.debug("Resolving from SOURCE %s: %s", table, result)
+                            required = bool(spec.get("required", False))
                             node.result = result
                             node.resolve_type = "SOURCE"
-                            node.required = bool(spec.get("required", False))
+                            node.required = required
 
-                            if result is None and node.required:
+                            if result is None and required:
                                 self.missing_required = True
                                 logger.warning(f"Required source resolved to None: {path}")
 
                             # Add type information to the node
                             if "type" in spec:
                                 node.details["type"] = spec["type"]
-                            if "type_spec" in spec:
+                            if self.trace and "type_spec" in spec:
                                 # Gebruik helper-methode om enum-referenties op te lossen
                                 resolved_type_spec = self._resolve_type_spec_enums(spec, spec["type_spec"])
                                 node.details["type_spec"] = resolved_type_spec
@@ -440,7 +461,11 @@ class RuleContext:
                     if service_ref and self.service_provider:
                         value = self._resolve_from_service(path, service_ref, spec)
                         logger.debug(
-                            f"Result for ${path} from {service_ref['service']} field {service_ref['field']}: {value}"
+                            "Result for $%s from %s field %s: %s",
+                            path,
+                            service_ref["service"],
+                            service_ref["field"],
+                            value,
                         )
                         node.result = value
                         node.resolve_type = "SERVICE"
@@ -449,7 +474,7 @@ class RuleContext:
                         # Add type information to the node
                         if "type" in spec:
                             node.details["type"] = spec["type"]
-                        if "type_spec" in spec:
+                        if self.trace and "type_spec" in spec:
                             # Gebruik helper-methode om enum-referenties op te lossen
                             resolved_type_spec = self._resolve_type_spec_enums(spec, spec["type_spec"])
                             node.details["type_spec"] = resolved_type_spec
@@ -462,14 +487,15 @@ class RuleContext:
 
                 if path in self.property_specs:
                     spec = self.property_specs[path]
-                    node.required = bool(spec.get("required", False))
-                    if node.required:
+                    required = bool(spec.get("required", False))
+                    node.required = required
+                    if required:
                         self.missing_required = True
                         logger.warning(f"This is a missing required value: {path}")
 
                     if "type" in spec:
                         node.details["type"] = spec["type"]
-                    if "type_spec" in spec:
+                    if self.trace and "type_spec" in spec:
                         # Gebruik helper-methode om enum-referenties op te lossen
                         resolved_type_spec = self._resolve_type_spec_enums(spec, spec["type_spec"])
                         node.details["type_spec"] = resolved_type_spec
@@ -501,45 +527,42 @@ class RuleContext:
         if "temporal" in spec and "reference" in spec["temporal"]:
             reference_date = self.resolve_value(spec["temporal"]["reference"])
 
-        # Check cache - convert list values to strings for cache key
-        def param_to_str(v):
-            """Convert parameter value to string for cache key, handling lists and dicts"""
-            if isinstance(v, list | dict):
-                return str(v)
-            return v
-
-        cache_key = (
-            f"{path}({','.join([f'{k}:{param_to_str(v)}' for k, v in sorted(parameters.items())])},{reference_date})"
-        )
+        # Check cache, unless the parameters can't be frozen exactly, like tables
+        try:
+            cache_key = (path, freeze(parameters), reference_date)
+        except TypeError:
+            cache_key = None
 
-        if cache_key in self.values_cache:
-            logger.debug(f"Resolving from CACHE with key '{cache_key}': {self.values_cache[cache_key]}")
+        if cache_key is not None and cache_key in self.values_cache:
+            logger.debug("Resolving from CACHE with key '%s': %s", cache_key, self.values_cache[cache_key])
             return self.values_cache[cache_key]
 
-        logger.debug(f"Resolving from {service_ref['service']} field {service_ref['field']} ({parameters})")
+        logger.debug("Resolving from %s field %s (%s)", service_ref["service"], service_ref["field"], parameters)
 
         # Create service evaluation node
-        details = {
-            "service": service_ref["service"],
-            "law": service_ref["law"],
-            "field": service_ref["field"],
-            "reference_date": reference_date,
-            "parameters": parameters,
-            "path": path,
-        }
-
-        # Copy type information from spec to details
-        if "type" in spec:
-            details["type"] = spec["type"]
-        if "type_spec" in spec:
-            details["type_spec"] = spec["type_spec"]
-
-        service_node = PathNode(
-            type="service_evaluation",
-            name=f"Service call: {service_ref['service']}.{service_ref['law']}",
-            result=None,
-            details=details,
-        )
+        service_node = UNTRACED
+        if self.trace:
+            details = {
+                "service": service_ref["service"],
+                "law": service_ref["law"],
+                "field": service_ref["field"],
+                "reference_date": reference_date,
+                "parameters": parameters,
+                "path": path,
+            }
+
+            # Copy type information from spec to details
+            if "type" in spec:
+                details["type"] = spec["type"]
+            if "type_spec" in spec:
+                details["type_spec"] = spec["type_spec"]
+
+            service_node = PathNode(
+                type="service_evaluation",
+                name=f"Service call: {service_ref['service']}.{service_ref['law']}",
+                result=None,
+                details=details,
+            )
         self.add_to_path(service_node)
 
         try:
@@ -550,82 +573,79 @@ class RuleContext:
             if self.service_provider and hasattr(self.service_provider, "case_manager"):
                 case_manager = self.service_provider.case_manager
                 if case_manager:
-                    all_cases = case_manager.get_all_cases()
-                    for case in all_cases:
-                        if (
-                            case
-                            and case.service == service_ref["service"]
-                            and case.law == service_ref["law"]
-                            and case.approved
-                            and hasattr(case.status, "value")
-                            and case.status.value == "DECIDED"
-                        ):
-                            # Check if parameters match (e.g., KVK_NUMMER)
-                            case_params = case.parameters or {}
-                            params_match = True
-                            for key, value in parameters.items():
-                                if key in case_params and case_params[key] != value:
-                                    params_match = False
-                                    break
-
-                            if params_match:
-                                found_approved_case = True
-                                # Found an approved case with matching parameters
-                                field = service_ref["field"]
-
-                                # If the service_reference declares resolve_from_case_existence,
-                                # the existence of an approved case is sufficient — return True
-                                if service_ref.get("resolve_from_case_existence", False):
-                                    resolved_value = True
-                                    logger.debug(
-                                        f"Resolved {field}=True from approved case {case.id} "
-                                        f"(resolve_from_case_existence=True)"
-                                    )
+                    self._depends_on(("cases", service_ref["service"], service_ref["law"]))
+                    approved_cases = case_manager.get_approved_cases(service_ref["service"], service_ref["law"])
+                    for case in approved_cases:
+                        # Check if parameters match (e.g., KVK_NUMMER)
+                        case_params = case.parameters or {}
+                        params_match = True
+                        for key, value in parameters.items():
+                            if key in case_params and case_params[key] != value:
+                                params_match = False
+                                break
+
+                        if params_match:
+                            found_approved_case = True
+                            # Found an approved case with matching parameters
+                            field = service_ref["field"]
+
+                            # If the service_reference declares resolve_from_case_existence,
+                            # the existence of an approved case is sufficient — return True
+                            if service_ref.get("resolve_from_case_existence", False):
+                                resolved_value = True
+                                logger.debug(
+                                    "Resolved %s=True from approved case %s (resolve_from_case_existence=True)",
+                                    field,
+                                    case.id,
+                                )
+                            else:
+                                # For other fields, use verified_result (the decided values)
+                                # Fall back to claimed_result if verified_result doesn't have the field
+                                verified = case.verified_result or {}
+                                claimed = case.claimed_result or {}
+                                if field in verified:
+                                    resolved_value = verified[field]
+                                elif field in claimed:
+                                    resolved_value = claimed[field]
                                 else:
-                                    # For other fields, use verified_result (the decided values)
-                                    # Fall back to claimed_result if verified_result doesn't have the field
-                                    verified = case.verified_result or {}
-                                    claimed = case.claimed_result or {}
-                                    if field in verified:
-                                        resolved_value = verified[field]
-                                    elif field in claimed:
-                                        resolved_value = claimed[field]
-                                    else:
-                                        # Store the case's parameters for re-evaluation fallback
-                                        approved_case_parameters = case_params
-                                        continue  # Field not found, try next case or fall through
-
-                                    logger.debug(f"Resolved {field} from approved case {case.id}: {resolved_value}")
+                                    # Store the case's parameters for re-evaluation fallback
+                                    approved_case_parameters = case_params
+                                    continue  # Field not found, try next case or fall through
 
+                                logger.debug("Resolved %s from approved case %s: %s", field, case.id, resolved_value)
+
+                            if cache_key is not None:
                                 self.values_cache[cache_key] = resolved_value
+                            if not self.trace:
+                                return resolved_value
 
-                                # Build proper path structure so the UI shows the source reference
-                                # Create a child node to represent the resolved value from the approved case
-                                # This node will be processed by extract_value_tree() and added to
-                                # service_entry["children"], which triggers the template to show
-                                # "Resultaat van het uitrekenen [law]"
-                                child_node = PathNode(
-                                    type="resolve",
-                                    name=f"Value from approved case: {field}",
-                                    result=resolved_value,
-                                    resolve_type="APPROVED_CASE",
-                                    details={
-                                        "path": field,
-                                        "source": "approved_case",
-                                        "case_id": str(case.id),
-                                        "type": spec.get("type"),
-                                    },
-                                )
+                            # Build proper path structure so the UI shows the source reference
+                            # Create a child node to represent the resolved value from the approved case
+                            # This node will be processed by extract_value_tree() and added to
+                            # service_entry["children"], which triggers the template to show
+                            # "Resultaat van het uitrekenen [law]"
+                            child_node = PathNode(
+                                type="resolve",
+                                name=f"Value from approved case: {field}",
+                                result=resolved_value,
+                                resolve_type="APPROVED_CASE",
+                                details={
+                                    "path": field,
+                                    "source": "approved_case",
+                                    "case_id": str(case.id),
+                                    "type": spec.get("type"),
+                                },
+                            )
 
-                                # Update service_node with result and children
-                                # Directly append child_node - extract_value_tree will process it
-                                # because APPROVED_CASE is in the resolve_type whitelist
-                                service_node.result = resolved_value
-                                service_node.details["source"] = "approved_case"
-                                service_node.details["case_id"] = str(case.id)
-                                service_node.children.append(child_node)
+                            # Update service_node with result and children
+                            # Directly append child_node - extract_value_tree will process it
+                            # because APPROVED_CASE is in the resolve_type whitelist
+                            service_node.result = resolved_value
+                            service_node.details["source"] = "approved_case"
+                            service_node.details["case_id"] = str(case.id)
+                            service_node.children.append(child_node)
 
-                                return resolved_value
+                            return resolved_value
 
             # If an approved case exists but the specific field wasn't in its stored
             # results, re-evaluate using the case's stored parameters (which include
@@ -634,22 +654,13 @@ class RuleContext:
             eval_parameters = parameters
             if found_approved_case and approved_case_parameters:
                 eval_parameters = {**parameters, **approved_case_parameters}
-            result = self.service_provider.evaluate(
-                service_ref["service"],
-                service_ref["law"],
-                eval_parameters,
-                reference_date,
-                self.overwrite_input,
-                requested_output=service_ref["field"],
-                approved=self.approved,
-            )
-
-            value = result.output.get(service_ref["field"])
-            self.values_cache[cache_key] = value
+            value, result_path = self._evaluate_service_reference(service_ref, eval_parameters, reference_date)
+            if cache_key is not None:
+                self.values_cache[cache_key] = value
 
             # Update the service node with the result and add child path
             service_node.result = value
-            service_node.children.append(result.path)
+            service_node.children.append(result_path)
 
             # Only propagate missing_required from inner evaluation if this field
             # is itself required and couldn't be resolved. Otherwise, an optional
@@ -662,6 +673,57 @@ class RuleContext:
         finally:
             self.pop_path()
 
+    def _evaluate_service_reference(
+        self, service_ref: dict[str, Any], parameters: dict[str, Any], reference_date: str
+    ) -> tuple[Any, PathNode | None]:
+        """Evaluate the field of a service reference, through the cache shared by all evaluations"""
+        cache = getattr(self.service_provider, "service_reference_cache", None)
+        key = None
+        if cache is not None:
+            try:
+                key = service_reference_key(
+                    service_ref["service"],
+                    service_ref["law"],
+                    service_ref["field"],
+                    parameters,
+                    reference_date,
+                    self.approved,
+                    self.overwrite_input,
+                )
+            except TypeError:
+                # Parameters that can't be frozen exactly, like tables, are evaluated without the cache
+                cache = None
+        if cache is not None:
+            entry = cache.get(key)
+            # A result cached without its trace can't be used when tracing
+            if entry is not None and not (self.trace and entry[1] is None):
+                logger.debug("Resolving %s.%s from SERVICE CACHE", service_ref["service"], service_ref["field"])
+                return entry
+
+        generation = cache.generation if cache is not None else None
+        with cache.recording() if cache is not None else nullcontext(()) as tags:
+            result = self.service_provider.evaluate(
+                service_ref["service"],
+                service_ref["law"],
+                parameters,
+                reference_date,
+                self.overwrite_input,
+                requested_output=service_ref["field"],
+                approved=self.approved,
+                trace=self.trace,
+            )
+
+        entry = (result.output.get(service_ref["field"]), result.path)
+        if cache is not None:
+            cache.put(key, entry, tags, generation)
+        return entry
+
+    def _depends_on(self, tag: tuple) -> None:
+        """Record that the service reference being computed depends on the data tagged with tag"""
+        cache = getattr(self.service_provider, "service_reference_cache", None)
+        if cache is not None:
+            cache.depends_on(tag)
+
     @staticmethod
     def _coerce_claim_value(value: Any, spec: dict[str, Any]) -> Any:
         """Coerce a claim value to match the expected type from the spec.
@@ -735,7 +797,7 @@ class RuleContext:
                         # Ensure enum_value is a list
                         if isinstance(enum_value, list | tuple):
                             field["enum_values"] = enum_value
-                            logger.debug(f"Resolved enum reference {field['enum']} to {field['enum_values']}")
+                            logger.debug("Resolved enum reference %s to %s", field["enum"], field["enum_values"])
                         else:
                             logger.warning(
                                 f"Enum reference {field['enum']} resolved to non-iterable type {type(enum_value).__name__}: {enum_value}. Skipping."
@@ -743,19 +805,51 @@ class RuleContext:
 
         return type_spec_copy
 
-    def _resolve_from_source(self, source_ref, table, df, expected_type=None):
+    def _resolve_from_source(self, source_ref, table, df, expected_type=None, index: SourceIndex | None = None):
+        """Resolve a source reference from df, or from the table of index when df is None"""
         if "select_on" in source_ref:
+            # The index only describes the table it was built for
+            if index is not None and df is not None and index.df is not df:
+                index = None
+
+            # Positions of the rows selected through the index so far
+            positions = None
             for select_on in source_ref["select_on"]:
                 value = self.resolve_value(select_on["value"])
+                column = select_on["name"]
 
                 if isinstance(value, dict) and "operation" in value and value["operation"] == "IN":
-                    allowed_values = self.resolve_value(value["values"])
-                    df = df[df[select_on["name"]].isin(allowed_values)]
+                    values, match_any = self.resolve_value(value["values"]), True
                 elif isinstance(value, list):
-                    # When value is a list, use isin() to match any of the values
-                    df = df[df[select_on["name"]].isin(value)]
+                    # When value is a list, match any of the values
+                    values, match_any = value, True
                 else:
-                    df = df[df[select_on["name"]] == value]
+                    values, match_any = value, False
+
+                if index is not None:
+                    selected = index.select_any(column, values) if match_any else index.select(column, values)
+                    if selected is not None:
+                        positions = (
+                            selected if positions is None else np.intersect1d(positions, selected, assume_unique=True)
+                        )
+                        continue
+
+                    # Not indexed: continue filtering the rows selected so far
+                    if positions is not None:
+                        df = index.rows(positions)
+                        positions = None
+                    elif df is None:
+                        df = index.df
+                    index = None
+
+                mask = df[column].isin(values) if match_any else df[column] == values
+                df = df[mask]
+
+            if positions is not None:
+                df = index.rows(positions)
+
+        if df is None:
+            df = index.df
 
         # Handle aggregation operations
         aggregation = source_ref.get("aggregation")
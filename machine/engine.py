@@ -1,14 +1,28 @@
 import functools
 import operator
 from collections import defaultdict
+from collections.abc import Callable
 from copy import copy
-from datetime import date, datetime
+from datetime import date, datetime, time
 from typing import Any
 
 import pandas as pd
 from dateutil.relativedelta import relativedelta
 
-from .context import PathNode, RuleContext, TypeSpec, logger
+from .context import UNTRACED, PathNode, RuleContext, TypeSpec, logger
+from .source_index import SourceIndex
+
+# A compiled piece of a law: evaluates itself against the context of one evaluation
+Compiled = Callable[[RuleContext], Any]
+# A compiled operation body: also receives the PathNode of the operation to fill its details
+CompiledBody = Callable[[RuleContext, PathNode], Any]
+# A compiled action: returns the output definition and the output name
+CompiledAction = Callable[[RuleContext], tuple[dict[str, Any], str]]
+
+
+def _constant(value: Any) -> Compiled:
+    """Compile a literal value"""
+    return lambda context: value
 
 
 class RulesEngine:
@@ -26,6 +40,17 @@ class RulesEngine:
         self.definitions = spec.get("properties", {}).get("definitions", {})
         self.service_provider = service_provider
 
+        # Output definitions by name (first one wins, as in the spec)
+        self.output_defs: dict[str, dict[str, Any]] = {}
+        for output in spec.get("properties", {}).get("output", []):
+            self.output_defs.setdefault(output.get("name"), output)
+
+        # Compile the spec once, so evaluations don't have to walk the raw YAML
+        self.compiled_definitions = self._compile_definitions(self.definitions)
+        self.compiled_requirements = self._compile_requirements(self.requirements)
+        self.compiled_actions = {id(action): self._compile_action(action) for action in self.actions}
+        self._action_plans: dict[str | None, list[CompiledAction]] = {}
+
     @staticmethod
     def _build_property_specs(properties: dict[str, Any]) -> dict[str, dict[str, Any]]:
         """Build mapping of property paths to their specifications"""
@@ -70,7 +95,7 @@ class RulesEngine:
             result = self.output_specs[name].enforce(value)
 
             if not operator.eq(value, result):
-                logger.debug(f"Enforcing type spec changed value from: {value} to {result}")
+                logger.debug("Enforcing type spec changed value from: %s to %s", value, result)
 
             return result
 
@@ -173,39 +198,62 @@ class RulesEngine:
         # Return actions in dependency order
         return [action_by_output[output] for output in ordered_outputs if output in action_by_output]
 
+    def _get_action_plan(self, requested_output: str | None) -> list[CompiledAction]:
+        """Get the compiled actions needed for the requested output, in dependency order"""
+        plan = self._action_plans.get(requested_output)
+        if plan is None:
+            plan = [
+                self.compiled_actions[id(action)]
+                for action in self.get_required_actions(requested_output, self.actions)
+            ]
+            self._action_plans[requested_output] = plan
+        return plan
+
     def evaluate(
         self,
         parameters: dict[str, Any] | None = None,
         overwrite_input: dict[str, Any] | None = None,
         overwrite_definitions: dict[str, Any] | None = None,
         sources: dict[str, pd.DataFrame] | None = None,
+        source_indexes: dict[str, SourceIndex] | None = None,
         calculation_date=None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: bool = True,
     ) -> dict[str, Any]:
-        """Evaluate rules using service context and sources"""
+        """Evaluate rules using service context and sources
+
+        With trace=False no evaluation path and resolved inputs are recorded; the outputs are the same.
+        """
         parameters = parameters or {}
         for p in self.parameter_specs:
             if p["required"] and p["name"] not in parameters:
                 logger.warning(f"Required parameter {p} not found in {parameters}")
 
-        logger.debug(f"Evaluating rules for {self.service_name} {self.law} ({calculation_date} {requested_output})")
-        root = PathNode(type="root", name="evaluation", result=None)
+        logger.debug(
+            "Evaluating rules for %s %s (%s %s)", self.service_name, self.law, calculation_date, requested_output
+        )
+        root = PathNode(type="root", name="evaluation", result=None) if trace else UNTRACED
 
         claims = None
         if "BSN" in parameters:
             bsn = parameters["BSN"]
-            claims = self.service_provider.claim_manager.get_claim_by_bsn_service_law(
+            claims = self.service_provider.claim_manager.get_claim_values(
                 bsn, self.service_name, self.law, approved=approved
             )
+            # Results of service references that use these claims are cached until the claims change
+            cache = getattr(self.service_provider, "service_reference_cache", None)
+            if cache is not None:
+                cache.depends_on(("bsn", bsn))
 
         context = RuleContext(
-            definitions=self.definitions,
+            definitions=self.compiled_definitions,
             service_provider=self.service_provider,
             parameters=parameters,
             property_specs=self.property_specs,
             output_specs=self.output_specs,
             sources=sources,
+            source_indexes=source_indexes or {},
             path=[root],
             overwrite_input=overwrite_input or {},
             overwrite_definitions=overwrite_definitions or {},
@@ -213,6 +261,7 @@ class RulesEngine:
             service_name=self.service_name,
             claims=claims,
             approved=approved,
+            trace=trace,
         )
 
         # Proactively resolve required parameters to ensure they appear in the value_tree
@@ -223,10 +272,12 @@ class RulesEngine:
                 context.resolve_value(f"${p['name']}")
 
         # Check requirements
-        requirements_node = PathNode(type="requirements", name="Check all requirements", result=None)
+        requirements_node = (
+            PathNode(type="requirements", name="Check all requirements", result=None) if trace else UNTRACED
+        )
         context.add_to_path(requirements_node)
         try:
-            requirements_met = self._evaluate_requirements(self.requirements, context)
+            requirements_met = self.compiled_requirements(context)
             requirements_node.result = requirements_met
         finally:
             context.pop_path()
@@ -234,10 +285,8 @@ class RulesEngine:
         output_values = {}
         if requirements_met:
             # Get required actions including dependencies in order
-            required_actions = self.get_required_actions(requested_output, self.actions)
-
-            for action in required_actions:
-                output_def, output_name = self._evaluate_action(action, context)
+            for action in self._get_action_plan(requested_output):
+                output_def, output_name = action(context)
                 context.outputs[output_name] = output_def["value"]
                 output_values[output_name] = output_def
                 if context.missing_required:
@@ -256,160 +305,536 @@ class RulesEngine:
             "input": context.resolved_paths,
             "output": output_values,
             "requirements_met": requirements_met,
-            "path": root,
+            "path": root if trace else None,
             "missing_required": context.missing_required,
         }
 
-    def _evaluate_action(self, action, context):
-        with logger.indent_block(f"Computing {action.get('output', '')}"):
-            if action["output"] == "partner_bsn":
-                pass
-            action_node = PathNode(
-                type="action",
-                name=f"Evaluate action for {action.get('output', '')}",
-                result=None,
-            )
-            context.add_to_path(action_node)
-            output_name = action["output"]
-            # Find output specification
-            output_spec = next(
-                (spec for spec in self.spec.get("properties", {}).get("output", []) if spec.get("name") == output_name),
-                {},
-            )
+    # Compilation
+    #
+    # The YAML spec is turned into a tree of closures once, when the engine is
+    # constructed. Every closure takes the RuleContext of a single evaluation and
+    # builds the same PathNode trace as walking the raw spec would, but without
+    # re-dispatching on the operation type or re-reading the spec dicts. When the
+    # context has trace=False the closures skip the PathNodes altogether.
 
-            if (
-                self.service_name in context.overwrite_input
-                and output_name in context.overwrite_input[self.service_name]
-            ):
-                raw_result = context.overwrite_input[self.service_name][output_name]
-                logger.debug(f"Resolving value {self.service_name}/{output_name} from OVERWRITE {raw_result}")
-            elif "operation" in action:
-                raw_result = self._evaluate_operation(action, context)
-            elif "value" in action:
-                raw_result = self._evaluate_value(action["value"], context)
-            elif "subject" in action:
-                # Direct subject assignment (e.g., subject: "$SOURCE.field")
-                raw_result = self._evaluate_value(action["subject"], context)
-            else:
-                raw_result = None
-
-            result = self._enforce_output_type(output_name, raw_result)
-        action_node.result = result
-        logger.debug(f"Result of {action.get('output', '')}: {result}")
-        # Build output with metadata
-        output_def = {
-            "value": result,
+    @staticmethod
+    def _compile_definitions(definitions: dict[str, Any]) -> dict[str, Any]:
+        """Unwrap definitions that carry a legal_basis next to their value"""
+        return {
+            name: value["value"] if isinstance(value, dict) and "value" in value and "legal_basis" in value else value
+            for name, value in definitions.items()
+        }
+
+    def _compile_action(self, action: dict[str, Any]) -> CompiledAction:
+        """Compile an action into a callable returning (output_def, output_name)"""
+        output_name = action["output"]
+        block_message = f"Computing {action.get('output', '')}"
+        node_name = f"Evaluate action for {action.get('output', '')}"
+        output_spec = self.output_defs.get(output_name, {})
+
+        # Static output metadata
+        output_meta = {
             "type": output_spec.get("type", "unknown"),
             "description": output_spec.get("description", ""),
         }
-        # Add type_spec if present
         if "type_spec" in output_spec:
-            output_def["type_spec"] = output_spec["type_spec"]
-        # Add temporal if present
+            output_meta["type_spec"] = output_spec["type_spec"]
         if "temporal" in output_spec:
-            output_def["temporal"] = output_spec["temporal"]
-        return output_def, output_name
+            output_meta["temporal"] = output_spec["temporal"]
+
+        if "operation" in action:
+            compute = self._compile_operation(action)
+        elif "value" in action:
+            compute = self._compile_value(action["value"])
+        elif "subject" in action:
+            # Direct subject assignment (e.g., subject: "$SOURCE.field")
+            compute = self._compile_value(action["subject"])
+        else:
+            compute = _constant(None)
 
-    def _evaluate_requirements(self, requirements: list, context: RuleContext) -> bool:
-        """Evaluate all requirements"""
-        if not requirements:
-            logger.debug("No requirements found")
-            return True
-
-        for req in requirements:
-            with logger.indent_block(f"Requirements {req}"):
-                node = PathNode(
-                    type="requirement",
-                    name="Check ALL conditions"
-                    if "all" in req
-                    else "Check OR conditions"
-                    if "or" in req
-                    else "Test condition",
-                    result=None,
-                )
-                context.add_to_path(node)
+        service_name = self.service_name
+        enforce = self._enforce_output_type
 
-                if "all" in req:
-                    results = []
-                    for r in req["all"]:
-                        result = self._evaluate_requirements([r], context)
-                        results.append(result)
-                        if not bool(result):
-                            logger.debug("False value found in an ALL, no need to compute the rest, breaking.")
-                            break
-                    result = all(results)
-                elif "or" in req:
-                    results = []
-                    for r in req["or"]:
-                        result = self._evaluate_requirements([r], context)
-                        results.append(result)
-                        if bool(result):
-                            logger.debug("True value found in an OR, no need to compute the rest, breaking.")
-                            break
-                    result = any(results)
+        def run(context: RuleContext) -> tuple[dict[str, Any], str]:
+            with logger.indent_block(block_message):
+                action_node = PathNode(type="action", name=node_name, result=None) if context.trace else UNTRACED
+                context.add_to_path(action_node)
+
+                if service_name in context.overwrite_input and output_name in context.overwrite_input[service_name]:
+                    raw_result = context.overwrite_input[service_name][output_name]
+                    logger.debug("Resolving value %s/%s from OVERWRITE %s", service_name, output_name, raw_result)
                 else:
-                    result = self._evaluate_operation(req, context)
+                    raw_result = compute(context)
+
+                result = enforce(output_name, raw_result)
+            action_node.result = result
+            logger.debug("Result of %s: %s", output_name, result)
+            return {"value": result, **output_meta}, output_name
+
+        return run
+
+    def _compile_requirements(self, requirements: list) -> Compiled:
+        """Compile a list of requirements into a callable that checks all of them"""
+        if not requirements:
+
+            def no_requirements(context: RuleContext) -> bool:
+                logger.debug("No requirements found")
+                return True
+
+            return no_requirements
+
+        checks = [self._compile_requirement(req) for req in requirements]
+
+        def run(context: RuleContext) -> bool:
+            return all(check(context) for check in checks)
+
+        return run
+
+    def _compile_requirement(self, req: dict[str, Any]) -> Compiled:
+        """Compile a single requirement (ALL, OR or a plain condition)"""
+        block_message = f"Requirements {req}"
+
+        if "all" in req:
+            node_name = "Check ALL conditions"
+            checks = [self._compile_requirements([r]) for r in req["all"]]
+
+            def evaluate(context: RuleContext) -> bool:
+                results = []
+                for check in checks:
+                    result = check(context)
+                    results.append(result)
+                    if not bool(result):
+                        logger.debug("False value found in an ALL, no need to compute the rest, breaking.")
+                        break
+                return all(results)
+
+        elif "or" in req:
+            node_name = "Check OR conditions"
+            checks = [self._compile_requirements([r]) for r in req["or"]]
+
+            def evaluate(context: RuleContext) -> bool:
+                results = []
+                for check in checks:
+                    result = check(context)
+                    results.append(result)
+                    if bool(result):
+                        logger.debug("True value found in an OR, no need to compute the rest, breaking.")
+                        break
+                return any(results)
+
+        else:
+            node_name = "Test condition"
+            evaluate = self._compile_operation(req)
+
+        def run(context: RuleContext) -> Any:
+            with logger.indent_block(block_message):
+                node = PathNode(type="requirement", name=node_name, result=None) if context.trace else UNTRACED
+                context.add_to_path(node)
+                result = evaluate(context)
 
             logger.debug("Requirement met" if result else "Requirement NOT met")
 
             node.result = result
             context.pop_path()
+            return result
+
+        return run
+
+    def _compile_value(self, value: Any) -> Compiled:
+        """Compile a value which might be a number, operation, or reference"""
+        if isinstance(value, int | float | bool | date | datetime) or value is None:
+            return _constant(value)
+        if isinstance(value, dict) and "operation" in value:
+            return self._compile_operation(value)
+
+        def resolve(context: RuleContext) -> Any:
+            return context.resolve_value(value)
+
+        return resolve
+
+    def _compile_field(self, operation: dict[str, Any], key: str) -> Compiled:
+        """Compile operation[key], deferring a missing key to a KeyError at evaluation time"""
+        if key in operation:
+            return self._compile_value(operation[key])
+
+        def missing(context: RuleContext) -> Any:
+            raise KeyError(key)
+
+        return missing
+
+    def _compile_operation(self, operation: Any) -> Compiled:
+        """Compile an operation or condition"""
+        if not isinstance(operation, dict):
+            return self._compile_traced_value(operation, "value", "Direct value evaluation", operation)
+
+        # Direct value assignment - no operation needed
+        if "value" in operation and not operation.get("operation"):
+            return self._compile_traced_value(
+                operation["value"], "direct_value", "Direct value assignment", operation["value"]
+            )
+
+        op_type = operation.get("operation")
+        node_name = f"Operation: {op_type}"
+        body = self._compile_operation_body(op_type, operation)
+
+        def run(context: RuleContext) -> Any:
+            if not context.trace:
+                return body(context, UNTRACED)
+
+            node = PathNode(type="operation", name=node_name, result=None, details={"operation_type": op_type})
+            context.add_to_path(node)
+            result = body(context, node)
+            node.result = result
+            context.pop_path()
+            return result
+
+        return run
+
+    def _compile_traced_value(self, value: Any, node_type: str, node_name: str, raw_value: Any) -> Compiled:
+        """Compile a value that gets its own node in the evaluation path"""
+        evaluate = self._compile_value(value)
+
+        def run(context: RuleContext) -> Any:
+            if not context.trace:
+                return evaluate(context)
+
+            node = PathNode(type=node_type, name=node_name, result=None, details={"raw_value": raw_value})
+            context.add_to_path(node)
+            result = evaluate(context)
+            node.result = result
+            context.pop_path()
+            return result
+
+        return run
+
+    def _compile_operation_body(self, op_type: str | None, operation: dict[str, Any]) -> CompiledBody:
+        """Select and bind the implementation of an operation, once at compile time"""
+        if op_type is None:
 
-            if not result:
-                return False
+            def body(context: RuleContext, node: PathNode) -> Any:
+                logger.warning("Operation type is None (or missing).")
+                return None
 
-        return True
+        elif op_type == "IF":
+            body = self._compile_if(operation)
 
-    def _evaluate_if_operation(self, operation: dict[str, Any], context: RuleContext) -> Any:
-        """Evaluate an IF operation"""
-        with logger.indent_block("Evaluating IF"):
-            if_node = PathNode(
-                type="operation",
-                name="IF conditions",
-                result=None,
-                details={"condition_results": []},
+        elif op_type == "FOREACH":
+            body = self._compile_foreach(operation)
+
+        elif op_type in ["IN", "NOT_IN"]:
+            subject_fn = self._compile_field(operation, "subject")
+            values_fn = self._compile_value(operation.get("values", []))
+            negate = op_type == "NOT_IN"
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                with logger.indent_block(op_type):
+                    subject = subject_fn(context)
+                    allowed_values = values_fn(context)
+
+                    # Ensure allowed_values is a list/set for membership testing
+                    allowed_set = allowed_values if isinstance(allowed_values, list | dict | set) else [allowed_values]
+
+                    # If subject is a list, check if ANY element is in allowed_values
+                    if isinstance(subject, list):
+                        result = any(s in allowed_set for s in subject)
+                    else:
+                        result = subject in allowed_set
+
+                    if negate:
+                        result = not result
+
+                node.details.update({"subject_value": subject, "allowed_values": allowed_values})
+                logger.debug("Result %s %s %s: %s", subject, op_type, allowed_values, result)
+                return result
+
+        elif op_type in ["NOT_NULL", "IS_NULL"]:
+            subject_fn = self._compile_field(operation, "subject")
+            expect_null = op_type == "IS_NULL"
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                subject = subject_fn(context)
+                result = (subject is None) if expect_null else (subject is not None)
+                node.details["subject_value"] = subject
+                logger.debug("%s result: %s", op_type, result)
+                return result
+
+        elif op_type == "EXISTS":
+            subject_fn = self._compile_field(operation, "subject")
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                subject = subject_fn(context)
+                # EXISTS returns True if subject is not None and not empty
+                if subject is None:
+                    result = False
+                elif isinstance(subject, list | tuple | dict) or hasattr(subject, "__len__"):
+                    result = len(subject) > 0
+                else:
+                    result = bool(subject)
+                node.details["subject_value"] = subject
+                logger.debug("EXISTS result: %s", result)
+                return result
+
+        elif op_type == "LENGTH":
+            subject_fn = self._compile_field(operation, "subject")
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                subject = subject_fn(context)
+                # LENGTH returns the count of items in a list/array, or 0 if None/empty
+                if subject is None:
+                    result = 0
+                elif isinstance(subject, list | tuple | dict) or hasattr(subject, "__len__"):
+                    result = len(subject)
+                else:
+                    # For non-collection types, return 1 if truthy, 0 if falsy
+                    result = 1 if subject else 0
+                node.details["subject_value"] = subject
+                logger.debug("LENGTH result: %s", result)
+                return result
+
+        elif op_type in ["AND", "OR"]:
+            value_fns = self._compile_values(operation)
+            stop_on = op_type == "OR"
+            combine = any if stop_on else all
+            stop_message = (
+                "True value found in an OR, no need to compute the other, breaking."
+                if stop_on
+                else "False value found in an AND, no need to compute the rest, breaking."
             )
-            context.add_to_path(if_node)
 
-            result = 0
-            conditions = operation.get("conditions", [])
+            def body(context: RuleContext, node: PathNode) -> Any:
+                with logger.indent_block(op_type):
+                    values = []
+                    for value_fn in value_fns:
+                        r = value_fn(context)
+                        values.append(r)
+                        if bool(r) is stop_on:
+                            logger.debug(stop_message)
+                            break
+                    result = combine(bool(v) for v in values)
+
+                node.details["evaluated_values"] = values
+                logger.debug("Result %s %s: %s", list(values), op_type, result)
+                return result
+
+        elif op_type == "COALESCE":
+            # Returns the first non-null value from the list (lazy evaluation)
+            value_fns = self._compile_values(operation)
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                with logger.indent_block("COALESCE"):
+                    result = None
+                    evaluated_values = []
+                    for value_fn in value_fns:
+                        r = value_fn(context)
+                        evaluated_values.append(r)
+                        if r is not None:
+                            result = r
+                            logger.debug("Non-null value found in COALESCE: %s", r)
+                            break
+                node.details["evaluated_values"] = evaluated_values
+                logger.debug("COALESCE result: %s", result)
+                return result
+
+        elif op_type == "COMBINE_DATETIME":
+            date_fn = self._compile_value(operation.get("date"))
+            time_fn = self._compile_value(operation.get("time"))
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                result, date_val, time_val = self._combine_datetime(date_fn(context), time_fn(context), context)
+                node.details.update({"date": date_val, "time": time_val})
+                return result
+
+        elif op_type == "DAY_OF_WEEK":
+            date_fn = self._compile_value(operation.get("subject"))
 
-            for i, condition in enumerate(conditions):
-                condition_result = {
-                    "condition_index": i,
-                    "type": "test" if "test" in condition else "else",
+            def body(context: RuleContext, node: PathNode) -> Any:
+                result, date_val = self._day_of_week(date_fn(context))
+                node.details.update({"date": date_val, "day_of_week": result})
+                return result
+
+        elif "_DATE" in op_type:
+            value_fns = self._compile_values(operation)
+            unit = operation.get("unit", "days")
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                values = [value_fn(context) for value_fn in value_fns]
+                result = self._evaluate_date_operation(op_type, values, unit, context)
+                node.details.update({"evaluated_values": values, "unit": unit})
+                return result
+
+        elif op_type in self.COMPARISON_OPS:
+            body = self._compile_comparison(op_type, operation)
+
+        elif op_type in self.AGGREGATE_OPS and "values" in operation:
+            # The operation dict has legal_basis as metadata alongside operation/values
+            # but we only need to evaluate the 'values' list, ignoring legal_basis metadata
+            value_fns = [self._compile_value(v) for v in operation["values"]]
+            raw_values = operation["values"]
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                values = [value_fn(context) for value_fn in value_fns]
+                result = self._evaluate_aggregate_ops(op_type, values)
+                node.details.update(
+                    {
+                        "raw_values": raw_values,
+                        "evaluated_values": values,
+                        "arithmetic_type": op_type,
+                    }
+                )
+                return result
+
+        elif op_type == "GET":
+            subject_fn = self._compile_field(operation, "subject")
+            values_fn = self._compile_value(operation.get("values", []))
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                subject = subject_fn(context)
+                values = values_fn(context)
+                result = values.get(subject)
+                node.details.update({"subject_value": subject, "allowed_values": values})
+                logger.debug("GET %s from %s: %s", subject, values, result)
+                return result
+
+        else:
+
+            def body(context: RuleContext, node: PathNode) -> Any:
+                node.details["error"] = "Invalid operation format"
+                logger.warning(f"Not matched to any operation {op_type}")
+                return None
+
+        return body
+
+    def _compile_values(self, operation: dict[str, Any]) -> list[Compiled]:
+        """Compile operation['values'], deferring a missing key to a KeyError at evaluation time"""
+        if "values" not in operation:
+            return [self._compile_field(operation, "values")]
+        return [self._compile_value(v) for v in operation["values"]]
+
+    def _compile_comparison(self, op_type: str, operation: dict[str, Any]) -> CompiledBody:
+        """Compile a comparison operation on subject/value or on a pair of values"""
+        if "subject" in operation:
+            subject_fn = self._compile_value(operation["subject"])
+            value_fn = self._compile_field(operation, "value")
+
+            def operands(context: RuleContext) -> tuple[Any, Any]:
+                return subject_fn(context), value_fn(context)
+
+        elif "values" in operation:
+            value_fns = [self._compile_value(v) for v in operation["values"]]
+
+            def operands(context: RuleContext) -> tuple[Any, Any]:
+                values = [value_fn(context) for value_fn in value_fns]
+                return values[0], values[1]
+
+        else:
+
+            def operands(context: RuleContext) -> tuple[Any, Any]:
+                logger.warning("Comparison operation expects two values or subject/value.")
+                return None, None
+
+        def body(context: RuleContext, node: PathNode) -> Any:
+            subject, value = operands(context)
+            result = self._evaluate_comparison(op_type, subject, value)
+            node.details.update(
+                {
+                    "subject_value": subject,
+                    "comparison_value": value,
+                    "comparison_type": op_type,
                 }
+            )
+            return result
+
+        return body
 
-                if "test" in condition:
-                    test_result = self._evaluate_operation(condition["test"], context)
-                    condition_result["test_result"] = test_result
-                    if test_result:
-                        result = self._evaluate_value(condition["then"], context)
-                        if_node.details["condition_results"].append(condition_result)
-                        logger.debug(f"THEN condition: {result}")
+    def _compile_if(self, operation: dict[str, Any]) -> CompiledBody:
+        """Compile an IF operation"""
+        conditions = []
+        for condition in operation.get("conditions", []):
+            if "test" in condition:
+                conditions.append(
+                    ("test", self._compile_operation(condition["test"]), self._compile_field(condition, "then"))
+                )
+            elif "else" in condition:
+                conditions.append(("else", None, self._compile_value(condition["else"])))
+            else:
+                conditions.append((None, None, None))
+
+        def body(context: RuleContext, node: PathNode) -> Any:
+            with logger.indent_block("Evaluating IF"):
+                condition_results = []
+                if_node = (
+                    PathNode(
+                        type="operation",
+                        name="IF conditions",
+                        result=None,
+                        details={"condition_results": condition_results},
+                    )
+                    if context.trace
+                    else UNTRACED
+                )
+                context.add_to_path(if_node)
+
+                result = 0
+                for i, (kind, test_fn, value_fn) in enumerate(conditions):
+                    condition_result = {
+                        "condition_index": i,
+                        "type": "test" if kind == "test" else "else",
+                    }
+
+                    if kind == "test":
+                        test_result = test_fn(context)
+                        condition_result["test_result"] = test_result
+                        if test_result:
+                            result = value_fn(context)
+                            condition_results.append(condition_result)
+                            logger.debug("THEN condition: %s", result)
+                            break
+                    elif kind == "else":
+                        result = value_fn(context)
+                        condition_result["else_value"] = result
+                        condition_results.append(condition_result)
+                        logger.debug("ELSE condition: %s", result)
                         break
-                elif "else" in condition:
-                    result = self._evaluate_value(condition["else"], context)
-                    condition_result["else_value"] = result
-                    if_node.details["condition_results"].append(condition_result)
-                    logger.debug(f"ELSE condition: {result}")
-                    break
 
-                if_node.details["condition_results"].append(condition_result)
+                    condition_results.append(condition_result)
 
-            if_node.result = result
-            context.pop_path()
+                if_node.result = result
+                context.pop_path()
+                return result
+
+        return body
+
+    def _compile_foreach(self, operation: dict[str, Any]) -> CompiledBody:
+        """Compile a FOREACH operation"""
+        combine = operation.get("combine")
+        subject_fn = self._compile_field(operation, "subject")
+        where_fn = self._compile_value(operation["where"]) if "where" in operation else None
+        if "value" in operation:
+            raw_value = operation["value"]
+            item_fn = self._compile_value(raw_value[0] if isinstance(raw_value, list) else raw_value)
+        else:
+            raw_value = None
+            item_fn = self._compile_field(operation, "value")
+
+        def body(context: RuleContext, node: PathNode) -> Any:
+            result = self._evaluate_foreach(combine, subject_fn, where_fn, item_fn, context)
+            node.details.update({"raw_values": raw_value, "arithmetic_type": "FOREACH"})
             return result
 
-    def _evaluate_foreach(self, operation, context):
+        return body
+
+    def _evaluate_foreach(
+        self,
+        combine: str | None,
+        subject_fn: Compiled,
+        where_fn: Compiled | None,
+        item_fn: Compiled,
+        context: RuleContext,
+    ) -> Any:
         """Handle FOREACH operation"""
         logger.debug("For each condition")
 
-        combine = operation.get("combine")
-
-        array_data = self._evaluate_value(operation["subject"], context)
-        if "DECLARED_HOURS" in operation["subject"]:
-            pass
+        array_data = subject_fn(context)
         if not array_data:
             logger.warning("No data found to run FOREACH on")
             return self._evaluate_aggregate_ops(combine, [])
@@ -417,10 +842,10 @@ class RulesEngine:
         if not isinstance(array_data, list):
             array_data = [array_data]
 
-        with logger.indent_block(f"Foreach({combine})"):
+        with logger.indent_block(lambda: f"Foreach({combine})"):
             values = []
             for item in array_data:
-                with logger.indent_block(f"Item {item}"):
+                with logger.indent_block(lambda: f"Item {item}"):
                     item_context = copy(context)
                     # Create a new local dict to avoid polluting the parent context
                     item_context.local = dict(context.local)
@@ -435,16 +860,13 @@ class RulesEngine:
                             break
 
                     # Check where clause if present - skip item if condition is not met
-                    if "where" in operation:
-                        where_result = self._evaluate_value(operation["where"], item_context)
+                    if where_fn is not None:
+                        where_result = where_fn(item_context)
                         if not where_result:
-                            logger.debug(f"Skipping item due to where clause: {item}")
+                            logger.debug("Skipping item due to where clause: %s", item)
                             continue
 
-                    value_to_evaluate = (
-                        operation["value"][0] if isinstance(operation["value"], list) else operation["value"]
-                    )
-                    result = self._evaluate_value(value_to_evaluate, item_context)
+                    result = item_fn(item_context)
                     context.missing_required = context.missing_required or item_context.missing_required
                     context.path = item_context.path
                     # When combine is specified, flatten results for aggregation
@@ -453,9 +875,9 @@ class RulesEngine:
                         values.extend(result if isinstance(result, list) else [result])
                     else:
                         values.append(result)
-            logger.debug(f"Foreach values: {values}")
+            logger.debug("Foreach values: %s", values)
             result = self._evaluate_aggregate_ops(combine, values) if combine else values
-            logger.debug(f"Foreach result: {result}")
+            logger.debug("Foreach result: %s", result)
         return result
 
     COMPARISON_OPS = {
@@ -497,7 +919,7 @@ class RulesEngine:
             logger.warning(f"Dropped {len(values) - len(filtered_values)} values because they where None")
 
         result = RulesEngine.AGGREGATE_OPS[op](filtered_values)
-        logger.debug(f"Compute {op}({filtered_values}) = {result}")
+        logger.debug("Compute %s(%s) = %s", op, filtered_values, result)
         return result
 
     @staticmethod
@@ -508,11 +930,11 @@ class RulesEngine:
             # For EQUALS/NOT_EQUALS, we can compare None values
             if op == "EQUALS":
                 result = left == right
-                logger.debug(f"Compute {op}({left}, {right}) = {result}")
+                logger.debug("Compute %s(%s, %s) = %s", op, left, right, result)
                 return result
             elif op == "NOT_EQUALS":
                 result = left != right
-                logger.debug(f"Compute {op}({left}, {right}) = {result}")
+                logger.debug("Compute %s(%s, %s) = %s", op, left, right, result)
                 return result
             else:
                 # For other comparisons (GREATER_THAN, etc), None is not comparable
@@ -526,7 +948,7 @@ class RulesEngine:
 
         try:
             result = RulesEngine.COMPARISON_OPS[op](left, right)
-            logger.debug(f"Compute {op}({left}, {right}) = {result}")
+            logger.debug("Compute %s(%s, %s) = %s", op, left, right, result)
         except TypeError as e:
             logger.warning(f"Error computing {op}({left}, {right}): {e}")
             result = None
@@ -614,7 +1036,7 @@ class RulesEngine:
                 logger.warning(f"Unknown date unit '{unit}', defaulting to days")
                 result = delta.days
 
-            logger.debug(f"Compute {op}({values}, {unit}) = {result}")
+            logger.debug("Compute %s(%s, %s) = %s", op, values, unit, result)
             return result
 
         if op == "ADD_DATE":
@@ -651,291 +1073,71 @@ class RulesEngine:
                 result_date = base_date_converted + relativedelta(days=amount)
 
             result = result_date.strftime("%Y-%m-%d")
-            logger.debug(f"Compute {op}({values}, {unit}) = {result}")
+            logger.debug("Compute %s(%s, %s) = %s", op, values, unit, result)
             return result
 
         # Handle other date operations if added in the future
         logger.warning(f"Unknown date operation: {op}")
         return None
 
-    def _evaluate_operation(self, operation: dict[str, Any], context: RuleContext) -> Any:
-        """Evaluate an operation or condition"""
-
-        if not isinstance(operation, dict):
-            node = PathNode(
-                type="value",
-                name="Direct value evaluation",
-                result=None,
-                details={"raw_value": operation},
-            )
-            context.add_to_path(node)
-            result = self._evaluate_value(operation, context)
-            node.result = result
-            context.pop_path()
-            return result
-
-        # Direct value assignment - no operation needed
-        if "value" in operation and not operation.get("operation"):
-            node = PathNode(
-                type="direct_value",
-                name="Direct value assignment",
-                result=None,
-                details={"raw_value": operation["value"]},
-            )
-            context.add_to_path(node)
-            result = self._evaluate_value(operation["value"], context)
-            node.result = result
-            context.pop_path()
-            return result
-
-        op_type = operation.get("operation")
-        node = PathNode(
-            type="operation",
-            name=f"Operation: {op_type}",
-            result=None,
-            details={"operation_type": op_type},
-        )
-        context.add_to_path(node)
+    @staticmethod
+    def _combine_datetime(date_val: Any, time_val: Any, context: RuleContext) -> tuple[datetime | None, Any, Any]:
+        """Combine a date and time into a datetime, returning the parsed operands as well"""
+        if date_val is None or time_val is None:
+            logger.warning(f"COMBINE_DATETIME: missing date ({date_val}) or time ({time_val})")
+            context.missing_required = True
+            return None, date_val, time_val
 
-        if op_type is None:
-            logger.warning("Operation type is None (or missing).")
+        try:
+            # Parse date if it's a string
+            if isinstance(date_val, str):
+                date_val = (
+                    datetime.fromisoformat(date_val).date()
+                    if "T" in date_val
+                    else datetime.strptime(date_val, "%Y-%m-%d").date()
+                )
+            elif isinstance(date_val, datetime):
+                date_val = date_val.date()
+
+            # Parse time - expect format like "20:00" or "20:00:00"
+            if isinstance(time_val, str):
+                time_parts = time_val.split(":")
+                hour = int(time_parts[0])
+                minute = int(time_parts[1]) if len(time_parts) > 1 else 0
+                second = int(time_parts[2]) if len(time_parts) > 2 else 0
+                time_val = time(hour, minute, second)
+
+            result = datetime.combine(date_val, time_val)
+            logger.debug("COMBINE_DATETIME(%s, %s) = %s", date_val, time_val, result)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"COMBINE_DATETIME failed: {e}")
             result = None
 
-        elif op_type == "IF":
-            result = self._evaluate_if_operation(operation, context)
-
-        elif op_type == "FOREACH":
-            result = self._evaluate_foreach(operation, context)
-            node.details.update({"raw_values": operation["value"], "arithmetic_type": op_type})
-
-        elif op_type in ["IN", "NOT_IN"]:
-            with logger.indent_block(op_type):
-                subject = self._evaluate_value(operation["subject"], context)
-                allowed_values = self._evaluate_value(operation.get("values", []), context)
-
-                # Ensure allowed_values is a list/set for membership testing
-                allowed_set = allowed_values if isinstance(allowed_values, list | dict | set) else [allowed_values]
-
-                # If subject is a list, check if ANY element is in allowed_values
-                result = any(s in allowed_set for s in subject) if isinstance(subject, list) else subject in allowed_set
+        return result, date_val, time_val
 
-                if op_type == "NOT_IN":
-                    result = not result
-
-            node.details.update({"subject_value": subject, "allowed_values": allowed_values})
-            logger.debug(f"Result {subject} {op_type} {allowed_values}: {result}")
-
-        elif op_type == "NOT_NULL":
-            subject = self._evaluate_value(operation["subject"], context)
-            result = subject is not None
-            node.details["subject_value"] = subject
-            logger.debug(f"NOT_NULL result: {result}")
-
-        elif op_type == "IS_NULL":
-            subject = self._evaluate_value(operation["subject"], context)
-            result = subject is None
-            node.details["subject_value"] = subject
-            logger.debug(f"IS_NULL result: {result}")
-
-        elif op_type == "EXISTS":
-            subject = self._evaluate_value(operation["subject"], context)
-            # EXISTS returns True if subject is not None and not empty
-            if subject is None:
-                result = False
-            elif isinstance(subject, list | tuple | dict) or hasattr(subject, "__len__"):
-                result = len(subject) > 0
-            else:
-                result = bool(subject)
-            node.details["subject_value"] = subject
-            logger.debug(f"EXISTS result: {result}")
-
-        elif op_type == "LENGTH":
-            subject = self._evaluate_value(operation["subject"], context)
-            # LENGTH returns the count of items in a list/array, or 0 if None/empty
-            if subject is None:
-                result = 0
-            elif isinstance(subject, list | tuple | dict) or hasattr(subject, "__len__"):
-                result = len(subject)
-            else:
-                # For non-collection types, return 1 if truthy, 0 if falsy
-                result = 1 if subject else 0
-            node.details["subject_value"] = subject
-            logger.debug(f"LENGTH result: {result}")
-
-        elif op_type == "AND":
-            with logger.indent_block("AND"):
-                values = []
-                for v in operation["values"]:
-                    r = self._evaluate_value(v, context)
-                    values.append(r)
-                    if not bool(r):
-                        logger.debug("False value found in an AND, no need to compute the rest, breaking.")
-                        break
-                result = all(bool(v) for v in values)
-
-            node.details["evaluated_values"] = values
-            logger.debug(f"Result {list(values)} AND: {result}")
-
-        elif op_type == "OR":
-            with logger.indent_block("OR"):
-                values = []
-                for v in operation["values"]:
-                    r = self._evaluate_value(v, context)
-                    values.append(r)
-                    if bool(r):
-                        logger.debug("True value found in an OR, no need to compute the other, breaking.")
-                        break
-                result = any(bool(v) for v in values)
-            node.details["evaluated_values"] = values
-            logger.debug(f"Result {list(values)} OR: {result}")
-
-        elif op_type == "COALESCE":
-            # Returns the first non-null value from the list (lazy evaluation)
-            with logger.indent_block("COALESCE"):
-                result = None
-                evaluated_values = []
-                for v in operation["values"]:
-                    r = self._evaluate_value(v, context)
-                    evaluated_values.append(r)
-                    if r is not None:
-                        result = r
-                        logger.debug(f"Non-null value found in COALESCE: {r}")
-                        break
-            node.details["evaluated_values"] = evaluated_values
-            logger.debug(f"COALESCE result: {result}")
-
-        elif op_type == "COMBINE_DATETIME":
-            # Combine a date and time into a datetime
-            date_val = self._evaluate_value(operation.get("date"), context)
-            time_val = self._evaluate_value(operation.get("time"), context)
-
-            if date_val is None or time_val is None:
-                logger.warning(f"COMBINE_DATETIME: missing date ({date_val}) or time ({time_val})")
-                context.missing_required = True
-                result = None
-            else:
-                try:
-                    # Parse date if it's a string
-                    if isinstance(date_val, str):
-                        date_val = (
-                            datetime.fromisoformat(date_val).date()
-                            if "T" in date_val
-                            else datetime.strptime(date_val, "%Y-%m-%d").date()
-                        )
-                    elif isinstance(date_val, datetime):
-                        date_val = date_val.date()
-
-                    # Parse time - expect format like "20:00" or "20:00:00"
-                    if isinstance(time_val, str):
-                        time_parts = time_val.split(":")
-                        hour = int(time_parts[0])
-                        minute = int(time_parts[1]) if len(time_parts) > 1 else 0
-                        second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                        from datetime import time as time_type
-
-                        time_val = time_type(hour, minute, second)
-
-                    result = datetime.combine(date_val, time_val)
-                    logger.debug(f"COMBINE_DATETIME({date_val}, {time_val}) = {result}")
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"COMBINE_DATETIME failed: {e}")
-                    result = None
-
-            node.details.update({"date": date_val, "time": time_val})
-
-        elif op_type == "DAY_OF_WEEK":
-            # Get day of week from a date (0=Monday, 6=Sunday)
-            date_val = self._evaluate_value(operation.get("subject"), context)
-
-            if date_val is None:
-                logger.warning("DAY_OF_WEEK: missing date value")
-                result = None
-            else:
-                try:
-                    # Parse date if it's a string
-                    if isinstance(date_val, str):
-                        date_val = (
-                            datetime.fromisoformat(date_val).date()
-                            if "T" in date_val
-                            else datetime.strptime(date_val, "%Y-%m-%d").date()
-                        )
-                    elif isinstance(date_val, datetime):
-                        date_val = date_val.date()
-
-                    # weekday() returns 0=Monday, 6=Sunday
-                    result = date_val.weekday()
-                    logger.debug(f"DAY_OF_WEEK({date_val}) = {result}")
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"DAY_OF_WEEK failed: {e}")
-                    result = None
-
-            node.details.update({"date": date_val, "day_of_week": result})
-
-        elif "_DATE" in op_type:
-            values = [self._evaluate_value(v, context) for v in operation["values"]]
-            unit = operation.get("unit", "days")
-            result = self._evaluate_date_operation(op_type, values, unit, context)
-            node.details.update({"evaluated_values": values, "unit": unit})
-
-        elif op_type in self.COMPARISON_OPS:
-            subject = None
-            value = None
-
-            if "subject" in operation:
-                subject = self._evaluate_value(operation["subject"], context)
-                value = self._evaluate_value(operation["value"], context)
-
-            elif "values" in operation:
-                values = [self._evaluate_value(v, context) for v in operation["values"]]
-                subject = values[0]
-                value = values[1]
-            else:
-                logger.warning("Comparison operation expects two values or subject/value.")
-
-            result = self._evaluate_comparison(op_type, subject, value)
-
-            node.details.update(
-                {
-                    "subject_value": subject,
-                    "comparison_value": value,
-                    "comparison_type": op_type,
-                }
-            )
-
-        elif op_type in self.AGGREGATE_OPS and "values" in operation:
-            # The operation dict has legal_basis as metadata alongside operation/values
-            # but we only need to evaluate the 'values' list, ignoring legal_basis metadata
-            values = [self._evaluate_value(v, context) for v in operation["values"]]
-            result = self._evaluate_aggregate_ops(op_type, values)
-            node.details.update(
-                {
-                    "raw_values": operation["values"],
-                    "evaluated_values": values,
-                    "arithmetic_type": op_type,
-                }
-            )
-
-        elif op_type == "GET":
-            subject = self._evaluate_value(operation["subject"], context)
-            values = self._evaluate_value(operation.get("values", []), context)
-            result = values.get(subject)
-            node.details.update({"subject_value": subject, "allowed_values": values})
-            logger.debug(f"GET {subject} from {values}: {result}")
+    @staticmethod
+    def _day_of_week(date_val: Any) -> tuple[int | None, Any]:
+        """Get day of week from a date (0=Monday, 6=Sunday), returning the parsed date as well"""
+        if date_val is None:
+            logger.warning("DAY_OF_WEEK: missing date value")
+            return None, date_val
 
-        else:
+        try:
+            # Parse date if it's a string
+            if isinstance(date_val, str):
+                date_val = (
+                    datetime.fromisoformat(date_val).date()
+                    if "T" in date_val
+                    else datetime.strptime(date_val, "%Y-%m-%d").date()
+                )
+            elif isinstance(date_val, datetime):
+                date_val = date_val.date()
+
+            # weekday() returns 0=Monday, 6=Sunday
+            result = date_val.weekday()
+            logger.debug("DAY_OF_WEEK(%s) = %s", date_val, result)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"DAY_OF_WEEK failed: {e}")
             result = None
-            node.details["error"] = "Invalid operation format"
-            logger.warning(f"Not matched to any operation {op_type}")
-
-        node.result = result
-        context.pop_path()
-        return result
 
-    def _evaluate_value(self, value: Any, context: RuleContext) -> Any:
-        """Evaluate a value which might be a number, operation, or reference"""
-        if isinstance(value, int | float | bool | date | datetime) or value is None:
-            return value
-        elif isinstance(value, dict) and "operation" in value:
-            return self._evaluate_operation(value, context)
-        else:
-            return context.resolve_value(value)
+        return result, date_val
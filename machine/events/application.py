@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from eventsourcing.application import Application
+from eventsourcing.domain import Aggregate
+from eventsourcing.persistence import Notification, Recording
+from eventsourcing.utils import Environment, EnvType
+
+logger = logging.getLogger(__name__)
+
+# Handler for the domain events saved in one go, with their aggregates by id in the state they were saved in
+EventSubscriber = Callable[[list[Any], dict[UUID, Aggregate]], None]
+
+
+@dataclass
+class IndexRebuild:
+    """The events and aggregates an application rebuilt its indexes from, and how long that took"""
+
+    application: str
+    events: int
+    aggregates: int
+    seconds: float
+
+
+class SubscribableApplication(Application):
+    """
+    Application that calls its subscribers with the domain events it saves.
+    Subscribers run right after the events are recorded, before any followers in the system process them.
+    """
+
+    # Take a snapshot of an aggregate every this many events, so loading it replays at most that many events; 0 for
+    # no snapshots. The environment variable SNAPSHOTTING_INTERVAL, or <APPLICATION NAME>_SNAPSHOTTING_INTERVAL,
+    # overrides it.
+    SNAPSHOTTING_INTERVAL = 50
+
+    # The aggregate class of the application that is snapshotted
+    snapshotted_aggregate: type[Aggregate] | None = None
+
+    # Number of notifications read from the recorder at a time when the indexes are rebuilt
+    REBUILD_PAGE_SIZE = 10_000
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._subscribers: list[EventSubscriber] = []
+        # The aggregates passed to the save in progress, per thread
+        self._saving = threading.local()
+
+    def construct_env(self, name: str, env: EnvType | None = None) -> Environment:
+        environment = super().construct_env(name, env)
+        interval = int(environment.get("SNAPSHOTTING_INTERVAL", self.SNAPSHOTTING_INTERVAL))
+        if interval > 0 and self.snapshotted_aggregate is not None:
+            environment["IS_SNAPSHOTTING_ENABLED"] = "y"
+            self.snapshotting_intervals = {self.snapshotted_aggregate: interval}
+        return environment
+
+    def subscribe(self, subscriber: EventSubscriber) -> None:
+        """Call subscriber with the domain events and aggregates of every save"""
+        self._subscribers.append(subscriber)
+
+    def save(self, *objs: Any, **kwargs: Any) -> list[Recording]:
+        """Save the aggregates, which are handed to _notify so it doesn't need to load them again"""
+        self._saving.aggregates = {obj.id: obj for obj in objs if isinstance(obj, Aggregate)}
+        try:
+            return super().save(*objs, **kwargs)
+        finally:
+            self._saving.aggregates = {}
+
+    def saved_aggregates(self, domain_events: list[Any]) -> dict[UUID, Aggregate]:
+        """The aggregates of the domain events being saved by id, loaded only when their events were saved alone"""
+        saving = getattr(self._saving, "aggregates", {})
+        aggregates = {}
+        for domain_event in domain_events:
+            aggregate_id = domain_event.originator_id
+            if aggregate_id not in aggregates:
+                aggregate = saving.get(aggregate_id)
+                aggregates[aggregate_id] = aggregate if aggregate is not None else self.repository.get(aggregate_id)
+        return aggregates
+
+    def _notify(self, recordings: list[Recording]) -> None:
+        if self._subscribers:
+            domain_events = [recording.domain_event for recording in recordings]
+            aggregates = self.saved_aggregates(domain_events)
+            for subscriber in self._subscribers:
+                subscriber(domain_events, aggregates)
+        super()._notify(recordings)
+
+    def rebuild_indexes(self, page_size: int | None = None) -> IndexRebuild:
+        """
+        Replace the in-memory indexes with ones rebuilt from the notification log, for an application that starts on
+        an event store that already holds aggregates. The log is streamed once, page by page, and the aggregates are
+        reconstructed from the streamed events rather than loaded from the recorder one by one.
+        """
+        start = time.perf_counter()
+        page_size = page_size or self.REBUILD_PAGE_SIZE
+        self._clear_indexes()
+
+        aggregates: dict[UUID, Aggregate] = {}
+        events = 0
+        position = 0
+        while True:
+            page = self.recorder.select_notifications(position, page_size, inclusive_of_start=False)
+            domain_events = [self.mapper.to_domain_event(notification) for notification in page]
+            for domain_event in domain_events:
+                aggregate_id = domain_event.originator_id
+                aggregates[aggregate_id] = domain_event.mutate(aggregates.get(aggregate_id))
+            self._rebuild_page(page, domain_events)
+            events += len(page)
+            if len(page) < page_size:
+                break
+            position = page[-1].id
+
+        for aggregate in aggregates.values():
+            self._rebuild_aggregate(aggregate)
+
+        rebuild = IndexRebuild(self.name, events, len(aggregates), time.perf_counter() - start)
+        logger.info(
+            "Rebuilt the indexes of %s from %d events of %d aggregates in %.3fs",
+            rebuild.application,
+            rebuild.events,
+            rebuild.aggregates,
+            rebuild.seconds,
+        )
+        return rebuild
+
+    def _clear_indexes(self) -> None:
+        """Empty the in-memory indexes before they are rebuilt"""
+
+    def _rebuild_page(self, notifications: list[Notification], domain_events: list[Any]) -> None:
+        """Add a page of the notification log, in the order it was recorded, to the indexes being rebuilt"""
+
+    def _rebuild_aggregate(self, aggregate: Aggregate) -> None:
+        """Add an aggregate, in its current state, to the indexes being rebuilt"""
@@ -34,6 +34,23 @@ Transcoding.register(CaseStatusTranscoding)
 
 
 class Case(Aggregate):
+    class Snapshot(Aggregate.Snapshot):
+        """Snapshot of a case, which restores the claim ids as a set and the status as a CaseStatus"""
+
+        @classmethod
+        def take(cls, aggregate: "Case") -> "Case.Snapshot":
+            snapshot = super().take(aggregate)
+            if snapshot.state.get("claim_ids") is not None:
+                snapshot.state["claim_ids"] = list(snapshot.state["claim_ids"])
+            return snapshot
+
+        def mutate(self, _: None) -> "Case":
+            case = super().mutate(_)
+            if case.claim_ids is not None:
+                case.claim_ids = set(case.claim_ids)
+            case.status = CaseStatus(case.status)
+            return case
+
     @event("Submitted")
     def __init__(
         self,
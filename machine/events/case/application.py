@@ -1,15 +1,35 @@
 import json
 import random
+import threading
+from collections.abc import Iterator
+from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
 from uuid import UUID
 
-from eventsourcing.application import Application
+from eventsourcing.persistence import Notification, Recording, StoredEvent
 
+from ..application import SubscribableApplication
+from ..table import ColumnarTable
 from .aggregate import Case, CaseStatus
 
 
-class CaseManager(Application):
+@dataclass
+class EventCursor:
+    """
+    Position up to which the events, or the events of one case, have been read.
+    That is the notification id of the last event read, or its version within the case.
+    """
+
+    case_id: UUID | str | None = None
+    position: int = 0
+
+    def __post_init__(self) -> None:
+        if self.case_id is not None and not isinstance(self.case_id, UUID):
+            self.case_id = UUID(str(self.case_id))
+
+
+class CaseManager(SubscribableApplication):
     """
     Application service for managing service cases.
     Handles case submission, verification, decisions, and objections.
@@ -18,10 +38,22 @@ class CaseManager(Application):
     # SAMPLE_RATE = 0.50
     SAMPLE_RATE = 0.0
 
+    # Number of events read from the recorder at a time
+    EVENTS_PAGE_SIZE = 1000
+
+    snapshotted_aggregate = Case
+
     def __init__(self, rules_engine, **kwargs) -> None:
         super().__init__(**kwargs)
         self.rules_engine = rules_engine
         self._case_index: dict[tuple[str, str, str], str] = {}  # (bsn, service, law) -> case_id
+        # (service, law) -> {case_id: case} of the approved decided cases, kept up to date from the saved events
+        self._approved_index: dict[tuple[str, str], dict[UUID, Case]] = {}
+        # Evaluations read the approved cases on other threads than the one that saves the cases
+        self._approved_lock = threading.Lock()
+        # Source tables for laws with source_type "cases" and "events", appended to as events are saved
+        self.cases_table = ColumnarTable()
+        self.events_table = ColumnarTable()
         # self.follow()
 
     @staticmethod
@@ -34,6 +66,78 @@ class CaseManager(Application):
         key = self._index_key(case.bsn, case.service, case.law)
         self._case_index[key] = str(case.id)
 
+    def _notify(self, recordings: list[Recording]) -> None:
+        """Update the case indexes and tables before subscribers and followers see the events"""
+        for recording in recordings:
+            self.events_table.append(self._event_row(recording.notification))
+        cases = self.saved_aggregates([recording.domain_event for recording in recordings])
+        for case in cases.values():
+            self._project_case(case)
+        super()._notify(recordings)
+
+    def _clear_indexes(self) -> None:
+        self._case_index.clear()
+        self._historical_case_ids = []
+        with self._approved_lock:
+            self._approved_index.clear()
+        self.cases_table = ColumnarTable()
+        self.events_table = ColumnarTable()
+
+    def _rebuild_page(self, notifications: list[Notification], domain_events: list) -> None:
+        for notification in notifications:
+            self.events_table.append(self._event_row(notification))
+
+    def _rebuild_aggregate(self, case: Case) -> None:
+        if case.rulespec_uuid == "historical":
+            self._historical_case_ids.append(str(case.id))
+        else:
+            self._index_case(case)
+        self._project_case(case)
+
+    def _project_case(self, case: Case) -> None:
+        """Bring the approved case index and the cases table up to date with the state of a case"""
+        with self._approved_lock:
+            cases = self._approved_index.setdefault((case.service, case.law), {})
+            if case.status == CaseStatus.DECIDED and case.approved:
+                # Replacing a case keeps its place in the order of decision
+                cases[case.id] = case
+            else:
+                cases.pop(case.id, None)
+
+        self.cases_table.upsert(
+            case.id,
+            {
+                "case_id": str(case.id),
+                "bsn": case.bsn,
+                "service": case.service,
+                "law": case.law,
+                "status": case.status.value if hasattr(case.status, "value") else str(case.status),
+                "approved": case.approved,
+                "created_at": case.created_at,
+                "year": case.created_at.year if case.created_at else None,
+                # Flatten parameters for filtering
+                **(case.parameters or {}),
+            },
+        )
+
+    @staticmethod
+    def _event_row(stored_event: StoredEvent) -> dict:
+        """Row of the events table for a stored case event"""
+        # Decode the state from bytes to JSON
+        state_data = json.loads(stored_event.state.decode("utf-8"))
+
+        # Extract timestamp if available
+        timestamp = state_data.get("timestamp", {}).get("_data_", None)
+        if timestamp:
+            timestamp = datetime.fromisoformat(timestamp)
+
+        return {
+            "case_id": stored_event.originator_id,
+            "timestamp": timestamp or str(stored_event.originator_version),
+            "event_type": stored_event.topic.split(".")[-1],
+            "data": {k: v for k, v in state_data.items() if k not in ["timestamp", "originator_topic"]},
+        }
+
     @staticmethod
     def _results_match(claimed_result: dict, verified_result: dict) -> bool:
         """
@@ -403,6 +507,11 @@ class CaseManager(Application):
                 cases.append(case)
         return cases
 
+    def get_approved_cases(self, service_type: str, law: str) -> list[Case]:
+        """Get the decided and approved cases for a service and law, in the order they were decided"""
+        with self._approved_lock:
+            return list(self._approved_index.get((service_type, law), {}).values())
+
     def get_all_cases(self) -> list[Case]:
         """Get all cases in the system, including historical seeded cases"""
         # Get cases from the main index
@@ -415,42 +524,27 @@ class CaseManager(Application):
                     cases.append(case)
         return cases
 
-    def get_events(self, case_id=None):
-        notification_log = self.notification_log
-        events = []
+    def get_events(self, case_id: UUID | str | None = None, page_size: int | None = None) -> list[dict]:
+        """Get all events, or the events of one case, in the order they were recorded"""
+        return list(self.read_events(EventCursor(case_id), page_size))
 
-        start = 1
+    def read_events(self, cursor: EventCursor, page_size: int | None = None) -> Iterator[dict]:
+        """
+        Stream the events recorded after the cursor, reading the recorder page by page.
+        The cursor advances as events are yielded, so reading it again only returns new events.
+        """
+        page_size = page_size or self.EVENTS_PAGE_SIZE
         while True:
-            try:
-                notifications = notification_log.select(start=start, limit=10)
-                if not notifications:
-                    break
-
-                for notification in notifications:
-                    if case_id is not None and notification.originator_id != case_id:
-                        continue
-
-                    # Decode the state from bytes to JSON
-                    state_data = json.loads(notification.state.decode("utf-8"))
-
-                    # Extract timestamp if available
-                    timestamp = state_data.get("timestamp", {}).get("_data_", None)
-                    if timestamp:
-                        timestamp = datetime.fromisoformat(timestamp)
-
-                    events.append(
-                        {
-                            "case_id": notification.originator_id,
-                            "timestamp": timestamp or str(notification.originator_version),
-                            "event_type": notification.topic.split(".")[-1],
-                            "data": {k: v for k, v in state_data.items() if k not in ["timestamp", "originator_topic"]},
-                        }
-                    )
-
-                start += 10
-            except ValueError:
-                break
-
-        events.sort(key=lambda x: str(x["timestamp"]))
-
-        return events
+            if cursor.case_id is None:
+                # Notifications are numbered in the order they were recorded
+                page = self.recorder.select_notifications(cursor.position, page_size, inclusive_of_start=False)
+            else:
+                # The recorder selects the events of a single case by their version
+                page = self.recorder.select_events(cursor.case_id, gt=cursor.position, limit=page_size)
+
+            for stored_event in page:
+                cursor.position = stored_event.id if cursor.case_id is None else stored_event.originator_version
+                yield self._event_row(stored_event)
+
+            if len(page) < page_size:
+                return
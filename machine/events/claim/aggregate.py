@@ -30,6 +30,14 @@ Transcoding.register(ClaimStatusTranscoding)
 
 
 class Claim(Aggregate):
+    class Snapshot(Aggregate.Snapshot):
+        """Snapshot of a claim, which restores the status as a ClaimStatus"""
+
+        def mutate(self, _: None) -> "Claim":
+            claim = super().mutate(_)
+            claim.status = ClaimStatus(claim.status)
+            return claim
+
     @event("Created")
     def __init__(
         self,
@@ -1,17 +1,21 @@
+import threading
 from typing import Any
 from uuid import UUID
 
-from eventsourcing.application import Application
+from eventsourcing.persistence import Notification
 
+from ..application import SubscribableApplication
 from .aggregate import Claim, ClaimStatus
 
 
-class ClaimManager(Application):
+class ClaimManager(SubscribableApplication):
     """
     Application service for managing claims.
     Claims can be made against services, with optional case references.
     """
 
+    snapshotted_aggregate = Claim
+
     def __init__(self, rules_engine, **kwargs) -> None:
         super().__init__(**kwargs)
         self.rules_engine = rules_engine
@@ -22,7 +26,38 @@ class ClaimManager(Application):
         self._bsn_index: dict[str, list[str]] = {}  # claimant -> [claim_ids]
         self._status_index: dict[ClaimStatus, list[str]] = {status: [] for status in ClaimStatus}
         self._bsn_service_law_index: dict[tuple[str, str, str], dict[str, str]] = {}  # (service, key) -> claim_id
+        # Projection of the claim events: (bsn, service, law) -> {key: (status, new_value)}
+        self._claim_values: dict[tuple[str, str, str], dict[str, tuple[ClaimStatus, Any]]] = {}
+        self._claim_value_keys: dict[UUID, tuple[tuple[str, str, str], str]] = {}  # claim_id -> (bsn, ...), key
+        # Evaluations read the projection on other threads than the one that saves the claims
+        self._claim_values_lock = threading.Lock()
         self._case_manager = None
+        self.subscribe(lambda events, claims: self._project_claim_values(events))
+
+    def _project_claim_values(self, events: list) -> None:
+        """Keep the status and value of every claim by (bsn, service, law) and key up to date"""
+        with self._claim_values_lock:
+            for event in events:
+                if isinstance(event, Claim.Created | Claim.Reset):
+                    self._remove_claim_value(event.originator_id)
+                    bsn_service_law = (event.bsn, event.service, event.law)
+                    values = self._claim_values.setdefault(bsn_service_law, {})
+                    values[event.key] = (ClaimStatus.PENDING, event.new_value)
+                    self._claim_value_keys[event.originator_id] = (bsn_service_law, event.key)
+                elif isinstance(event, Claim.Approved | Claim.AutoApproved):
+                    self._set_claim_status(event.originator_id, ClaimStatus.APPROVED)
+                elif isinstance(event, Claim.Rejected):
+                    self._set_claim_status(event.originator_id, ClaimStatus.REJECTED)
+
+    def _remove_claim_value(self, claim_id: UUID) -> None:
+        if claim_id in self._claim_value_keys:
+            bsn_service_law, key = self._claim_value_keys.pop(claim_id)
+            self._claim_values[bsn_service_law].pop(key, None)
+
+    def _set_claim_status(self, claim_id: UUID, status: ClaimStatus) -> None:
+        bsn_service_law, key = self._claim_value_keys[claim_id]
+        _, new_value = self._claim_values[bsn_service_law][key]
+        self._claim_values[bsn_service_law][key] = (status, new_value)
 
     def _index_claim(self, claim: Claim) -> None:
         """Add claim to all indexes"""
@@ -54,6 +89,20 @@ class ClaimManager(Application):
             self._bsn_service_law_index[(claim.bsn, claim.service, claim.law)] = {}
         self._bsn_service_law_index[(claim.bsn, claim.service, claim.law)][claim.key] = claim_id
 
+    def _clear_indexes(self) -> None:
+        for index in (self._service_index, self._case_index, self._claimant_index, self._bsn_index):
+            index.clear()
+        self._bsn_service_law_index.clear()
+        with self._claim_values_lock:
+            self._claim_values.clear()
+            self._claim_value_keys.clear()
+
+    def _rebuild_page(self, notifications: list[Notification], domain_events: list) -> None:
+        self._project_claim_values(domain_events)
+
+    def _rebuild_aggregate(self, claim: Claim) -> None:
+        self._index_claim(claim)
+
     @property
     def case_manager(self):
         return self._case_manager
@@ -125,6 +174,56 @@ class ClaimManager(Application):
 
         return str(claim.id)
 
+    def submit_claims_bulk(self, claims: list[dict[str, Any]], auto_approve: bool = False) -> list[str]:
+        """
+        Submit many claims in one transaction. Each claim is a dict with the arguments of submit_claim, except
+        auto_approve which applies to all of them. All claims are validated before any is saved. Returns the ids
+        of the claims, in order.
+        """
+        required = ("service", "key", "new_value", "reason", "claimant", "law", "bsn")
+        for i, arguments in enumerate(claims):
+            missing = [name for name in required if name not in arguments]
+            if missing:
+                raise ValueError(f"Claim {i} is missing {', '.join(missing)}")
+
+        aggregates: dict[tuple[str, str, str, str], Claim] = {}
+        new_claims = []
+        claim_ids = []
+        for arguments in claims:
+            bsn_service_law_key = (arguments["bsn"], arguments["service"], arguments["law"], arguments["key"])
+            claim = aggregates.get(bsn_service_law_key)
+            if claim is None:
+                claim_id = self._bsn_service_law_index.get(bsn_service_law_key[:3], {}).get(arguments["key"])
+                claim = self.get_claim(claim_id) if claim_id else None
+            if claim is not None:
+                claim.reset(**arguments)
+            else:
+                claim = Claim(**arguments)
+                new_claims.append(claim)
+            if auto_approve:
+                claim.auto_approve(verified_by=arguments["claimant"], verified_value=arguments["new_value"])
+            aggregates[bsn_service_law_key] = claim
+            claim_ids.append(str(claim.id))
+
+        self.save(*aggregates.values())
+        for claim in new_claims:
+            self._index_claim(claim)
+
+        cases = {}
+        for claim in aggregates.values():
+            if claim.case_id:
+                if claim.case_id not in cases:
+                    cases[claim.case_id] = self.case_manager.get_case_by_id(claim.case_id)
+                case = cases[claim.case_id]
+                if case:
+                    case.add_claim(claim.id)
+                    if auto_approve:
+                        case.approve_claim(claim.id)
+        if any(cases.values()):
+            self.case_manager.save(*(case for case in cases.values() if case))
+
+        return claim_ids
+
     def approve_claim(self, claim_id: str, verified_by: str, verified_value: Any) -> None:
         """Approve a claim with verified value"""
         claim = self.get_claim(claim_id)
@@ -181,14 +280,18 @@ class ClaimManager(Application):
             approved: If True, only return approved claims. If False, return approved and submitted claims.
             include_rejected: If True, also include rejected claims in the results.
         """
+        allowed_statuses = ClaimManager._allowed_statuses(approved, include_rejected)
+        return [claim for claim in claims if claim.status in allowed_statuses]
+
+    @staticmethod
+    def _allowed_statuses(approved: bool, include_rejected: bool = False) -> set[ClaimStatus]:
         if approved:
-            return [claim for claim in claims if claim.status == ClaimStatus.APPROVED]
+            return {ClaimStatus.APPROVED}
 
         allowed_statuses = {ClaimStatus.APPROVED, ClaimStatus.PENDING}
         if include_rejected:
             allowed_statuses.add(ClaimStatus.REJECTED)
-
-        return [claim for claim in claims if claim.status in allowed_statuses]
+        return allowed_statuses
 
     def get_claims_by_service(
         self, service: str, approved: bool = False, include_rejected: bool = False
@@ -228,10 +331,19 @@ class ClaimManager(Application):
         key_index = self._bsn_service_law_index.get((bsn, service, law))
         if not key_index:
             return None
-        claims = {key: self.get_claim(claim_id) for key, claim_id in key_index.items()}
-        filtered_claims = {
-            key: claim
-            for key, claim in claims.items()
-            if claim in self._filter_claims_by_status([claim], approved, include_rejected)
-        }
+        # Only the claims with a matching status are loaded from the event store
+        keys = self.get_claim_values(bsn, service, law, approved, include_rejected) or {}
+        filtered_claims = {key: self.get_claim(claim_id) for key, claim_id in key_index.items() if key in keys}
         return filtered_claims if filtered_claims else None
+
+    def get_claim_values(
+        self, bsn: str, service: str, law: str, approved: bool = False, include_rejected: bool = False
+    ) -> dict[str, Any] | None:
+        """Get the new values of the claims filtered by status by key, without loading the claims"""
+        allowed_statuses = self._allowed_statuses(approved, include_rejected)
+        with self._claim_values_lock:
+            claim_values = self._claim_values.get((bsn, service, law))
+            if not claim_values:
+                return None
+            values = {key: new_value for key, (status, new_value) in claim_values.items() if status in allowed_statuses}
+        return values if values else None
@@ -0,0 +1,265 @@
+import threading
+from collections.abc import Hashable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ..source_index import SourceIndex
+
+
+class ColumnarTable:
+    """
+    Source table that is maintained incrementally from events instead of rebuilt for every query.
+
+    Rows are kept as one list per column. Appending or updating a row only touches those lists and
+    the positions of the row in the index, so a query through the index right after a change costs a
+    lookup and building the selected rows, regardless of the size of the table. The DataFrame of the
+    whole table is materialized for queries the index can't answer, and once the table stays the same
+    for a number of queries, after which the selected rows are taken from it.
+
+    Writes and queries may come from different threads: they take a lock, except for building the
+    DataFrame, which is built from a copy of the columns and only kept if the table didn't change.
+    """
+
+    # Queries through the index after a change before the whole table is materialized. Taking rows from the
+    # DataFrame is cheaper than building them, which pays off for a table that isn't changing.
+    MATERIALIZE_AFTER_QUERIES = 8
+
+    def __init__(self) -> None:
+        self._columns: dict[str, list] = {}
+        self._positions: dict[Hashable, int] = {}
+        self._length = 0
+        self._df: pd.DataFrame | None = None
+        self._index: TableIndex | None = None
+        self._queries = 0
+        # Incremented by every change
+        self._version = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, row: dict[str, Any]) -> None:
+        """Add a row at the end of the table"""
+        with self._lock:
+            for column, value in row.items():
+                values = self._columns.get(column)
+                if values is None:
+                    # Earlier rows don't have the new column
+                    values = self._columns[column] = [None] * self._length
+                values.append(value)
+            self._length += 1
+            for column, values in self._columns.items():
+                if len(values) < self._length:
+                    values.append(None)
+            self._changed()
+            if self._index is not None:
+                self._index.add(self._length - 1)
+
+    def upsert(self, key: Hashable, row: dict[str, Any]) -> None:
+        """Replace the row with key, or append it when the table doesn't have it yet"""
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                self._positions[key] = self._length
+                self.append(row)
+                return
+
+            old_row = {column: values[position] for column, values in self._columns.items()}
+            for column, values in self._columns.items():
+                values[position] = row.get(column)
+            for column, value in row.items():
+                if column not in self._columns:
+                    self._columns[column] = [None] * self._length
+                    self._columns[column][position] = value
+            self._changed()
+            if self._index is not None:
+                self._index.update(position, old_row)
+
+    def dataframe(self) -> pd.DataFrame:
+        """The whole table as a DataFrame, shared by all queries until the table changes"""
+        with self._lock:
+            if self._df is not None:
+                return self._df
+            version = self._version
+            columns = {column: list(values) for column, values in self._columns.items()}
+
+        # Built without holding up writes, and only shared when no write came in between
+        df = pd.DataFrame(columns)
+        with self._lock:
+            if self._version == version:
+                self._df = df
+        return df
+
+    def index(self) -> "TableIndex":
+        """Index on all columns of the table, built per column on first use and kept up to date after that"""
+        with self._lock:
+            if self._index is None:
+                self._index = TableIndex(self)
+            return self._index
+
+    def rows(self, positions: np.ndarray) -> pd.DataFrame:
+        """The rows at the given (sorted) positions, built from the columns until the table is materialized"""
+        with self._lock:
+            if self._df is None:
+                self._queries += 1
+                if self._queries <= self.MATERIALIZE_AFTER_QUERIES:
+                    return pd.DataFrame(
+                        {
+                            column: [values[position] for position in positions]
+                            for column, values in self._columns.items()
+                        },
+                        index=positions,
+                    )
+        # Rows are never removed, so the positions are in any DataFrame of the table built from now on
+        df = self.dataframe()
+        if len(positions) and positions[-1] + 1 - positions[0] == len(positions):
+            return df.iloc[positions[0] : positions[-1] + 1]
+        return df.iloc[positions]
+
+    def _changed(self) -> None:
+        self._df = None
+        self._queries = 0
+        self._version += 1
+
+
+class _Positions:
+    """Sorted row positions of one value, in a buffer that grows for rows appended at the end"""
+
+    __slots__ = ("array", "size")
+
+    def __init__(self) -> None:
+        self.array = np.empty(4, dtype=np.intp)
+        self.size = 0
+
+    def add(self, position: int) -> None:
+        if self.size and position < self.array[self.size - 1]:
+            # A row that got this value in an update: insert into a new array, the selected ones stay as they are
+            self.array = np.insert(self.view(), np.searchsorted(self.view(), position), position)
+            self.size += 1
+            return
+        if self.size == len(self.array):
+            array = np.empty(2 * len(self.array), dtype=np.intp)
+            array[: self.size] = self.array
+            self.array = array
+        self.array[self.size] = position
+        self.size += 1
+
+    def remove(self, position: int) -> None:
+        self.array = np.delete(self.view(), np.searchsorted(self.view(), position))
+        self.size -= 1
+
+    def view(self) -> np.ndarray:
+        return self.array[: self.size]
+
+
+class TableIndex(SourceIndex):
+    """
+    Hash indexes on the columns of a ColumnarTable. The table adds the positions of new and updated rows to
+    the indexes that are built, instead of having them rebuilt.
+    """
+
+    def __init__(self, table: ColumnarTable) -> None:
+        self.table = table
+        # Columns with unhashable values (e.g. lists) can't be indexed
+        self._unindexable: set[str] = set()
+        self._groups: dict[str, dict[Any, _Positions]] = {}
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.table.dataframe()
+
+    @property
+    def columns(self) -> set[str]:
+        return set(self.table._columns) - self._unindexable
+
+    @staticmethod
+    def _is_missing(value: Any) -> bool:
+        # Like groupby with dropna, rows without a value are not indexed
+        return value is None or (isinstance(value, float) and np.isnan(value))
+
+    def _index(self, column: str) -> dict[Any, _Positions] | None:
+        """Row positions by value for a column, None if the column can't be indexed"""
+        groups = self._groups.get(column)
+        if groups is not None:
+            return groups
+        if column not in self.table._columns or column in self._unindexable:
+            return None
+
+        groups = {}
+        try:
+            for position, value in enumerate(self.table._columns[column]):
+                if not self._is_missing(value):
+                    if value not in groups:
+                        groups[value] = _Positions()
+                    groups[value].add(position)
+        except TypeError:
+            self._unindexable.add(column)
+            return None
+        self._groups[column] = groups
+        return groups
+
+    def _add(self, column: str, value: Any, position: int) -> None:
+        if self._is_missing(value):
+            return
+        groups = self._groups[column]
+        try:
+            positions = groups.get(value)
+        except TypeError:
+            # An unhashable value: the column can't be indexed any more
+            del self._groups[column]
+            self._unindexable.add(column)
+            return
+        if positions is None:
+            positions = groups[value] = _Positions()
+        positions.add(position)
+
+    def add(self, position: int) -> None:
+        """Add the row appended at position to the built indexes"""
+        for column in list(self._groups):
+            self._add(column, self.table._columns[column][position], position)
+
+    def update(self, position: int, old_row: dict[str, Any]) -> None:
+        """Move the row at position to the groups of its new values in the built indexes"""
+        for column in list(self._groups):
+            old, new = old_row.get(column), self.table._columns[column][position]
+            if old is new or (not self._is_missing(old) and not self._is_missing(new) and old == new):
+                continue
+            if not self._is_missing(old):
+                positions = self._groups[column][old]
+                positions.remove(position)
+                if not positions.size:
+                    del self._groups[column][old]
+            self._add(column, new, position)
+
+    def select(self, column: str, value: Any) -> np.ndarray | None:
+        if not isinstance(value, Hashable):
+            return None
+        with self.table._lock:
+            groups = self._index(column)
+            if groups is None:
+                return None
+            positions = groups.get(value)
+            # A view that later writes don't change: they replace the array or write past its end
+            return positions.view() if positions is not None else _NO_ROWS
+
+    def select_any(self, column: str, values: Any) -> np.ndarray | None:
+        if not isinstance(values, list | tuple | set) or not all(isinstance(v, Hashable) for v in values):
+            return None
+        with self.table._lock:
+            groups = self._index(column)
+            if groups is None:
+                return None
+            selected = [groups[value].view() for value in set(values) if value in groups]
+        if not selected:
+            return _NO_ROWS
+        if len(selected) == 1:
+            return selected[0]
+        return np.unique(np.concatenate(selected))
+
+    def rows(self, positions: np.ndarray) -> pd.DataFrame:
+        return self.table.rows(positions)
+
+
+_NO_ROWS = np.array([], dtype=np.intp)
@@ -1,77 +1,128 @@
 import logging
-from contextlib import contextmanager
+from collections.abc import Callable
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+# What indent_block returns when debug logging is disabled; nullcontext can be entered any number of times
+_NO_BLOCK = nullcontext()
+
+
+@dataclass(frozen=True)
+class _IndentState:
+    level: int = 0
+    active_branches: frozenset[int] = frozenset()
+    double_lines: frozenset[int] = frozenset()
+
+
+# Per thread and asyncio task, so concurrent evaluations each log their own tree. The state is immutable and
+# replaced on every change, so a context copied into a worker thread doesn't share it with the original
+_indent_state: ContextVar[_IndentState] = ContextVar("indent_state", default=_IndentState())
 
 
 class GlobalIndent:
-    """Global indentation and tree state"""
+    """Indentation and tree state of the current context"""
 
-    _level = 0
     _tree_chars_single = {"pipe": "│", "branch": "├──", "leaf": "└──", "space": " " * 3}
     _tree_chars_double = {"pipe": "║", "branch": "║──", "leaf": "╚══", "space": " " * 3}
-    _active_branches = set()
-    _double_lines = set()
 
     @classmethod
     def increase(cls, double_line: bool = False) -> None:
-        cls._level += 1
-        cls._active_branches.add(cls._level - 1)
-        if double_line:
-            cls._double_lines.add(cls._level - 1)
+        state = _indent_state.get()
+        _indent_state.set(
+            _IndentState(
+                state.level + 1,
+                state.active_branches | {state.level},
+                state.double_lines | {state.level} if double_line else state.double_lines,
+            )
+        )
 
     @classmethod
     def decrease(cls) -> None:
-        if cls._level > 0:
+        state = _indent_state.get()
+        if state.level > 0:
             # No longer active - will show end corner
-            cls._active_branches.discard(cls._level - 1)
-            cls._double_lines.discard(cls._level - 1)
-            cls._level -= 1
+            _indent_state.set(
+                _IndentState(
+                    state.level - 1,
+                    state.active_branches - {state.level - 1},
+                    state.double_lines - {state.level - 1},
+                )
+            )
+
+    @classmethod
+    def get_level(cls) -> int:
+        return _indent_state.get().level
 
     @classmethod
     def get_indent(cls) -> str:
-        if cls._level == 0:
+        state = _indent_state.get()
+        if state.level == 0:
             return ""
 
         parts = []
         # For all levels except current, show pipe only if level is still active
-        for i in range(cls._level - 1):
-            if i in cls._active_branches:
-                chars = cls._tree_chars_double if i in cls._double_lines else cls._tree_chars_single
+        for i in range(state.level - 1):
+            if i in state.active_branches:
+                chars = cls._tree_chars_double if i in state.double_lines else cls._tree_chars_single
                 parts.append(f"{chars['pipe']}   ")
             else:
                 parts.append("    ")
 
         # For current level, use leaf if not active (end of block)
-        chars = cls._tree_chars_double if (cls._level - 1) in cls._double_lines else cls._tree_chars_single
-        is_end = (cls._level - 1) not in cls._active_branches
+        chars = cls._tree_chars_double if (state.level - 1) in state.double_lines else cls._tree_chars_single
+        is_end = (state.level - 1) not in state.active_branches
         parts.append(chars["leaf"] if is_end else chars["branch"])
         return "".join(parts)
 
 
 class IndentLogger:
-    """Logger wrapper that handles indentation using global state"""
+    """
+    Logger wrapper that handles indentation using the state of the current context.
+
+    Messages are only formatted when their level is enabled. Pass the values as %-style arguments, or a callable
+    returning the message, so the caller doesn't format them either:
+
+        logger.debug("Result of %s: %s", name, result)
+        logger.debug(lambda: f"Values: {expensive()}")
+    """
 
     def __init__(self, logger: logging.Logger) -> None:
         self._logger = logger
 
-    def debug(self, msg: str, *args, **kwargs) -> None:
-        self._logger.debug(f"{self.indent}{msg}", *args, **kwargs)
+    def debug(self, msg: str | Callable[[], str], *args, **kwargs) -> None:
+        self._log(logging.DEBUG, msg, args, kwargs)
 
-    def info(self, msg: str, *args, **kwargs) -> None:
-        self._logger.info(f"{self.indent}{msg}", *args, **kwargs)
+    def info(self, msg: str | Callable[[], str], *args, **kwargs) -> None:
+        self._log(logging.INFO, msg, args, kwargs)
 
-    def warning(self, msg: str, *args, **kwargs) -> None:
-        self._logger.warning(f"{self.indent}{msg}", *args, **kwargs)
+    def warning(self, msg: str | Callable[[], str], *args, **kwargs) -> None:
+        self._log(logging.WARNING, msg, args, kwargs)
 
-    def error(self, msg: str, *args, **kwargs) -> None:
-        self._logger.error(f"{self.indent}{msg}", *args, **kwargs)
+    def error(self, msg: str | Callable[[], str], *args, **kwargs) -> None:
+        self._log(logging.ERROR, msg, args, kwargs)
+
+    def _log(self, level: int, msg: str | Callable[[], str], args: tuple, kwargs: dict) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        if callable(msg):
+            msg = msg()
+        self._logger.log(level, f"{self.indent}{msg}", *args, **kwargs)
 
     @property
     def indent(self) -> str:
         return GlobalIndent.get_indent()
 
+    def indent_block(
+        self, initial_message: str | Callable[[], str] | None = None, double_line: bool = False
+    ) -> AbstractContextManager:
+        """Context manager for handling indentation blocks; does nothing when debug logging is disabled"""
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return _NO_BLOCK
+        return self._indent_block(initial_message, double_line)
+
     @contextmanager
-    def indent_block(self, initial_message: str | None = None, double_line: bool = False):
-        """Context manager for handling indentation blocks"""
+    def _indent_block(self, initial_message: str | Callable[[], str] | None, double_line: bool):
         if initial_message:
             self.debug(initial_message)
         GlobalIndent.increase(double_line)
@@ -3,7 +3,9 @@ Profile loader module for loading test profiles from YAML files.
 """
 
 import logging
-from datetime import datetime
+import os
+import threading
+from datetime import date, datetime
 from pathlib import Path
 from typing import Any
 
@@ -12,6 +14,9 @@ from dateutil.relativedelta import relativedelta
 
 logger = logging.getLogger(__name__)
 
+# The C loader of libyaml parses the profiles many times faster, if PyYAML was built with it
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def load_profiles_from_yaml(yaml_path: str | Path) -> dict[str, dict[str, Any]]:
     """
@@ -37,6 +42,11 @@ def load_profiles_from_yaml(yaml_path: str | Path) -> dict[str, dict[str, Any]]:
                 table_name:
                   - data rows...
     """
+    return _load_profiles_data(yaml_path)["profiles"]
+
+
+def _load_profiles_data(yaml_path: str | Path) -> dict[str, Any]:
+    """Load the whole profiles YAML file, with the badges added to the profiles"""
     yaml_path = Path(yaml_path)
 
     if not yaml_path.exists():
@@ -45,7 +55,7 @@ def load_profiles_from_yaml(yaml_path: str | Path) -> dict[str, dict[str, Any]]:
     logger.info(f"Loading profiles from {yaml_path}")
 
     with open(yaml_path) as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=SafeLoader)
 
     if not data or "profiles" not in data:
         raise ValueError(f"Invalid profile YAML file: {yaml_path}. Must contain 'profiles' key.")
@@ -63,7 +73,83 @@ def load_profiles_from_yaml(yaml_path: str | Path) -> dict[str, dict[str, Any]]:
         dynamic_properties = get_profile_properties(profile)
         profile["properties"] = static_properties + dynamic_properties
 
-    return profiles
+    return data
+
+
+class ProfileStore:
+    """
+    The profiles of a YAML file, parsed once and indexed by BSN/KVK number and by the KVK numbers of the businesses
+    in them. The file is parsed again when it changes, and on a new day, since the badges include the age.
+    """
+
+    def __init__(self, yaml_path: str | Path) -> None:
+        self.yaml_path = Path(yaml_path)
+        self._lock = threading.Lock()
+        self._stamp: tuple[int, int, date] | None = None
+        self._data: dict[str, Any] = {}
+        self._businesses: dict[str, dict[str, Any]] = {}
+
+    def _current(self) -> dict[str, Any]:
+        stat = os.stat(self.yaml_path)
+        stamp = (stat.st_mtime_ns, stat.st_size, date.today())
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    data = _load_profiles_data(self.yaml_path)
+                    self._businesses = self._index_businesses(data["profiles"])
+                    self._data = data
+                    self._stamp = stamp
+        return self._data
+
+    @staticmethod
+    def _index_businesses(profiles: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        businesses = {}
+        for profile in profiles.values():
+            for business in profile.get("sources", {}).get("KVK", {}).get("inschrijvingen", []):
+                if "kvk_nummer" in business:
+                    businesses.setdefault(str(business["kvk_nummer"]), business)
+        return businesses
+
+    @property
+    def data(self) -> dict[str, Any]:
+        """The whole YAML file, shared: not to be changed"""
+        return self._current()
+
+    @property
+    def profiles(self) -> dict[str, dict[str, Any]]:
+        """All profiles by BSN/KVK number, shared: not to be changed"""
+        return self._current()["profiles"]
+
+    def get(self, bsn: str) -> dict[str, Any] | None:
+        """
+        The profile of a BSN/KVK number, or None. The profile and its tables by service are copies, so a table can
+        be replaced without changing the store.
+        """
+        profile = self.profiles.get(bsn)
+        if profile is None:
+            return None
+        return {
+            **profile,
+            "sources": {service: dict(tables) for service, tables in profile.get("sources", {}).items()},
+        }
+
+    def get_business(self, kvk_nummer: str) -> dict[str, Any] | None:
+        """The KVK registration of a business in any of the profiles, or None"""
+        self._current()
+        return self._businesses.get(kvk_nummer)
+
+
+_stores: dict[Path, ProfileStore] = {}
+
+
+def get_profile_store(yaml_path: str | Path | None = None) -> ProfileStore:
+    """The shared store of a profiles YAML file, by default data/profiles.yaml of the project"""
+    if yaml_path is None:
+        yaml_path = get_project_root() / "data" / "profiles.yaml"
+    yaml_path = Path(yaml_path).resolve()
+    if yaml_path not in _stores:
+        _stores[yaml_path] = ProfileStore(yaml_path)
+    return _stores[yaml_path]
 
 
 def get_profile_properties(profile: dict) -> list[str]:
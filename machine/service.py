@@ -1,11 +1,13 @@
 import logging
 from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 
 import pandas as pd
 from eventsourcing.system import SingleThreadedRunner, System
 
+from .cache import ServiceReferenceCache
 from .context import PathNode
 from .engine import RulesEngine
 from .events.case.application import CaseManager
@@ -13,7 +15,10 @@ from .events.case.processor import CaseProcessor
 from .events.claim.application import ClaimManager
 from .events.claim.processor import ClaimProcessor
 from .logging_config import IndentLogger
+from .source_catalog import SourceCatalog
+from .source_index import SourceIndex
 from .utils import RuleResolver
+from .vectorized import BatchEvaluator
 
 logger = IndentLogger(logging.getLogger("service"))
 
@@ -55,40 +60,38 @@ class RuleService:
         """
         self.service_name = service_name
         self.services = services
-        self.resolver = RuleResolver()
-        self._engines: dict[str, dict[str, RulesEngine]] = {}
-        self.source_dataframes: dict[str, pd.DataFrame] = {}
+        # The laws are scanned once, for all services
+        self.resolver = services.resolver
+        # Compiled engines by (law, valid_from): one per version of a law
+        self._engines: dict[tuple[str, datetime], RulesEngine] = {}
+        # Engine lookup by (law, reference_date)
+        self._engines_cache: dict[tuple[str, str], RulesEngine] = {}
+        # Registered in the catalog of all services, which laws reading a table of any service use
+        self.source_dataframes, self.source_indexes = services.sources.register(service_name)
 
     def _get_engine(self, law: str, reference_date: str) -> RulesEngine:
         """Get or create RulesEngine instance for given law and date"""
-        # Use a single dictionary with tuple keys for more efficient lookup
         cache_key = (law, reference_date)
-
-        # Flatten the nested dictionaries into a single lookup
-        engines_cache = getattr(self, "_engines_cache", {})
-        if not hasattr(self, "_engines_cache"):
-            self._engines_cache = engines_cache
-
-        if cache_key in engines_cache:
-            return engines_cache[cache_key]
-
-        # If we need to create a new engine, keep the law dictionary for backward compatibility
-        if law not in self._engines:
-            self._engines[law] = {}
-
-        if reference_date not in self._engines[law]:
-            spec = self.resolver.get_rule_spec(law, reference_date, service=self.service_name)
-            if not spec:
-                raise ValueError(f"No rules found for law '{law}' at date '{reference_date}'")
-            if spec.get("service") != self.service_name:
-                raise ValueError(
-                    f"Rule spec service '{spec.get('service')}' does not match service '{self.service_name}'"
-                )
+        engine = self._engines_cache.get(cache_key)
+        if engine is not None:
+            return engine
+
+        spec = self.resolver.get_rule_spec(law, reference_date, service=self.service_name)
+        if not spec:
+            raise ValueError(f"No rules found for law '{law}' at date '{reference_date}'")
+        if spec.get("service") != self.service_name:
+            raise ValueError(f"Rule spec service '{spec.get('service')}' does not match service '{self.service_name}'")
+
+        # Reference dates within the validity of the same rule version share the compiled engine
+        rule = self.resolver.find_rule(law, reference_date, service=self.service_name)
+        engine_key = (law, rule.valid_from)
+        engine = self._engines.get(engine_key)
+        if engine is None:
             engine = RulesEngine(spec=spec, service_provider=self.services)
-            self._engines[law][reference_date] = engine
-            engines_cache[cache_key] = engine
+            self._engines[engine_key] = engine
 
-        return engines_cache[cache_key]
+        self._engines_cache[cache_key] = engine
+        return engine
 
     def evaluate(
         self,
@@ -99,6 +102,7 @@ class RuleService:
         overwrite_definitions: dict[str, Any] | None = None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: bool = True,
     ) -> RuleResult:
         """
         Evaluate rules for given law and reference date
@@ -110,32 +114,91 @@ class RuleService:
             overwrite_input: Optional overrides for input values
             overwrite_definitions: Optional overrides for definition constants
             requested_output: Optional specific output field to calculate
+            approved: Only use approved claims
+            trace: Record the evaluation path and resolved inputs; disable when only the output is needed
 
         Returns:
             RuleResult containing outputs and metadata
         """
         engine = self._get_engine(law, reference_date)
-
-        # Gather sources from all services for cross-service lookups
-        all_sources = {}
-        if self.services and hasattr(self.services, "services"):
-            for service_name, service in self.services.services.items():
-                all_sources.update(service.source_dataframes)
-        else:
-            # Fallback to just this service's sources
-            all_sources = self.source_dataframes
+        sources = self.services.sources
 
         result = engine.evaluate(
             parameters=parameters,
             overwrite_input=overwrite_input,
             overwrite_definitions=overwrite_definitions,
-            sources=all_sources,
+            sources=sources.merged_tables,
+            source_indexes=sources.merged_indexes,
             calculation_date=reference_date,
             requested_output=requested_output,
             approved=approved,
+            trace=trace,
         )
         return RuleResult.from_engine_result(result, engine.spec.get("uuid"))
 
+    def evaluate_many(
+        self,
+        law: str,
+        reference_date: str,
+        parameters_list: list[dict[str, Any]],
+        overwrite_input: dict[str, Any] | None = None,
+        overwrite_definitions: dict[str, Any] | None = None,
+        requested_output: str | None = None,
+        approved: bool = False,
+        vectorized: bool = False,
+    ) -> list[RuleResult]:
+        """
+        Evaluate a law for each set of parameters, without tracing.
+
+        The rule version, its compiled engine and the merged sources are looked up once for the whole batch.
+        With vectorized, the law is evaluated on columns of parameters by a BatchEvaluator, which evaluates the
+        rows it can't handle on columns one by one. Its results only contain the outputs that have a value.
+        """
+        engine = self._get_engine(law, reference_date)
+        names = parameters_list[0].keys() if parameters_list else None
+        if vectorized and names and all(parameters.keys() == names for parameters in parameters_list):
+            batch = BatchEvaluator(self.services, approved).evaluate(
+                self.service_name,
+                law,
+                {name: [parameters[name] for parameters in parameters_list] for name in names},
+                len(parameters_list),
+                reference_date,
+                overwrite_input,
+                overwrite_definitions,
+                requested_output,
+            )
+            return [
+                RuleResult(
+                    output={name: values[row] for name, values in batch.outputs.items() if values[row] is not None},
+                    requirements_met=batch.requirements_met[row],
+                    input={},
+                    rulespec_uuid=engine.spec.get("uuid"),
+                    missing_required=batch.missing_required[row],
+                )
+                for row in range(len(parameters_list))
+            ]
+
+        sources = self.services.sources
+        rulespec_uuid = engine.spec.get("uuid")
+
+        return [
+            RuleResult.from_engine_result(
+                engine.evaluate(
+                    parameters=parameters,
+                    overwrite_input=overwrite_input,
+                    overwrite_definitions=overwrite_definitions,
+                    sources=sources.merged_tables,
+                    source_indexes=sources.merged_indexes,
+                    calculation_date=reference_date,
+                    requested_output=requested_output,
+                    approved=approved,
+                    trace=False,
+                ),
+                rulespec_uuid,
+            )
+            for parameters in parameters_list
+        ]
+
     def get_rule_info(self, law: str, reference_date: str) -> dict[str, Any] | None:
         """
         Get metadata about the rule that would be applied for given law and date
@@ -155,16 +218,27 @@ class RuleService:
         return None
 
     def set_source_dataframe(self, table: str, df: pd.DataFrame) -> None:
-        """Set a source DataFrame"""
+        """Set a source DataFrame, indexed on the columns that laws select rows on"""
         self.source_dataframes[table] = df
+        self.source_indexes[table] = SourceIndex(df, self.resolver.select_on_columns().get(table, ()))
+
+        # Any cached service reference may have read the previous table
+        cache = getattr(self.services, "service_reference_cache", None)
+        if cache is not None:
+            cache.clear()
 
 
 class Services:
-    def __init__(self, reference_date: str) -> None:
+    # Maximum number of service reference results shared between evaluations
+    SERVICE_REFERENCE_CACHE_SIZE = 10_000
+
+    def __init__(self, reference_date: str, event_store: str | Path | None = None) -> None:
         self._impact_cache = None
         self.resolver = RuleResolver()
+        self.sources = SourceCatalog()
         self.services = {service: RuleService(service, self) for service in self.resolver.get_service_laws()}
         self.root_reference_date = reference_date
+        self.service_reference_cache = ServiceReferenceCache(self.SERVICE_REFERENCE_CACHE_SIZE)
 
         outer_self = self
 
@@ -188,17 +262,49 @@ class Services:
             pipes=[[WrappedCaseManager, WrappedCaseProcessor], [WrappedClaimManager, WrappedClaimProcessor]]
         )
 
-        self.runner = SingleThreadedRunner(system)
+        # The cases and claims are kept in memory, or in SQLite databases when an event store directory is given,
+        # one per application. Other eventsourcing persistence modules can be configured with the environment
+        # variables of eventsourcing.
+        env = None
+        self.event_store_files: list[Path] = []
+        if event_store is not None:
+            event_store = Path(event_store)
+            event_store.mkdir(parents=True, exist_ok=True)
+            env = {"PERSISTENCE_MODULE": "eventsourcing.sqlite"}
+            for app in (WrappedCaseManager, WrappedCaseProcessor, WrappedClaimManager, WrappedClaimProcessor):
+                database = event_store / f"{app.name}.db"
+                env[f"{app.name.upper()}_SQLITE_DBNAME"] = str(database)
+                self.event_store_files.append(database)
+        self.runner = SingleThreadedRunner(system, env=env)
         self.runner.start()
 
         self.case_manager = self.runner.get(WrappedCaseManager)
         self.claim_manager = self.runner.get(WrappedClaimManager)
 
         self.claim_manager._case_manager = self.case_manager
+        # The indexes are kept in memory: rebuild them for the cases and claims recorded before
+        self.case_manager.rebuild_indexes()
+        self.claim_manager.rebuild_indexes()
+
+        self.case_manager.subscribe(self._on_case_events)
+        self.claim_manager.subscribe(self._on_claim_events)
 
     def __exit__(self):
         self.runner.stop()
 
+    def _on_case_events(self, events: list, cases: dict) -> None:
+        """Evict cached service references that depend on the changed cases"""
+        cache = self.service_reference_cache
+        cache.invalidate(("cases",))
+        for case in cases.values():
+            cache.invalidate(("cases", case.service, case.law))
+            cache.invalidate(("bsn", case.bsn))
+
+    def _on_claim_events(self, events: list, claims: dict) -> None:
+        """Evict cached service references that depend on the claims of the changed claims' citizens"""
+        for bsn in {claim.bsn for claim in claims.values()}:
+            self.service_reference_cache.invalidate(("bsn", bsn))
+
     @staticmethod
     def extract_value_tree(root: PathNode):
         flattened = {}
@@ -288,7 +394,7 @@ class Services:
             law = law_info["law"]
 
             # Create cache key
-            cache_key = f"{bsn}:{service}:{law}:{current_date}"
+            cache_key = (bsn, service, law, current_date)
 
             # Check cache first
             if cache_key in self._impact_cache:
@@ -300,7 +406,9 @@ class Services:
                 rule_spec = self.resolver.get_rule_spec(law, current_date, service=service)
 
                 # Run the law for this person and get results
-                result = self.evaluate(service=service, law=law, parameters={"BSN": bsn}, reference_date=current_date)
+                result = self.evaluate(
+                    service=service, law=law, parameters={"BSN": bsn}, reference_date=current_date, trace=False
+                )
 
                 # Extract financial impact from result based on citizen_relevance
                 impact_value = 0
@@ -398,10 +506,11 @@ class Services:
         overwrite_definitions: dict[str, Any] | None = None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: bool = True,
     ) -> RuleResult:
         reference_date = reference_date or self.root_reference_date
         with logger.indent_block(
-            f"{service}: {law} ({reference_date} {parameters} {requested_output})",
+            lambda: f"{service}: {law} ({reference_date} {parameters} {requested_output})",
             double_line=True,
         ):
             return self.services[service].evaluate(
@@ -412,11 +521,61 @@ class Services:
                 overwrite_definitions=overwrite_definitions,
                 requested_output=requested_output,
                 approved=approved,
+                trace=trace,
             )
 
+    def evaluate_many(
+        self,
+        service: str,
+        law: str,
+        parameters_list: list[dict[str, Any]],
+        reference_date: str | None = None,
+        overwrite_input: dict[str, Any] | None = None,
+        overwrite_definitions: dict[str, Any] | None = None,
+        requested_output: str | None = None,
+        approved: bool = False,
+        vectorized: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Evaluate a law for many sets of parameters (e.g. one per BSN) and return the results as a table.
+
+        Equivalent to calling evaluate without tracing for each set of parameters, but the compiled law and the
+        merged sources are shared by the whole batch, as are the cached service references between citizens.
+        With vectorized, the law and the laws it references are evaluated on whole columns of parameters with
+        NumPy where possible, see machine.vectorized.
+
+        Returns:
+            DataFrame with a row per set of parameters: the parameters, "requirements_met", "missing_required"
+            and a column per output (None where the output wasn't computed)
+        """
+        reference_date = reference_date or self.root_reference_date
+        with logger.indent_block(
+            lambda: f"{service}: {law} ({reference_date} {len(parameters_list)} evaluations {requested_output})",
+            double_line=True,
+        ):
+            results = self.services[service].evaluate_many(
+                law=law,
+                reference_date=reference_date,
+                parameters_list=parameters_list,
+                overwrite_input=overwrite_input,
+                overwrite_definitions=overwrite_definitions,
+                requested_output=requested_output,
+                approved=approved,
+                vectorized=vectorized,
+            )
+
+        parameter_names = list(dict.fromkeys(name for parameters in parameters_list for name in parameters))
+        output_names = list(dict.fromkeys(name for result in results for name in result.output))
+        columns = {name: [parameters.get(name) for parameters in parameters_list] for name in parameter_names}
+        columns["requirements_met"] = [result.requirements_met for result in results]
+        columns["missing_required"] = [result.missing_required for result in results]
+        for name in output_names:
+            columns[name] = [result.output.get(name) for result in results]
+        return pd.DataFrame(columns, index=pd.RangeIndex(len(results)))
+
     def apply_rules(self, event) -> None:
         for rule in self.resolver.rules:
-            applies = rule.properties.get("applies", [])
+            applies = rule.applies
 
             for apply in applies:
                 if self._matches_event(event, apply):
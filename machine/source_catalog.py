@@ -0,0 +1,94 @@
+from collections.abc import Hashable
+from typing import Any
+
+import pandas as pd
+
+from .source_index import SourceIndex
+
+
+class SourceCatalog:
+    """
+    The source tables of all services by (service, table), shared by every evaluation.
+
+    Laws that don't name the service of a source read the table of that name from any service. The catalog keeps
+    those merged tables up to date as the tables of the services change: for each name, the table of the last
+    registered service that has one, like merging the tables of all services in order. Evaluations get the merged
+    tables by reference instead of merging them every time; version counts the changes.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self.tables: dict[tuple[str, str], pd.DataFrame] = {}
+        self.indexes: dict[tuple[str, str], SourceIndex] = {}
+        self.merged_tables: dict[str, pd.DataFrame] = {}
+        self.merged_indexes: dict[str, SourceIndex] = {}
+        self._services: list[str] = []
+
+    def register(self, service: str) -> tuple["ServiceTables", "ServiceTables"]:
+        """The tables and indexes of a service, as dicts that update the catalog when they are changed"""
+        self._services.append(service)
+        return ServiceTables(self, service, self.tables, self.merged_tables), ServiceTables(
+            self, service, self.indexes, self.merged_indexes
+        )
+
+    def _changed(self, service: str, name: str, value: Any, tables: dict, merged: dict) -> None:
+        if value is _REMOVED:
+            tables.pop((service, name), None)
+        else:
+            tables[service, name] = value
+
+        for candidate in reversed(self._services):
+            if (candidate, name) in tables:
+                merged[name] = tables[candidate, name]
+                break
+        else:
+            merged.pop(name, None)
+        self.version += 1
+
+
+_REMOVED = object()
+
+
+class ServiceTables(dict):
+    """The tables (or indexes) of one service by name, which keep the catalog up to date"""
+
+    def __init__(self, catalog: SourceCatalog, service: str, tables: dict, merged: dict) -> None:
+        super().__init__()
+        self._catalog = catalog
+        self._service = service
+        self._tables = tables
+        self._merged = merged
+
+    def _changed(self, name: Hashable) -> None:
+        self._catalog._changed(self._service, name, self.get(name, _REMOVED), self._tables, self._merged)
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        super().__setitem__(name, value)
+        self._changed(name)
+
+    def __delitem__(self, name: str) -> None:
+        super().__delitem__(name)
+        self._changed(name)
+
+    def pop(self, name: str, *default: Any) -> Any:
+        value = super().pop(name, *default)
+        self._changed(name)
+        return value
+
+    def setdefault(self, name: str, default: Any = None) -> Any:
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for name, value in dict(*args, **kwargs).items():
+            self[name] = value
+
+    def clear(self) -> None:
+        for name in list(self):
+            del self[name]
+
+    def popitem(self) -> tuple[str, Any]:
+        name, value = super().popitem()
+        self._changed(name)
+        return name, value
@@ -0,0 +1,85 @@
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+
+class SourceIndex:
+    """
+    Hash indexes on the columns of a source table that laws select rows on.
+
+    Selecting through the index gives the same rows, in the same order, as filtering the
+    table with `df[df[column] == value]` or `df[df[column].isin(values)]`, without scanning
+    the column. The index per column is built on first use.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: Iterable[str]) -> None:
+        self.df = df
+        self.columns = {column for column in columns if column in df.columns and self._is_indexable(df[column])}
+        self._indexes: dict[str, dict[Any, np.ndarray]] = {}
+
+    @staticmethod
+    def _is_indexable(series: pd.Series) -> bool:
+        """Only index columns where pandas compares by plain equality (no date parsing, no categories)"""
+        dtype = series.dtype
+        return (
+            ptypes.is_object_dtype(dtype)
+            or ptypes.is_string_dtype(dtype)
+            or ptypes.is_bool_dtype(dtype)
+            or ptypes.is_integer_dtype(dtype)
+            or ptypes.is_float_dtype(dtype)
+        ) and not isinstance(dtype, pd.CategoricalDtype)
+
+    def _index(self, column: str) -> dict[Any, np.ndarray] | None:
+        """Row positions by value for a column, None if the column can't be indexed"""
+        if column not in self.columns:
+            return None
+
+        index = self._indexes.get(column)
+        if index is None:
+            try:
+                index = self.df.groupby(column, sort=False, dropna=True).indices
+            except TypeError:
+                # Unhashable values (e.g. lists) in the column
+                self.columns.discard(column)
+                return None
+            self._indexes[column] = index
+        return index
+
+    def select(self, column: str, value: Any) -> np.ndarray | None:
+        """Positions of the rows where column equals value, None if the index can't answer this"""
+        if not isinstance(value, Hashable):
+            return None
+        index = self._index(column)
+        if index is None:
+            return None
+        return index.get(value, _NO_ROWS)
+
+    def select_any(self, column: str, values: Any) -> np.ndarray | None:
+        """Positions of the rows where column is one of values, None if the index can't answer this"""
+        if not isinstance(values, list | tuple | set) or not all(isinstance(v, Hashable) for v in values):
+            return None
+        index = self._index(column)
+        if index is None:
+            return None
+
+        selected = [index[value] for value in values if value in index]
+        if not selected:
+            return _NO_ROWS
+        if len(selected) == 1:
+            return selected[0]
+        return np.unique(np.concatenate(selected))
+
+    def rows(self, positions: np.ndarray) -> pd.DataFrame:
+        """The rows at the given (sorted) positions, as a slice of the table when they are contiguous"""
+        if len(positions) == 0:
+            return self.df.iloc[0:0]
+        start, stop = positions[0], positions[-1] + 1
+        if stop - start == len(positions):
+            return self.df.iloc[start:stop]
+        return self.df.iloc[positions]
+
+
+_NO_ROWS = np.array([], dtype=np.intp)
@@ -1,5 +1,14 @@
+import bisect
+import functools
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Any
@@ -7,16 +16,23 @@ from typing import Any
 import pandas as pd
 import yaml
 
+from .source_index import SourceIndex
+
 try:
     from yaml import CLoader as Loader
 except ImportError:
     from yaml import Loader
 
 BASE_DIR = "laws"
+# The parsed laws, so processes don't have to parse the YAML again; rebuilt when a law changes. Relative to the
+# directory holding the rules directory, next to the laws it was built from
+BUNDLE_PATH = Path(".cache") / "law_specs.bundle"
 
 
 # Cache for parsed YAML files
 _yaml_cache = {}
+# The bundle of the last RuleResolver, which load_yaml_cached reads specs from
+_bundle: "SpecBundle | None" = None
 
 
 def load_yaml_cached(file_path: str) -> dict:
@@ -24,13 +40,225 @@ def load_yaml_cached(file_path: str) -> dict:
     if file_path in _yaml_cache:
         return _yaml_cache[file_path]
 
-    with open(file_path) as f:
-        data = yaml.load(f, Loader=Loader)
+    if _bundle is not None and file_path in _bundle:
+        data = _bundle.load(file_path)
+    else:
+        with open(file_path) as f:
+            data = yaml.load(f, Loader=Loader)
 
     _yaml_cache[file_path] = data
     return data
 
 
+class SpecBundle:
+    """
+    All parsed law specs in one file, with an index by path of their spec_header (law, service, valid_from...).
+
+    The file starts with a header in JSON: the size and modification time of every YAML file it was built from,
+    a hash of their contents and the index. The specs follow, each pickled separately. The file is memory mapped
+    and a spec is only unpickled when it is loaded, so RuleResolver can start from the index alone, and no spec
+    is unpickled before load_or_build has checked the header against the YAML files.
+    """
+
+    MAGIC = b"LAWSPEC3"
+    _HEADER = struct.Struct(f"<{len(MAGIC)}sQ")
+
+    def __init__(self, path: Path, header: dict[str, Any], data: mmap.mmap, offset: int) -> None:
+        self.path = path
+        self.manifest: list[tuple[str, int, int]] = header["manifest"]
+        self.content_hash: str = header["content_hash"]
+        # Path -> (spec_header, offset, length)
+        self.index: dict[str, tuple[dict[str, Any], int, int]] = header["index"]
+        self._data = data
+        self._offset = offset
+
+    def __contains__(self, file_path: str) -> bool:
+        return file_path in self.index
+
+    def header(self, file_path: str) -> dict[str, Any]:
+        """The spec_header of a law"""
+        return self.index[file_path][0]
+
+    def load(self, file_path: str) -> dict:
+        """The parsed YAML of a law"""
+        _, offset, length = self.index[file_path]
+        start = self._offset + offset
+        return pickle.loads(self._data[start : start + length])
+
+    @staticmethod
+    def manifest_of(yaml_files: list[Path]) -> list[tuple[str, int, int]]:
+        """Path, modification time and size of the YAML files, which tell whether a bundle is up to date"""
+        manifest = []
+        for path in yaml_files:
+            stat = path.stat()
+            manifest.append((str(path), stat.st_mtime_ns, stat.st_size))
+        return sorted(manifest)
+
+    @staticmethod
+    def content_hash_of(yaml_files: list[Path]) -> str:
+        digest = hashlib.sha256()
+        for path in sorted(yaml_files, key=str):
+            digest.update(str(path).encode())
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _encode_spec_header(header: dict[str, Any]) -> dict[str, Any]:
+        """A spec_header as JSON values"""
+        return {
+            **header,
+            "valid_from": header["valid_from"].isoformat(),
+            "select_on": {table: sorted(columns) for table, columns in header["select_on"].items()},
+        }
+
+    @staticmethod
+    def _decode_spec_header(header: dict[str, Any]) -> dict[str, Any]:
+        return {
+            **header,
+            "valid_from": datetime.fromisoformat(header["valid_from"]),
+            "select_on": {table: set(columns) for table, columns in header["select_on"].items()},
+        }
+
+    @classmethod
+    def open(cls, path: Path) -> "SpecBundle":
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = cls._HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not a law spec bundle")
+        contents = json.loads(data[cls._HEADER.size : cls._HEADER.size + header_length])
+        header = {
+            "manifest": [tuple(entry) for entry in contents["manifest"]],
+            "content_hash": contents["content_hash"],
+            "index": {
+                file_path: (cls._decode_spec_header(spec_header), offset, length)
+                for file_path, (spec_header, offset, length) in contents["index"].items()
+            },
+        }
+        return cls(path, header, data, cls._HEADER.size + header_length)
+
+    @classmethod
+    def build(cls, path: Path, yaml_files: list[Path]) -> "SpecBundle":
+        """Parse the YAML files and write them as a bundle, replacing the file atomically"""
+        blobs = []
+        index = {}
+        offset = 0
+        for yaml_file in sorted(yaml_files, key=str):
+            try:
+                with open(yaml_file) as f:
+                    data = yaml.load(f, Loader=Loader)
+                header = spec_header(data)
+                # Laws whose header JSON can't hold exactly, e.g. with dates in applies, are read from the YAML
+                if cls._decode_spec_header(json.loads(json.dumps(cls._encode_spec_header(header)))) != header:
+                    continue
+            except Exception:
+                # Left to the RuleResolver, which reports the file when it parses it again
+                continue
+            blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            index[str(yaml_file)] = (header, offset, len(blob))
+            blobs.append(blob)
+            offset += len(blob)
+
+        header = {
+            "manifest": cls.manifest_of(yaml_files),
+            "content_hash": cls.content_hash_of(yaml_files),
+            "index": index,
+        }
+        return cls._write(path, header, blobs)
+
+    @classmethod
+    def _write(cls, path: Path, header: dict[str, Any], blobs: list[bytes]) -> "SpecBundle":
+        """Write a bundle, replacing the file atomically"""
+        contents = json.dumps(
+            {
+                "manifest": header["manifest"],
+                "content_hash": header["content_hash"],
+                "index": {
+                    file_path: (cls._encode_spec_header(spec_header), offset, length)
+                    for file_path, (spec_header, offset, length) in header["index"].items()
+                },
+            }
+        ).encode()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name, delete=False) as f:
+            f.write(cls._HEADER.pack(cls.MAGIC, len(contents)))
+            f.write(contents)
+            for blob in blobs:
+                f.write(blob)
+        # Readable like the YAML files, instead of private like a temporary file
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, path)
+        return cls.open(path)
+
+    def with_manifest(self, manifest: list[tuple[str, int, int]]) -> "SpecBundle":
+        """The same bundle with the header rewritten for a new manifest, the specs are copied as they are"""
+        header = {"manifest": manifest, "content_hash": self.content_hash, "index": self.index}
+        return self._write(self.path, header, [self._data[self._offset :]])
+
+    @classmethod
+    def load_or_build(cls, path: Path, yaml_files: list[Path]) -> "SpecBundle | None":
+        """
+        The bundle of the YAML files, rebuilt when one of them was added, removed or modified.
+
+        Touched files whose contents are the same don't need a rebuild. Returns None when the bundle can't be
+        written, e.g. on a read-only file system.
+        """
+        manifest = cls.manifest_of(yaml_files)
+        bundle = _bundle if _bundle is not None and _bundle.path == path else None
+        if bundle is None and path.exists():
+            try:
+                bundle = cls.open(path)
+            except (OSError, ValueError, KeyError, TypeError, struct.error):
+                bundle = None
+        if bundle is not None and bundle.manifest == manifest:
+            return bundle
+        if bundle is not None and bundle.content_hash == cls.content_hash_of(yaml_files):
+            # Only touched, e.g. by a checkout: record the new manifest, so other processes don't hash the files again
+            try:
+                return bundle.with_manifest(manifest)
+            except OSError:
+                bundle.manifest = manifest
+                return bundle
+
+        try:
+            return cls.build(path, yaml_files)
+        except OSError:
+            return None
+
+
+def spec_header(data: dict) -> dict[str, Any]:
+    """
+    What RuleResolver needs of every law without loading it: its metadata, the events it applies to and the
+    columns it selects source rows on, by table
+    """
+    valid_from = data.get("valid_from")
+    properties = data.get("properties", {})
+    select_on = defaultdict(set)
+    for section in ("parameters", "input", "sources"):
+        for prop in properties.get(section, []):
+            source_ref = prop.get("source_reference") if isinstance(prop, dict) else None
+            if not source_ref or "table" not in source_ref:
+                continue
+            for column in source_ref.get("select_on", []):
+                select_on[source_ref["table"]].add(column["name"])
+
+    return {
+        "decision_type": data.get("decision_type", ""),
+        "law_type": data.get("law_type", ""),
+        "legal_character": data.get("legal_character", ""),
+        "uuid": data.get("uuid", ""),
+        "name": data.get("name", ""),
+        "law": data.get("law", ""),
+        "discoverable": data.get("discoverable", ""),
+        "valid_from": valid_from
+        if isinstance(valid_from, datetime)
+        else datetime.combine(valid_from, datetime.min.time()),
+        "service": data.get("service", ""),
+        "applies": properties.get("applies", []),
+        "select_on": dict(select_on),
+    }
+
+
 @dataclass
 class RuleSpec:
     path: str
@@ -43,48 +271,74 @@ class RuleSpec:
     valid_from: datetime
     service: str
     discoverable: str
-    properties: dict[str, Any]
+    applies: list[dict[str, Any]] = field(default_factory=list)
+    select_on: dict[str, set[str]] = field(default_factory=dict)
+    _properties: dict[str, Any] | None = field(default=None, repr=False)
+
+    @property
+    def properties(self) -> dict[str, Any]:
+        """The properties of the law, loaded on first use"""
+        if self._properties is None:
+            self._properties = load_yaml_cached(self.path).get("properties", {})
+        return self._properties
 
     @classmethod
     def from_yaml(cls, path: str) -> "RuleSpec":
         """Create RuleSpec from a YAML file path"""
         data = load_yaml_cached(path)
+        return cls(path=path, **spec_header(data), _properties=data.get("properties", {}))
+
+    @classmethod
+    def from_header(cls, path: str, header: dict[str, Any]) -> "RuleSpec":
+        """Create RuleSpec from the header of a law in the spec bundle, without loading the law"""
+        return cls(path=path, **header)
 
-        return cls(
-            path=path,
-            decision_type=data.get("decision_type", ""),
-            law_type=data.get("law_type", ""),
-            legal_character=data.get("legal_character", ""),
-            uuid=data.get("uuid", ""),
-            name=data.get("name", ""),
-            law=data.get("law", ""),
-            discoverable=data.get("discoverable", ""),
-            valid_from=data.get("valid_from")
-            if isinstance(data.get("valid_from"), datetime)
-            else datetime.combine(data.get("valid_from"), datetime.min.time()),
-            service=data.get("service", ""),
-            properties=data.get("properties", {}),
-        )
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(reference_date: str) -> datetime:
+    return datetime.strptime(reference_date, "%Y-%m-%d")
 
 
 class RuleResolver:
     def __init__(self) -> None:
         self.rules_dir = Path(BASE_DIR)
         self.rules: list[RuleSpec] = []
-        # Rule cache indexed by (law, reference_date, service)
-        self._rule_cache = {}
+        # Versions of each law indexed by (law, service), as sorted valid_from dates and their rules. A lookup
+        # hits for any date, instead of caching the rule per reference date
+        self._versions: dict[tuple[str, str | None], tuple[list[datetime], list[RuleSpec]]] = {}
         # Rule spec cache indexed by rule path
         self._rule_spec_cache = {}
+        # Columns selected on per source table, collected on first use
+        self._select_on_columns: dict[str, set[str]] | None = None
+        # The rules as a table for laws querying the law registry, built on first use
+        self._rules_dataframe: pd.DataFrame | None = None
+        self._rules_index: SourceIndex | None = None
         self._load_rules()
 
     def _load_rules(self) -> None:
         """Load all rule specifications from the rules directory"""
+        global _bundle
+
         # Use Path.rglob to find all .yaml and .yml files recursively
         yaml_files = list(self.rules_dir.rglob("*.yaml")) + list(self.rules_dir.rglob("*.yml"))
 
+        bundle = SpecBundle.load_or_build(self.rules_dir.resolve().parent / BUNDLE_PATH, yaml_files)
+        if bundle is not _bundle:
+            # Specs parsed from other versions of the files
+            _yaml_cache.clear()
+            _bundle = bundle
+
+        self.rules = []
+        self._select_on_columns = None
+        self._rules_dataframe = None
+        self._rules_index = None
         for path in yaml_files:
             try:
-                rule = RuleSpec.from_yaml(str(path))
+                if bundle is not None and str(path) in bundle:
+                    # The law itself is loaded when it is evaluated
+                    rule = RuleSpec.from_header(str(path), bundle.header(str(path)))
+                else:
+                    rule = RuleSpec.from_yaml(str(path))
                 self.rules.append(rule)
             except Exception as e:
                 print(f"Error loading rule from {path}: {e}")
@@ -96,6 +350,15 @@ class RuleResolver:
             if rule.discoverable:
                 self.discoverable_laws_by_service[rule.discoverable][rule.service].add(rule.law)
 
+        # The versions of every law, per service and for any service (None)
+        versions = defaultdict(list)
+        for rule in sorted(self.rules, key=lambda r: r.valid_from):
+            for key in ((rule.law, rule.service), (rule.law, None)):
+                # Of versions valid from the same date, the first loaded one applies
+                if not versions[key] or versions[key][-1].valid_from != rule.valid_from:
+                    versions[key].append(rule)
+        self._versions = {key: ([r.valid_from for r in rules], rules) for key, rules in versions.items()}
+
     def get_service_laws(self):
         return self.laws_by_service
 
@@ -104,36 +367,26 @@ class RuleResolver:
 
     def find_rule(self, law: str, reference_date: str, service: str | None = None) -> RuleSpec | None:
         """Find the applicable rule for a given law and reference date"""
-        # Check if we have a cached result
-        cache_key = (law, reference_date, service)
-        if cache_key in self._rule_cache:
-            return self._rule_cache[cache_key]
-
-        ref_date = datetime.strptime(reference_date, "%Y-%m-%d")
-
-        # Filter rules for the given law
-        law_rules = [r for r in self.rules if r.law == law]
-
-        if service:
-            # If a service is given, filter rules for the given service
-            law_rules = [r for r in law_rules if r.service == service]
-
-        if not law_rules:
+        versions = self._versions.get((law, service or None))
+        if not versions:
             raise ValueError(f"No rules found for law: {law} (and service: {service})")
 
-        # Find the most recent valid rule before the reference date
-        valid_rules = [r for r in law_rules if r.valid_from <= ref_date]
-
-        if not valid_rules:
+        # The most recent version valid on the reference date
+        valid_froms, rules = versions
+        position = bisect.bisect_right(valid_froms, _parse_date(reference_date))
+        if position == 0:
             raise ValueError(f"No valid rules found for law {law} at date {reference_date}")
-
-        # Return the most recently valid rule
-        rule = max(valid_rules, key=lambda r: r.valid_from)
-
-        # Cache the result
-        self._rule_cache[cache_key] = rule
-
-        return rule
+        return rules[position - 1]
+
+    def select_on_columns(self) -> dict[str, set[str]]:
+        """Get the columns that any law selects rows on, by source table"""
+        if self._select_on_columns is None:
+            columns = defaultdict(set)
+            for rule in self.rules:
+                for table, names in rule.select_on.items():
+                    columns[table] |= names
+            self._select_on_columns = dict(columns)
+        return self._select_on_columns
 
     def get_rule_spec(self, law: str, reference_date: str, service: str | None = None) -> dict:
         """Get the rule specification as a dictionary"""
@@ -144,7 +397,22 @@ class RuleResolver:
         return load_yaml_cached(rule.path)
 
     def rules_dataframe(self) -> pd.DataFrame:
-        """Convert the list of RuleSpec objects into a pandas DataFrame."""
+        """
+        Convert the list of RuleSpec objects into a pandas DataFrame.
+
+        The table is built once per load of the rules and shared by all callers, which must not modify it.
+        """
+        if self._rules_dataframe is None:
+            self._rules_dataframe = self._build_rules_dataframe()
+        return self._rules_dataframe
+
+    def rules_index(self) -> SourceIndex:
+        """Index on the law, service and discoverable columns of rules_dataframe"""
+        if self._rules_index is None:
+            self._rules_index = SourceIndex(self.rules_dataframe(), ("law", "service", "discoverable"))
+        return self._rules_index
+
+    def _build_rules_dataframe(self) -> pd.DataFrame:
         rules_data = [
             {
                 "path": rule.path,
@@ -166,6 +434,7 @@ class RuleResolver:
 
 
 if __name__ == "__main__":
+    # Builds the spec bundle when the laws changed, e.g. as a build step
     reference_date = "2025-01-01"
     resolver = RuleResolver()
     spec = resolver.get_rule_spec("zorgtoeslagwet", reference_date)
@@ -0,0 +1,1152 @@
+import functools
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+import numpy as np
+
+from .cache import service_reference_key
+from .context import RuleContext, clean_nan_value
+from .engine import RulesEngine
+from .logging_config import IndentLogger
+
+logger = IndentLogger(logging.getLogger("service"))
+
+# A value during vectorized evaluation: a scalar shared by all rows, or an array with a value per row
+Value = Any
+# A compiled piece of a law: evaluates itself against the values of the references and earlier outputs
+Vectorized = Callable[[dict[str, Value]], Value]
+
+# The name of the calculation date among the values, as the engine resolves $calculation_date
+CALCULATION_DATE = "calculation_date"
+
+
+class Unsupported(Exception):
+    """The law, or this batch of it, can't be evaluated on columns; evaluate the rows one by one instead"""
+
+
+def _is_array(value: Value) -> bool:
+    return isinstance(value, np.ndarray)
+
+
+def _is_numeric(value: Value) -> bool:
+    if _is_array(value):
+        return value.dtype.kind in "biuf"
+    return isinstance(value, int | float | np.number | np.bool_)
+
+
+def _numeric(value: Value) -> Value:
+    """Booleans take part in arithmetic as integers, like in Python"""
+    if not _is_numeric(value):
+        raise Unsupported(f"arithmetic on {type(value).__name__}")
+    if _is_array(value) and value.dtype == bool:
+        return value.astype(np.int64)
+    if isinstance(value, bool | np.bool_):
+        return int(value)
+    return value
+
+
+def _truthy(value: Value) -> Value:
+    if _is_array(value):
+        return value.astype(bool) if _is_numeric(value) else np.array([bool(v) for v in value], dtype=bool)
+    return bool(value)
+
+
+def _multiply(x: Value, y: Value) -> Value:
+    # Like RulesEngine.AGGREGATE_OPS["MULTIPLY"]: truncate when multiplying by an integer below 1
+    if _is_array(y) and y.dtype.kind in "iu":
+        return np.where(y < 1, np.trunc(x * y), x * y)
+    if isinstance(y, int) and y < 1:
+        return np.trunc(x * y) if _is_array(x) else int(x * y)
+    return x * y
+
+
+def _divide(values: list[Value]) -> Value:
+    # Like RulesEngine.AGGREGATE_OPS["DIVIDE"]: 0 when any divisor is 0
+    divisors = values[1:]
+    any_zero = functools.reduce(np.logical_or, [np.equal(d, 0) for d in divisors])
+    safe = [np.where(np.equal(d, 0), 1, d) for d in divisors]
+    quotient = functools.reduce(np.divide, safe, np.asarray(values[0], dtype=float))
+    return np.where(any_zero, 0, quotient)
+
+
+_AGGREGATE_OPS: dict[str, Callable[[list[Value]], Value]] = {
+    "ADD": lambda values: functools.reduce(np.add, values),
+    "SUBTRACT": lambda values: functools.reduce(np.subtract, values),
+    "MULTIPLY": lambda values: functools.reduce(_multiply, values),
+    "DIVIDE": _divide,
+    "MIN": lambda values: functools.reduce(np.minimum, values),
+    "MAX": lambda values: functools.reduce(np.maximum, values),
+}
+
+
+def _segment_add(values: np.ndarray, owners: np.ndarray, size: int) -> np.ndarray:
+    result = np.zeros(size, dtype=np.result_type(values, np.int64))
+    np.add.at(result, owners, values)
+    return result
+
+
+def _segment_extreme(ufunc: np.ufunc, fill: Callable[[np.dtype], Any]) -> Callable:
+    def reduce(values: np.ndarray, owners: np.ndarray, size: int) -> np.ndarray:
+        dtype = np.result_type(values, np.int64)
+        result = np.full(size, fill(dtype), dtype=dtype)
+        ufunc.at(result, owners, values)
+        # Like the engine, rows without values combine to 0
+        return np.where(np.bincount(owners, minlength=size) > 0, result, 0)
+
+    return reduce
+
+
+def _extreme(dtype: np.dtype, largest: bool) -> Any:
+    info = np.finfo(dtype) if dtype.kind == "f" else np.iinfo(dtype)
+    return info.max if largest else info.min
+
+
+# How FOREACH combines the values of the items of every row: values, the row of each value, number of rows
+_SEGMENT_OPS: dict[str, Callable[[np.ndarray, np.ndarray, int], np.ndarray]] = {
+    "ADD": _segment_add,
+    "MIN": _segment_extreme(np.minimum, lambda dtype: _extreme(dtype, largest=True)),
+    "MAX": _segment_extreme(np.maximum, lambda dtype: _extreme(dtype, largest=False)),
+}
+
+_ORDERING_OPS = {
+    "GREATER_THAN": np.greater,
+    "LESS_THAN": np.less,
+    "GREATER_OR_EQUAL": np.greater_equal,
+    "LESS_OR_EQUAL": np.less_equal,
+}
+
+
+def _equals(left: Value, right: Value) -> Value:
+    if _is_numeric(left) and _is_numeric(right):
+        return np.equal(left, right)
+    if isinstance(left, list | date) or isinstance(right, list | date):
+        raise Unsupported("comparing lists or dates")
+    if _is_array(left) or _is_array(right):
+        # Element-wise Python equality for strings and other objects
+        left, right = np.broadcast_arrays(np.asarray(left, dtype=object), np.asarray(right, dtype=object))
+        return np.array([a == b for a, b in zip(left, right, strict=True)], dtype=bool)
+    return left == right
+
+
+def as_column(values: list) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert the values of a column to an array, and the mask of its missing (None or NaN) values.
+    Numbers become a numeric array, anything else an object array.
+    """
+    missing = np.fromiter((v is None or (isinstance(v, float) and v != v) for v in values), bool, len(values))
+    present = [v for v, m in zip(values, missing, strict=True) if not m]
+    if all(isinstance(v, bool | np.bool_) for v in present):
+        array = np.array([bool(v) if not m else False for v, m in zip(values, missing, strict=True)], dtype=bool)
+    elif all(isinstance(v, int | np.integer) and not isinstance(v, bool) for v in present):
+        try:
+            array = np.array([v if not m else 0 for v, m in zip(values, missing, strict=True)], dtype=np.int64)
+        except OverflowError:
+            array = np.array(values, dtype=object)
+    elif all(isinstance(v, int | float | np.number) and not isinstance(v, bool) for v in present):
+        array = np.array([v if not m else 0.0 for v, m in zip(values, missing, strict=True)], dtype=np.float64)
+    else:
+        array = _objects_column(values)
+    return array, missing
+
+
+class VectorizedLaw:
+    """
+    The requirements and actions of a law compiled to functions over whole columns of values.
+
+    Only arithmetic, comparisons, boolean logic, date differences and IF are supported, on references to
+    definitions, parameters, inputs, sources and earlier outputs. Compiling a law with other requirements
+    raises Unsupported; actions with other operations only raise it when an output needs them.
+    """
+
+    def __init__(self, engine: RulesEngine) -> None:
+        self.engine = engine
+        self.output_names = {action["output"] for action in engine.actions}
+        self._references: dict[Any, set[str]] = {}
+        self.requirements = self._compile_requirements(engine.requirements, self._collect("requirements"))
+        self.actions: dict[int, Vectorized | Unsupported] = {}
+        for action in engine.actions:
+            try:
+                self.actions[id(action)] = self._compile_action(action, self._collect(id(action)))
+            except Unsupported as e:
+                self.actions[id(action)] = e
+        self._plans: dict[str | None, list[dict[str, Any]]] = {}
+
+    def _collect(self, key: Any) -> set[str]:
+        references = self._references[key] = set()
+        return references
+
+    def plan(self, requested_output: str | None) -> list[dict[str, Any]]:
+        """The actions needed for the requested output, in the same order as the engine runs them"""
+        plan = self._plans.get(requested_output)
+        if plan is None:
+            plan = self._plans[requested_output] = RulesEngine.get_required_actions(
+                requested_output, self.engine.actions
+            )
+        return plan
+
+    def references(self, requested_output: str | None) -> set[str]:
+        """The names the requirements and planned actions resolve from outside the law"""
+        references = set(self._references["requirements"])
+        for action in self.plan(requested_output):
+            if isinstance(self.actions[id(action)], Unsupported):
+                raise Unsupported(str(self.actions[id(action)]))
+            references |= self._references[id(action)]
+        return references
+
+    def run(
+        self,
+        values: dict[str, Value],
+        size: int,
+        requested_output: str | None,
+        overwritten_outputs: dict[str, Any],
+        calculation_date: str,
+    ) -> tuple[np.ndarray, dict[str, list]]:
+        """
+        Evaluate the requirements and the planned actions for size rows.
+
+        Returns the mask of rows that meet the requirements and the outputs as a list per output, with the
+        type specs of the outputs enforced. Like in the engine, later actions see the enforced outputs.
+        """
+        values = {**values, CALCULATION_DATE: calculation_date}
+        with np.errstate(all="ignore"):
+            met = np.broadcast_to(_truthy(self.requirements(values)), size)
+            outputs = {}
+            for action in self.plan(requested_output):
+                name = action["output"]
+                value = overwritten_outputs[name] if name in overwritten_outputs else self.actions[id(action)](values)
+                column = np.broadcast_to(np.asarray(value, dtype=None if _is_numeric(value) else object), size)
+                outputs[name] = [self.engine._enforce_output_type(name, _python(v)) for v in column]
+                if name not in values:
+                    array, missing = as_column(outputs[name])
+                    if missing.all():
+                        values[name] = None
+                    elif missing.any():
+                        raise Unsupported(f"{name} is missing for some rows")
+                    else:
+                        values[name] = array
+        return met, outputs
+
+    # Compilation
+
+    def _compile_requirements(self, requirements: list, references: set[str]) -> Vectorized:
+        checks = [self._compile_requirement(req, references) for req in requirements]
+        if not checks:
+            return lambda values: True
+        return lambda values: functools.reduce(np.logical_and, [_truthy(check(values)) for check in checks])
+
+    def _compile_requirement(self, req: dict[str, Any], references: set[str]) -> Vectorized:
+        if "all" in req:
+            checks = [self._compile_requirements([r], references) for r in req["all"]]
+            return lambda values: functools.reduce(np.logical_and, [_truthy(check(values)) for check in checks])
+        if "or" in req:
+            checks = [self._compile_requirements([r], references) for r in req["or"]]
+            return lambda values: functools.reduce(np.logical_or, [_truthy(check(values)) for check in checks])
+        return self._compile_operation(req, references)
+
+    def _compile_action(self, action: dict[str, Any], references: set[str]) -> Vectorized:
+        if "operation" in action:
+            return self._compile_operation(action, references)
+        if "value" in action:
+            return self._compile_value(action["value"], references)
+        if "subject" in action:
+            return self._compile_value(action["subject"], references)
+        raise Unsupported(f"action without value for {action.get('output')}")
+
+    def _compile_value(self, value: Any, references: set[str]) -> Vectorized:
+        if value is None or isinstance(value, bool | int | float):
+            return lambda values: value
+        if isinstance(value, dict) and "operation" in value:
+            return self._compile_operation(value, references)
+        if isinstance(value, str) and value.startswith("$"):
+            name = value[1:]
+            if "." in name and name.split(".", 1)[0] in self.output_names:
+                raise Unsupported(f"reference {value} into an output")
+            if name not in self.output_names:
+                # Dotted references are resolved as a whole, so rows missing them are left to the engine
+                references.add(name)
+
+            def resolve(values: dict[str, Value]) -> Value:
+                if name not in values:
+                    raise Unsupported(f"{value} is not available")
+                return values[name]
+
+            return resolve
+        if isinstance(value, str):
+            return lambda values: value
+        if isinstance(value, list) and all(_is_literal(v) for v in value):
+            return lambda values: value
+        if isinstance(value, dict) and all(_is_literal(v) for v in value.values()):
+            return lambda values: value
+        raise Unsupported(f"value {value!r}")
+
+    def _compile_field(self, operation: dict[str, Any], key: str, references: set[str]) -> Vectorized:
+        if key not in operation:
+            raise Unsupported(f"operation without {key}")
+        return self._compile_value(operation[key], references)
+
+    def _compile_operation(self, operation: Any, references: set[str]) -> Vectorized:
+        if not isinstance(operation, dict):
+            return self._compile_value(operation, references)
+        if "value" in operation and not operation.get("operation"):
+            return self._compile_value(operation["value"], references)
+
+        op_type = operation.get("operation")
+        if op_type == "IF":
+            return self._compile_if(operation, references)
+
+        if op_type == "FOREACH":
+            return self._compile_foreach(operation, references)
+
+        if op_type in _AGGREGATE_OPS and "values" in operation:
+            value_fns = [self._compile_value(v, references) for v in operation["values"]]
+            aggregate = _AGGREGATE_OPS[op_type]
+            if not value_fns:
+                return lambda values: 0
+
+            def compute(values: dict[str, Value]) -> Value:
+                # Like the engine, leave out missing values and return 0 if there are none
+                operands = [_numeric(v) for v in (fn(values) for fn in value_fns) if v is not None]
+                return aggregate(operands) if operands else 0
+
+            return compute
+
+        if op_type in ("AND", "OR") and "values" in operation:
+            value_fns = [self._compile_value(v, references) for v in operation["values"]]
+            combine = np.logical_or if op_type == "OR" else np.logical_and
+            return lambda values: functools.reduce(combine, [_truthy(fn(values)) for fn in value_fns])
+
+        if op_type in ("NOT_NULL", "IS_NULL"):
+            # Only values missing for every row are null: rows missing a value are evaluated by the engine
+            subject_fn = self._compile_field(operation, "subject", references)
+            expect_null = op_type == "IS_NULL"
+            return lambda values: (subject_fn(values) is None) == expect_null
+
+        if op_type == "COALESCE":
+            value_fns = [self._compile_value(v, references) for v in operation.get("values", [])]
+
+            def coalesce(values: dict[str, Value]) -> Value:
+                for fn in value_fns:
+                    value = fn(values)
+                    if value is not None:
+                        return value
+                return None
+
+            return coalesce
+
+        if op_type in ("IN", "NOT_IN"):
+            subject_fn = self._compile_field(operation, "subject", references)
+            allowed_fn = self._compile_value(operation.get("values", []), references)
+            negate = op_type == "NOT_IN"
+
+            def contains(values: dict[str, Value]) -> Value:
+                subject, allowed = subject_fn(values), allowed_fn(values)
+                if _is_array(allowed):
+                    raise Unsupported(f"{op_type} with allowed values per row")
+                allowed = allowed if isinstance(allowed, list | dict | set) else [allowed]
+
+                def test(s: Any) -> bool:
+                    result = any(v in allowed for v in s) if isinstance(s, list) else s in allowed
+                    return result != negate
+
+                if _is_array(subject):
+                    return np.fromiter((test(_python(s)) for s in subject), bool, len(subject))
+                return test(subject)
+
+            return contains
+
+        if op_type == "CONCAT" and "values" in operation:
+            value_fns = [self._compile_value(v, references) for v in operation["values"]]
+
+            def concat(values: dict[str, Value]) -> Value:
+                operands = [v for v in (fn(values) for fn in value_fns) if v is not None]
+                if not operands:
+                    return 0
+                if not any(_is_array(operand) for operand in operands):
+                    return "".join(str(operand) for operand in operands)
+                rows = zip(*np.broadcast_arrays(*(_objects(operand) for operand in operands)), strict=True)
+                return _objects_column(["".join(str(_python(v)) for v in row) for row in rows])
+
+            return concat
+
+        if op_type == "GET":
+            subject_fn = self._compile_field(operation, "subject", references)
+            mapping_fn = self._compile_value(operation.get("values", []), references)
+
+            def get(values: dict[str, Value]) -> Value:
+                subject, mapping = subject_fn(values), mapping_fn(values)
+                if not isinstance(mapping, dict):
+                    raise Unsupported("GET from values per row")
+                if not _is_array(subject):
+                    return mapping.get(subject)
+                return _column([mapping.get(_python(s)) for s in subject], "GET")
+
+            return get
+
+        if op_type == "EXISTS":
+            subject_fn = self._compile_field(operation, "subject", references)
+
+            def exists(values: dict[str, Value]) -> Value:
+                subject = subject_fn(values)
+                if _is_array(subject):
+                    return np.fromiter((_exists(_python(v)) for v in subject), bool, len(subject))
+                return _exists(subject)
+
+            return exists
+
+        if op_type and "_DATE" in op_type:
+            value_fns = [self._compile_value(v, references) for v in operation.get("values", [])]
+            unit = operation.get("unit", "days")
+
+            def date_operation(values: dict[str, Value]) -> Value:
+                operands = [fn(values) for fn in value_fns]
+                if not any(_is_array(operand) for operand in operands):
+                    return _date_operation(op_type, operands, unit, values[CALCULATION_DATE])
+                # Dates are strings, so this is done row by row, like in the engine
+                rows = zip(*np.broadcast_arrays(*(_objects(operand) for operand in operands)), strict=True)
+                return _column(
+                    [
+                        _date_operation(op_type, [_python(v) for v in row], unit, values[CALCULATION_DATE])
+                        for row in rows
+                    ],
+                    op_type,
+                )
+
+            return date_operation
+
+        if op_type in RulesEngine.COMPARISON_OPS:
+            if "subject" in operation:
+                left_fn = self._compile_value(operation["subject"], references)
+                right_fn = self._compile_field(operation, "value", references)
+            elif "values" in operation and len(operation["values"]) == 2:
+                left_fn, right_fn = (self._compile_value(v, references) for v in operation["values"])
+            else:
+                raise Unsupported(f"{op_type} without two operands")
+
+            if op_type in ("EQUALS", "NOT_EQUALS"):
+                negate = op_type == "NOT_EQUALS"
+
+                def compare(values: dict[str, Value]) -> Value:
+                    result = _equals(left_fn(values), right_fn(values))
+                    return np.logical_not(result) if negate else result
+
+                return compare
+
+            ordering = _ORDERING_OPS[op_type]
+
+            def order(values: dict[str, Value]) -> Value:
+                left, right = left_fn(values), right_fn(values)
+                if left is None or right is None:
+                    # Not comparable, like in the engine
+                    return None
+                if _is_numeric(left) and _is_numeric(right):
+                    return ordering(left, right)
+                if isinstance(left, date) or isinstance(right, date):
+                    raise Unsupported(f"{op_type} on dates")
+                # Strings, like ISO dates: compare row by row
+                compare = RulesEngine.COMPARISON_OPS[op_type]
+                left, right = np.broadcast_arrays(_objects(left), _objects(right))
+                try:
+                    return np.fromiter((compare(a, b) for a, b in zip(left, right, strict=True)), bool, len(left))
+                except TypeError as e:
+                    raise Unsupported(f"{op_type} on values that can't be compared") from e
+
+            return order
+
+        raise Unsupported(f"operation {op_type}")
+
+    def _compile_foreach(self, operation: dict[str, Any], references: set[str]) -> Vectorized:
+        """
+        The items of all rows are evaluated together, as rows of their own, and then combined per row.
+        Names of item fields resolve to the items, other names to the values of the row the item belongs to.
+        """
+        combine = operation.get("combine")
+        if combine not in _SEGMENT_OPS:
+            raise Unsupported(f"FOREACH combining with {combine}")
+        if "value" not in operation:
+            raise Unsupported("FOREACH without value")
+        subject_fn = self._compile_field(operation, "subject", references)
+        local: set[str] = set()
+        where_fn = self._compile_operation(operation["where"], local) if "where" in operation else None
+        raw_value = operation["value"]
+        item_fn = self._compile_value(raw_value[0] if isinstance(raw_value, list) else raw_value, local)
+        if any(name == "current" or name.startswith("current_") for name in local):
+            raise Unsupported("FOREACH referring to the current item")
+        # Names that turn out not to be item fields are resolved for the row
+        references |= local
+
+        def foreach(values: dict[str, Value]) -> Value:
+            subject = subject_fn(values)
+            subjects = subject if _is_array(subject) else _objects_column([subject])
+            items, owners = [], []
+            for row, data in enumerate(subjects):
+                if not data:
+                    continue
+                for item in data if isinstance(data, list) else [data]:
+                    items.append(item)
+                    owners.append(row)
+            owners = np.array(owners, dtype=np.intp)
+
+            env = {name: value[owners] if _is_array(value) else value for name, value in values.items()}
+            for name in local:
+                fields = [isinstance(item, dict) and name in item for item in items]
+                if fields and all(fields):
+                    env[name] = _column([item[name] for item in items], name)
+                elif any(fields):
+                    raise Unsupported(f"{name} is a field of some of the items only")
+
+            result = np.zeros(len(subjects), dtype=np.int64)
+            if items:
+                item_values = item_fn(env)
+                if item_values is not None:
+                    item_values = np.broadcast_to(_numeric(item_values), len(items))
+                    if where_fn is not None:
+                        keep = np.broadcast_to(_truthy(where_fn(env)), len(items))
+                        item_values, owners = item_values[keep], owners[keep]
+                    result = _SEGMENT_OPS[combine](item_values, owners, len(subjects))
+            return result if _is_array(subject) else _python(result[0])
+
+        return foreach
+
+    def _compile_if(self, operation: dict[str, Any], references: set[str]) -> Vectorized:
+        branches = []
+        otherwise = None
+        for condition in operation.get("conditions", []):
+            if "test" in condition:
+                branches.append(
+                    (
+                        self._compile_operation(condition["test"], references),
+                        self._compile_field(condition, "then", references),
+                    )
+                )
+            elif "else" in condition:
+                otherwise = self._compile_value(condition["else"], references)
+                # The engine stops at the first else
+                break
+
+        def evaluate(values: dict[str, Value]) -> Value:
+            result = otherwise(values) if otherwise is not None else 0
+            # The first test that holds wins, so apply them from the last to the first
+            for test_fn, then_fn in reversed(branches):
+                test, then = _truthy(test_fn(values)), then_fn(values)
+                if not (_is_array(test) or _is_array(then) or _is_array(result)):
+                    result = then if test else result
+                elif _is_numeric(then) and _is_numeric(result):
+                    result = np.where(test, then, result)
+                else:
+                    # Keep strings and other values as the Python objects the engine would return
+                    result = np.where(test, _objects(then), _objects(result))
+            return result
+
+        return evaluate
+
+
+@dataclass
+class BatchResult:
+    """Results of evaluating a law for a batch of rows, as columns"""
+
+    requirements_met: list[bool]
+    missing_required: list[bool]
+    outputs: dict[str, list]
+    # For the laws of service references: per row, the tags of the data the result depends on
+    tags: list[set] | None = None
+
+
+class BatchEvaluator:
+    """
+    Evaluates a law for many rows of parameters at once.
+
+    Laws that VectorizedLaw can compile run on whole columns: their inputs are looked up per table and the
+    laws they reference are evaluated as batches as well. Rows the columns can't answer exactly (missing
+    values, claims) and laws that can't be compiled are evaluated row by row with the scalar RulesEngine, so
+    the results are the same as calling Services.evaluate for every row. Before evaluating rows one by one,
+    the service references of the law are evaluated as batches and put in the service reference cache, where
+    the engine finds them.
+
+    Referenced laws are evaluated once per batch, so an evaluator is meant for a single batch of a
+    Services instance whose data doesn't change in the meantime.
+    """
+
+    def __init__(self, services: Any, approved: bool = False) -> None:
+        self.services = services
+        self.approved = approved
+        self._laws: dict[int, VectorizedLaw | None] = {}
+        # Batches of referenced laws, by the identity of their parameter columns (kept alive next to the result)
+        self._batches: dict[tuple, tuple[BatchResult, dict[str, list]]] = {}
+        self._constants: dict[tuple, list] = {}
+        self.vectorized_rows = 0
+        self.scalar_rows = 0
+
+    def evaluate(
+        self,
+        service: str,
+        law: str,
+        parameters: dict[str, list],
+        size: int,
+        reference_date: str,
+        overwrite_input: dict[str, Any] | None = None,
+        overwrite_definitions: dict[str, Any] | None = None,
+        requested_output: str | None = None,
+        nested: bool = False,
+    ) -> BatchResult:
+        """Evaluate a law for size rows of parameters, given as a list of values per parameter"""
+        engine = self.services.services[service]._get_engine(law, reference_date)
+        vectorized_law = self._compile(engine)
+        overwrite_input = overwrite_input or {}
+        overwrite_definitions = overwrite_definitions or {}
+        references = _References(self, engine, parameters, size, reference_date, overwrite_input, overwrite_definitions)
+        result = BatchResult([False] * size, [False] * size, {}, [set() for _ in range(size)] if nested else None)
+
+        fallback = np.ones(size, dtype=bool)
+        values: dict[str, Value] = {}
+        if vectorized_law is not None and size:
+            try:
+                shadowed = vectorized_law.output_names & (
+                    parameters.keys() | engine.compiled_definitions.keys() | overwrite_definitions.keys()
+                )
+                if shadowed:
+                    # The engine resolves these names from the parameters or definitions, not the outputs
+                    raise Unsupported(f"outputs {shadowed} are shadowed")
+                fallback = self._claimed_rows(service, law, parameters, size)
+                for name in vectorized_law.references(requested_output):
+                    value, missing = references.resolve(name)
+                    values[name] = value
+                    fallback |= missing
+            except (Unsupported, KeyError, TypeError, ValueError) as e:
+                # Also when a referenced law has no version for the date: rows that need it raise in the engine
+                logger.debug(f"Evaluating {service}.{law} row by row: {e}")
+                fallback = np.ones(size, dtype=bool)
+
+        rows = np.flatnonzero(~fallback)
+        if len(rows):
+            try:
+                overwritten = overwrite_input.get(service, {})
+                met, computed = vectorized_law.run(
+                    {name: value[rows] if _is_array(value) else value for name, value in values.items()},
+                    len(rows),
+                    requested_output,
+                    {name: overwritten[name] for name in vectorized_law.output_names if name in overwritten},
+                    reference_date,
+                )
+            except (Unsupported, TypeError, ValueError, ArithmeticError) as e:
+                logger.debug(f"Evaluating {service}.{law} row by row: {e}")
+                fallback[:] = True
+            else:
+                self.vectorized_rows += len(rows)
+                for name, column in computed.items():
+                    output = result.outputs[name] = [None] * size
+                    for i, row in enumerate(rows):
+                        if met[i]:
+                            output[row] = column[i]
+                for i, row in enumerate(rows):
+                    result.requirements_met[row] = bool(met[i])
+                if nested:
+                    for row in rows:
+                        result.tags[row] = references.tags(row)
+
+        fallback_rows = np.flatnonzero(fallback)
+        for chunk in self._chunks(engine, fallback_rows):
+            if len(chunk) > 1:
+                self._prefetch(engine, references, chunk)
+            for row in chunk:
+                self.scalar_rows += 1
+                row_parameters = {name: column[row] for name, column in parameters.items()}
+                row_result, tags = self._evaluate_row(
+                    service,
+                    law,
+                    row_parameters,
+                    reference_date,
+                    overwrite_input,
+                    overwrite_definitions,
+                    requested_output,
+                    nested,
+                )
+                result.requirements_met[row] = row_result.requirements_met
+                result.missing_required[row] = row_result.missing_required
+                for name, value in row_result.output.items():
+                    result.outputs.setdefault(name, [None] * size)[row] = value
+                if nested:
+                    result.tags[row] = tags
+
+        return result
+
+    def evaluate_reference(
+        self,
+        service: str,
+        law: str,
+        field: str,
+        parameters: dict[str, list],
+        size: int,
+        reference_date: str,
+        overwrite_input: dict[str, Any],
+    ) -> BatchResult:
+        """Evaluate the field of a service reference for every row, evaluating each distinct batch once"""
+        key = (service, law, field, reference_date, tuple((name, id(column)) for name, column in parameters.items()))
+        if key not in self._batches:
+            result = self.evaluate(
+                service, law, parameters, size, reference_date, overwrite_input, requested_output=field, nested=True
+            )
+            self._batches[key] = result, parameters
+        return self._batches[key][0]
+
+    def constant(self, value: Any, size: int) -> list:
+        """A column with the same value in every row, shared so batches using it can be recognized"""
+        key = (type(value), value, size)
+        if key not in self._constants:
+            self._constants[key] = [value] * size
+        return self._constants[key]
+
+    def _compile(self, engine: RulesEngine) -> VectorizedLaw | None:
+        key = id(engine)
+        if key not in self._laws:
+            try:
+                self._laws[key] = VectorizedLaw(engine)
+            except Unsupported as e:
+                logger.debug(f"Can't vectorize {engine.service_name}.{engine.law}: {e}")
+                self._laws[key] = None
+        return self._laws[key]
+
+    def _claimed_rows(self, service: str, law: str, parameters: dict[str, list], size: int) -> np.ndarray:
+        """Rows of citizens with claims on this law, which the scalar engine resolves"""
+        claimed = np.zeros(size, dtype=bool)
+        bsns = parameters.get("BSN")
+        if bsns is not None:
+            claim_manager = self.services.claim_manager
+            for row, bsn in enumerate(bsns):
+                if claim_manager.get_claim_values(bsn, service, law, approved=self.approved):
+                    claimed[row] = True
+        return claimed
+
+    def _chunks(self, engine: RulesEngine, rows: np.ndarray) -> list[np.ndarray]:
+        """Split rows so the service references prefetched for a chunk fit in the cache together"""
+        references = sum(1 for spec in engine.property_specs.values() if spec.get("service_reference"))
+        size = max(1, self.services.service_reference_cache.maxsize // (2 * max(1, references)))
+        return [rows[i : i + size] for i in range(0, len(rows), size)]
+
+    def _prefetch(self, engine: RulesEngine, references: "_References", rows: np.ndarray) -> None:
+        """Evaluate the service references of a law as batches, and cache their values for the rows"""
+        cache = self.services.service_reference_cache
+        for spec in engine.property_specs.values():
+            service_ref = spec.get("service_reference")
+            if not service_ref:
+                continue
+            generation = cache.generation
+            try:
+                parameters, reference_date, result = references.service_batch(service_ref, spec)
+            except (Unsupported, KeyError, TypeError, ValueError) as e:
+                logger.debug(f"Not prefetching {service_ref['service']}.{service_ref['law']}: {e}")
+                continue
+
+            field = service_ref["field"]
+            values = result.outputs.get(field, [None] * references.size)
+            for row in rows:
+                try:
+                    key = service_reference_key(
+                        service_ref["service"],
+                        service_ref["law"],
+                        field,
+                        {name: column[row] for name, column in parameters.items()},
+                        reference_date,
+                        self.approved,
+                        references.overwrite_input,
+                    )
+                except TypeError:
+                    continue
+                # Cases of the referenced law are checked by the engine itself, on every evaluation
+                cache.put(key, (values[row], None), result.tags[row] | {("cases",)}, generation)
+
+    def _evaluate_row(
+        self,
+        service: str,
+        law: str,
+        parameters: dict[str, Any],
+        reference_date: str,
+        overwrite_input: dict[str, Any],
+        overwrite_definitions: dict[str, Any],
+        requested_output: str | None,
+        nested: bool,
+    ) -> tuple[Any, set]:
+        """
+        Evaluate one row with the scalar engine, returning the result and the tags of the data it depends on.
+        The row of a service reference goes through the service reference cache, like in RuleContext.
+        """
+        if not nested:
+            result = self.services.evaluate(
+                service,
+                law,
+                parameters,
+                reference_date,
+                overwrite_input or None,
+                overwrite_definitions or None,
+                requested_output=requested_output,
+                approved=self.approved,
+                trace=False,
+            )
+            return result, set()
+
+        cache = self.services.service_reference_cache
+        try:
+            key = service_reference_key(
+                service, law, requested_output, parameters, reference_date, self.approved, overwrite_input
+            )
+        except TypeError:
+            # Parameters that can't be frozen exactly, like tables, are evaluated without the cache
+            key = None
+        with cache.recording() as tags:
+            entry = cache.get(key) if key is not None else None
+            if entry is None:
+                generation = cache.generation
+                with cache.recording() as computed_tags:
+                    result = self.services.evaluate(
+                        service,
+                        law,
+                        parameters,
+                        reference_date,
+                        overwrite_input,
+                        requested_output=requested_output,
+                        approved=self.approved,
+                        trace=False,
+                    )
+                entry = (result.output.get(requested_output), None)
+                if key is not None:
+                    cache.put(key, entry, computed_tags, generation)
+        value = entry[0]
+        # Only the field is needed from a service reference
+        row_result = _RowResult(
+            requirements_met=value is not None,
+            missing_required=False,
+            output={requested_output: value} if value is not None else {},
+        )
+        return row_result, tags
+
+
+@dataclass
+class _RowResult:
+    requirements_met: bool
+    missing_required: bool
+    output: dict[str, Any]
+
+
+def _is_literal(value: Any) -> bool:
+    return value is None or (isinstance(value, str | bool | int | float) and not str(value).startswith("$"))
+
+
+def _column(values: list, name: str) -> Value:
+    """Values computed row by row as an array, or None when missing for every row"""
+    array, missing = as_column(values)
+    if missing.all():
+        return None
+    if missing.any():
+        raise Unsupported(f"{name} is missing for some rows")
+    return array
+
+
+def _objects_column(values: list) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _walk(value: Any, path: list[str]) -> Any:
+    """Follow the dots of a reference into a value, like RuleContext does"""
+    for p in path:
+        if value is None:
+            return None
+        if isinstance(value, list):
+            value = [item.get(p) if isinstance(item, dict) else getattr(item, p, None) for item in value]
+        elif isinstance(value, dict):
+            value = value.get(p)
+        elif hasattr(value, p):
+            value = getattr(value, p)
+        else:
+            return None
+    return value
+
+
+def _exists(subject: Any) -> bool:
+    # Like the EXISTS operation of the engine
+    if subject is None:
+        return False
+    if isinstance(subject, list | tuple | dict) or hasattr(subject, "__len__"):
+        return len(subject) > 0
+    return bool(subject)
+
+
+@dataclass
+class _DateContext:
+    """The part of RuleContext that date operations use"""
+
+    calculation_date: str
+    missing_required: bool = False
+
+
+def _date_operation(op_type: str, values: list[Any], unit: str, calculation_date: str) -> Any:
+    context = _DateContext(calculation_date)
+    result = RulesEngine._evaluate_date_operation(op_type, values, unit, context)
+    if context.missing_required:
+        raise Unsupported(f"{op_type} of invalid dates")
+    return result
+
+
+def _objects(value: Value) -> Value:
+    if _is_array(value):
+        return value.astype(object)
+    array = np.empty((), dtype=object)
+    array[()] = value
+    return array
+
+
+def _python(value: Any) -> Any:
+    """Convert a numpy scalar to the equivalent Python value"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class _References:
+    """Resolves the references of a law to columns, in the same order of precedence as RuleContext"""
+
+    def __init__(
+        self,
+        evaluator: BatchEvaluator,
+        engine: RulesEngine,
+        parameters: dict[str, list],
+        size: int,
+        reference_date: str,
+        overwrite_input: dict[str, Any],
+        overwrite_definitions: dict[str, Any],
+    ) -> None:
+        self.evaluator = evaluator
+        self.engine = engine
+        self.parameters = parameters
+        self.size = size
+        self.reference_date = reference_date
+        self.overwrite_input = overwrite_input
+        self.overwrite_definitions = overwrite_definitions
+        # Only used for its date references
+        self.context = RuleContext(
+            definitions={},
+            service_provider=None,
+            parameters={},
+            property_specs={},
+            output_specs={},
+            sources={},
+            calculation_date=reference_date,
+            trace=False,
+        )
+        self._columns: dict[str, tuple[list, Value, np.ndarray | bool]] = {}
+        # Tags of the data the resolved values depend on: for all rows, and per row from referenced laws
+        self._tags: set = set()
+        self._row_tags: list[list[set]] = []
+
+    def tags(self, row: int) -> set:
+        """The tags of the data the values of a row depend on, like the engine records them"""
+        tags = set(self._tags)
+        if "BSN" in self.parameters:
+            tags.add(("bsn", self.parameters["BSN"][row]))
+        for row_tags in self._row_tags:
+            tags |= row_tags[row]
+        return tags
+
+    def resolve(self, name: str) -> tuple[Value, np.ndarray | bool]:
+        """The value of $name as a scalar or array, with the mask of rows where it's missing"""
+        value = self._constant(name)
+        if value is not None:
+            if isinstance(value, date):
+                raise Unsupported(f"date value for ${name}")
+            return value, False
+        _, array, missing = self.column(name)
+        all_missing = missing is True or (_is_array(missing) and missing.all())
+        root = name.split(".", 1)[0]
+        if all_missing and not self.engine.property_specs.get(root, {}).get("required", False):
+            # Missing for every row, but the engine doesn't mind: evaluate with None on columns as well
+            return None, False
+        return array, missing
+
+    def column(self, name: str) -> tuple[list, Value, np.ndarray | bool]:
+        """The values of $name as a list per row, as an array, and the mask of missing values"""
+        if name not in self._columns:
+            values = self._resolve_column(name)
+            if isinstance(values, list):
+                array, missing = as_column(values)
+            else:
+                array, missing = values, values is None
+                values = [values] * self.size
+            self._columns[name] = values, array, missing
+        return self._columns[name]
+
+    def _constant(self, name: str) -> Any:
+        """The value of $name when it's the same for all rows: a date reference or a definition"""
+        value = self.context._resolve_date(name)
+        if value is not None:
+            return value
+        if name in self.overwrite_definitions:
+            return self.overwrite_definitions[name]
+        return self.engine.compiled_definitions.get(name)
+
+    def _reference(self, reference: Any) -> list:
+        """A parameter of a service reference or a select_on value, as a list with its value for every row"""
+        value = reference
+        if isinstance(reference, str) and reference.startswith("$"):
+            name = reference[1:]
+            value = self._constant(name)
+            if value is None:
+                return self.column(name)[0]
+        if isinstance(value, list | dict):
+            raise Unsupported(f"reference {reference!r} to more than one value")
+        return self.evaluator.constant(value, self.size)
+
+    def _resolve_column(self, name: str) -> list | Any:
+        engine = self.engine
+        if "." in name:
+            root, path = name.split(".", 1)
+            value = self._constant(root)
+            if value is not None:
+                return _walk(value, path.split("."))
+            return [_walk(value, path.split(".")) for value in self.column(root)[0]]
+        if name in self.parameters:
+            spec = engine.property_specs.get(name)
+            values = self.parameters[name]
+            if spec is not None:
+                values = [RuleContext._coerce_claim_value(value, spec) for value in values]
+            return values
+        if any(action["output"] == name for action in engine.actions):
+            raise Unsupported(f"${name} refers to an output of the law")
+
+        spec = engine.property_specs.get(name)
+        if spec is None:
+            return None
+
+        service_ref = spec.get("service_reference", {})
+        if (
+            service_ref
+            and service_ref["service"] in self.overwrite_input
+            and service_ref["field"] in self.overwrite_input[service_ref["service"]]
+        ):
+            return self.overwrite_input[service_ref["service"]][service_ref["field"]]
+
+        source_ref = spec.get("source_reference", {})
+        if source_ref:
+            if (
+                source_ref.get("source_type") in self.overwrite_input
+                and name in self.overwrite_input[source_ref["source_type"]]
+            ):
+                return self.overwrite_input[source_ref["source_type"]][name]
+            values = self._resolve_source(name, source_ref, spec)
+            if values is not None:
+                return values
+
+        if service_ref:
+            return self._resolve_service(service_ref, spec)
+        return None
+
+    def _resolve_service(self, service_ref: dict[str, Any], spec: dict[str, Any]) -> list:
+        _, _, result = self.service_batch(service_ref, spec)
+        self._tags.add(("cases", service_ref["service"], service_ref["law"]))
+        self._row_tags.append(result.tags)
+        return result.outputs.get(service_ref["field"], [None] * self.size)
+
+    def service_batch(
+        self, service_ref: dict[str, Any], spec: dict[str, Any]
+    ) -> tuple[dict[str, list], str, BatchResult]:
+        """Evaluate a service reference for all rows: its parameters, reference date and the batch result"""
+        if self.evaluator.services.case_manager.get_approved_cases(service_ref["service"], service_ref["law"]):
+            raise Unsupported(f"approved cases for {service_ref['service']}.{service_ref['law']}")
+
+        parameters = dict(self.parameters)
+        for parameter in service_ref.get("parameters", []):
+            parameters[parameter["name"]] = self._reference(parameter["reference"])
+
+        reference_date = self.reference_date
+        if "temporal" in spec and "reference" in spec["temporal"]:
+            reference_dates = self._reference(spec["temporal"]["reference"])
+            reference_date = reference_dates[0]
+            if any(value != reference_date for value in reference_dates):
+                raise Unsupported("reference date per row")
+
+        result = self.evaluator.evaluate_reference(
+            service_ref["service"],
+            service_ref["law"],
+            service_ref["field"],
+            parameters,
+            self.size,
+            reference_date,
+            self.overwrite_input,
+        )
+        return parameters, reference_date, result
+
+    def _resolve_source(self, name: str, source_ref: dict[str, Any], spec: dict[str, Any]) -> list | None:
+        """Look up the rows of a table selected by every row, grouping the table on the selected columns once"""
+        source_type = source_ref.get("source_type")
+        if source_type in ("laws", "events", "cases"):
+            raise Unsupported(f"source type {source_type}")
+        if source_ref.get("aggregation"):
+            raise Unsupported(f"source {name} is aggregated")
+
+        services = self.evaluator.services
+        table = source_ref.get("table")
+        df = None
+        if source_type and source_type in services.services:
+            df = services.services[source_type].source_dataframes.get(table)
+        else:
+            df = services.sources.merged_tables.get(table)
+        if df is None:
+            return None
+
+        fields = source_ref.get("fields", [])
+        field = source_ref.get("field")
+        if fields:
+            fields = [f for f in fields if f in df.columns]
+            columns = [df[f].tolist() for f in fields]
+            if columns:
+                records = [dict(zip(fields, values, strict=True)) for values in zip(*columns, strict=True)]
+            else:
+                # Like df[[]].to_dict("records"): an empty record per row
+                records = [{} for _ in range(len(df))]
+        elif field:
+            if field not in df.columns:
+                return [None] * self.size
+            records = df[field].tolist()
+        else:
+            records = df.to_dict("records")
+
+        key_columns = [select_on["name"] for select_on in source_ref.get("select_on", [])]
+        keys = [self._reference(select_on["value"]) for select_on in source_ref.get("select_on", [])]
+        groups: dict[tuple, list[int]] = {}
+        for position, key in enumerate(zip(*(df[column].tolist() for column in key_columns), strict=True)):
+            groups.setdefault(key, []).append(position)
+        if not key_columns:
+            groups = {(): list(range(len(df)))}
+
+        expected_type = spec.get("type")
+        results: dict[tuple, Any] = {}
+        column = []
+        for key in zip(*keys, strict=True) if keys else [()] * self.size:
+            # Missing values don't match anything, like df[column] == None
+            if any(k is None or (isinstance(k, float) and k != k) for k in key):
+                key = None
+            if key not in results:
+                positions = groups.get(key, []) if key is not None else []
+                results[key] = _source_result([records[p] for p in positions], expected_type)
+            column.append(results[key])
+        return column
+
+
+def _source_result(result: list, expected_type: str | None) -> Any:
+    """The value of a source for the rows selected from its table, like RuleContext._resolve_from_source"""
+    if len(result) == 0:
+        return [] if expected_type == "array" else None
+    result = clean_nan_value(result)
+    if expected_type == "array":
+        if len(result) == 1 and isinstance(result[0], list):
+            return result[0]
+        return result
+    if (
+        len(result) > 1
+        and all(isinstance(v, str | int | float | bool | type(None)) for v in result)
+        and len(set(str(v) for v in result)) == 1
+    ):
+        return result[0]
+    if len(result) == 1:
+        return result[0]
+    return result
@@ -79,7 +79,7 @@ def apply_custom_parameters(simulator: LawSimulator, params: dict):
         }
 
 
-def run_simulation(params: dict):
+def run_simulation(params: dict, workers: int = 1):
     """Run simulation with given parameters and return results as JSON."""
     num_people = params.get("num_people", 1000)
     simulation_date = params.get("simulation_date", datetime.now().strftime("%Y-%m-%d"))
@@ -94,15 +94,20 @@ def run_simulation(params: dict):
         apply_custom_parameters(simulator, params)
 
     # Run simulation with optional population_id
-    results_df = simulator.run_simulation(num_people=num_people, population_id=population_id)
+    results_df = simulator.run_simulation(num_people=num_people, population_id=population_id, workers=workers)
 
     # Get summary with breakdowns using the method from simulate.py
     return simulator.get_summary_with_breakdowns(results_df, simulation_date)
 
 
 if __name__ == "__main__":
+    import argparse
     import logging
 
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes for run_simulation")
+    args = parser.parse_args()
+
     # Set up logging
     logging.basicConfig(level=logging.ERROR)
     logger = logging.getLogger(__name__)
@@ -114,7 +119,7 @@ if __name__ == "__main__":
     operation = params.get("operation", "run_simulation")
 
     try:
-        result = create_population(params) if operation == "create_population" else run_simulation(params)
+        result = create_population(params) if operation == "create_population" else run_simulation(params, args.workers)
         print(json.dumps(result))
     except Exception as e:
         # Log full error server-side for debugging
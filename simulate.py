@@ -1,6 +1,7 @@
 import itertools
 import json
 import logging
+import multiprocessing
 import random
 import sys
 import uuid
@@ -25,6 +26,9 @@ logger.setLevel(logging.ERROR)
 # Directory for storing populations
 POPULATIONS_DIR = Path("data/populations")
 
+# The simulator, its people and whether to vectorize, inherited by the forked workers of run_simulation
+_shard_state = None
+
 
 class LawSimulator:
     def __init__(self, simulation_date="2025-03-01", law_parameters=None) -> None:
@@ -1154,143 +1158,111 @@ class LawSimulator:
 
         # Submit claims for huurtoeslag (rent subsidy)
         # These are required as claims, not regular data sources
-        renters_count = 0
+        renters = [person for person in people if person["housing_type"] == "rent"]
+        claims = []
+        for person in renters:
+            for key, value, reason in (
+                # Rent price
+                ("HUURPRIJS", person["rent_amount"], "Simulated rent claim"),
+                # Service costs
+                ("SERVICEKOSTEN", person["rent_service_costs"], "Simulated service costs claim"),
+                # Subsidizable service costs
+                (
+                    "SUBSIDIABELE_SERVICEKOSTEN",
+                    person["eligible_service_costs"],
+                    "Simulated subsidizable service costs claim",
+                ),
+            ):
+                claims.append(
+                    {
+                        "service": "TOESLAGEN",
+                        "key": key,
+                        "new_value": value,
+                        "reason": reason,
+                        "claimant": "BURGER",
+                        "law": "wet_op_de_huurtoeslag",
+                        "bsn": person["bsn"],
+                    }
+                )
         claims_submitted = 0
-        for person in people:
-            if person["housing_type"] == "rent":
-                renters_count += 1
-                bsn = person["bsn"]
-                try:
-                    # Submit claim for HUURPRIJS (rent price)
-                    claim1 = self.services.claim_manager.submit_claim(
-                        service="TOESLAGEN",
-                        key="HUURPRIJS",
-                        new_value=person["rent_amount"],
-                        reason="Simulated rent claim",
-                        claimant="BURGER",
-                        law="wet_op_de_huurtoeslag",
-                        bsn=bsn,
-                        auto_approve=True,
-                    )
-                    # Submit claim for SERVICEKOSTEN (service costs)
-                    claim2 = self.services.claim_manager.submit_claim(
-                        service="TOESLAGEN",
-                        key="SERVICEKOSTEN",
-                        new_value=person["rent_service_costs"],
-                        reason="Simulated service costs claim",
-                        claimant="BURGER",
-                        law="wet_op_de_huurtoeslag",
-                        bsn=bsn,
-                        auto_approve=True,
-                    )
-                    # Submit claim for SUBSIDIABELE_SERVICEKOSTEN (subsidizable service costs)
-                    claim3 = self.services.claim_manager.submit_claim(
-                        service="TOESLAGEN",
-                        key="SUBSIDIABELE_SERVICEKOSTEN",
-                        new_value=person["eligible_service_costs"],
-                        reason="Simulated subsidizable service costs claim",
-                        claimant="BURGER",
-                        law="wet_op_de_huurtoeslag",
-                        bsn=bsn,
-                        auto_approve=True,
-                    )
-                    claims_submitted += 1
-                    logger.debug(
-                        f"Submitted huurtoeslag claims for BSN {bsn}: rent={person['rent_amount']}, claims={claim1},{claim2},{claim3}"
-                    )
-                except Exception as e:
-                    logger.error(f"Error submitting huurtoeslag claims for BSN {bsn}: {e}")
-                    import traceback
+        try:
+            # All claims in one transaction
+            self.services.claim_manager.submit_claims_bulk(claims, auto_approve=True)
+            claims_submitted = len(renters)
+        except Exception as e:
+            logger.error(f"Error submitting huurtoeslag claims: {e}")
+            import traceback
 
-                    logger.error(traceback.format_exc())
+            logger.error(traceback.format_exc())
 
-        print(f"Submitted huurtoeslag claims for {claims_submitted}/{renters_count} renters", file=sys.stderr)
+        print(f"Submitted huurtoeslag claims for {claims_submitted}/{len(renters)} renters", file=sys.stderr)
 
         # Submit claims for kinderopvangtoeslag (childcare subsidy)
         parents_count = 0
-        childcare_claims_submitted = 0
+        claims = []
         for person in people:
             if person.get("has_children") and person.get("children_data"):
                 # Check if any children are under 12
                 young_children = [child for child in person["children_data"] if child["age"] < 12]
                 if young_children:
                     parents_count += 1
-                    bsn = person["bsn"]
-                    try:
-                        # Submit KvK number claim
-                        self.services.claim_manager.submit_claim(
-                            service="TOESLAGEN",
-                            key="KINDEROPVANG_KVK",
-                            new_value="12345678",  # Simulated childcare provider KvK
-                            reason="Simulated childcare provider",
-                            claimant="BURGER",
-                            law="wet_kinderopvang",
-                            bsn=bsn,
-                            auto_approve=True,
-                        )
 
-                        # Submit childcare hours for each young child
-                        aangegeven_uren = []
-                        for child in young_children:
-                            # Simulate different childcare hours based on child age
-                            if child["age"] < 4:
-                                # Daycare for toddlers (full-time)
-                                hours_per_year = 2000
-                                hourly_rate = 850  # €8.50 per hour
-                                care_type = "DAGOPVANG"
-                            else:
-                                # After school care for school-age children
-                                hours_per_year = 800
-                                hourly_rate = 750  # €7.50 per hour
-                                care_type = "BUITENSCHOOLSE_OPVANG"
-
-                            aangegeven_uren.append(
-                                {
-                                    "kind_bsn": child["bsn"],
-                                    "uren_per_jaar": hours_per_year,
-                                    "uurtarief": hourly_rate,
-                                    "soort_opvang": care_type,
-                                }
-                            )
-
-                        # Submit childcare hours claim
-                        self.services.claim_manager.submit_claim(
-                            service="TOESLAGEN",
-                            key="AANGEGEVEN_UREN",
-                            new_value=aangegeven_uren,
-                            reason="Simulated childcare hours",
-                            claimant="BURGER",
-                            law="wet_kinderopvang",
-                            bsn=bsn,
-                            auto_approve=True,
-                        )
-
-                        # Submit partner hours (0 if no partner, otherwise partner's worked hours)
-                        partner_hours = 0
-                        if person.get("has_partner"):
-                            # Assume partner works full-time
-                            partner_hours = 1920
-
-                        self.services.claim_manager.submit_claim(
-                            service="TOESLAGEN",
-                            key="VERWACHTE_PARTNER_UREN",
-                            new_value=partner_hours,
-                            reason="Simulated partner work hours",
-                            claimant="BURGER",
-                            law="wet_kinderopvang",
-                            bsn=bsn,
-                            auto_approve=True,
+                    # Childcare hours for each young child
+                    aangegeven_uren = []
+                    for child in young_children:
+                        # Simulate different childcare hours based on child age
+                        if child["age"] < 4:
+                            # Daycare for toddlers (full-time)
+                            hours_per_year = 2000
+                            hourly_rate = 850  # €8.50 per hour
+                            care_type = "DAGOPVANG"
+                        else:
+                            # After school care for school-age children
+                            hours_per_year = 800
+                            hourly_rate = 750  # €7.50 per hour
+                            care_type = "BUITENSCHOOLSE_OPVANG"
+
+                        aangegeven_uren.append(
+                            {
+                                "kind_bsn": child["bsn"],
+                                "uren_per_jaar": hours_per_year,
+                                "uurtarief": hourly_rate,
+                                "soort_opvang": care_type,
+                            }
                         )
 
-                        childcare_claims_submitted += 1
-                        logger.debug(
-                            f"Submitted kinderopvangtoeslag claims for BSN {bsn} with {len(young_children)} young children"
+                    # Partner hours (0 if no partner, otherwise partner's worked hours)
+                    partner_hours = 0
+                    if person.get("has_partner"):
+                        # Assume partner works full-time
+                        partner_hours = 1920
+
+                    for key, value, reason in (
+                        # Simulated childcare provider KvK
+                        ("KINDEROPVANG_KVK", "12345678", "Simulated childcare provider"),
+                        ("AANGEGEVEN_UREN", aangegeven_uren, "Simulated childcare hours"),
+                        ("VERWACHTE_PARTNER_UREN", partner_hours, "Simulated partner work hours"),
+                    ):
+                        claims.append(
+                            {
+                                "service": "TOESLAGEN",
+                                "key": key,
+                                "new_value": value,
+                                "reason": reason,
+                                "claimant": "BURGER",
+                                "law": "wet_kinderopvang",
+                                "bsn": person["bsn"],
+                            }
                         )
-                    except Exception as e:
-                        logger.error(f"Error submitting kinderopvangtoeslag claims for BSN {bsn}: {e}")
-                        import traceback
+        childcare_claims_submitted = 0
+        try:
+            self.services.claim_manager.submit_claims_bulk(claims, auto_approve=True)
+            childcare_claims_submitted = parents_count
+        except Exception as e:
+            logger.error(f"Error submitting kinderopvangtoeslag claims: {e}")
+            import traceback
 
-                        logger.error(traceback.format_exc())
+            logger.error(traceback.format_exc())
 
         print(
             f"Submitted kinderopvangtoeslag claims for {childcare_claims_submitted}/{parents_count} parents with young children",
@@ -1312,8 +1284,12 @@ class LawSimulator:
 
         return people
 
-    def simulate_person(self, person) -> None:
-        """Simulate all applicable laws for a person and calculate besteedbaar inkomen"""
+    def simulate_person(self, person, evaluations=None) -> None:
+        """
+        Simulate all applicable laws for a person and calculate besteedbaar inkomen.
+
+        Laws in evaluations, the results of _evaluate_population for this person, aren't evaluated again.
+        """
         has_partner = bool(person["partner_bsn"])
 
         # Base result with personal information
@@ -1341,59 +1317,32 @@ class LawSimulator:
         # Evaluate all relevant laws
         try:
             # 1. Zorgtoeslag (healthcare subsidy)
-            zorgtoeslag_input, zorgtoeslag_defs = self._create_law_overrides("zorgtoeslagwet")
-            zorgtoeslag = self.services.evaluate(
-                "TOESLAGEN",
-                "zorgtoeslagwet",
-                {"BSN": person["bsn"]},
-                self.simulation_date,
-                overwrite_input=zorgtoeslag_input,
-                overwrite_definitions=zorgtoeslag_defs,
-            )
+            zorgtoeslag = self._evaluate(person, "TOESLAGEN", "zorgtoeslagwet", evaluations=evaluations)
 
             # Also evaluate 2024 version for comparison if simulating in 2025
             zorgtoeslag_2024 = None
             if self.simulation_date.startswith("2025"):
                 try:
-                    zorgtoeslag_2024 = self.services.evaluate(
-                        "TOESLAGEN",
-                        "zorgtoeslagwet",
-                        {"BSN": person["bsn"]},
-                        "2024-12-31",
-                        overwrite_input=zorgtoeslag_input,
-                        overwrite_definitions=zorgtoeslag_defs,
+                    zorgtoeslag_2024 = self._evaluate(
+                        person, "TOESLAGEN", "zorgtoeslagwet", "2024-12-31", evaluations=evaluations
                     )
                 except Exception:
                     pass
 
             # 2. AOW (state pension)
-            aow = self.services.evaluate("SVB", "algemene_ouderdomswet", {"BSN": person["bsn"]}, self.simulation_date)
+            aow = self._evaluate(person, "SVB", "algemene_ouderdomswet", overrides=False, evaluations=evaluations)
 
             # 3. Huurtoeslag (rent subsidy)
             try:
-                huurtoeslag_input, huurtoeslag_defs = self._create_law_overrides("wet_op_de_huurtoeslag")
-                huurtoeslag = self.services.evaluate(
-                    "TOESLAGEN",
-                    "wet_op_de_huurtoeslag",
-                    {"BSN": person["bsn"]},
-                    self.simulation_date,
-                    overwrite_input=huurtoeslag_input,
-                    overwrite_definitions=huurtoeslag_defs,
-                )
+                huurtoeslag = self._evaluate(person, "TOESLAGEN", "wet_op_de_huurtoeslag", evaluations=evaluations)
             except Exception as e:
                 logger.debug(f"Error evaluating huurtoeslag for BSN {person['bsn']}: {e}")
                 huurtoeslag = None
 
             # 4. Bijstand (social assistance)
             try:
-                bijstand_input, bijstand_defs = self._create_law_overrides("participatiewet/bijstand")
-                bijstand = self.services.evaluate(
-                    "GEMEENTE_AMSTERDAM",
-                    "participatiewet/bijstand",
-                    {"BSN": person["bsn"]},
-                    self.simulation_date,
-                    overwrite_input=bijstand_input,
-                    overwrite_definitions=bijstand_defs,
+                bijstand = self._evaluate(
+                    person, "GEMEENTE_AMSTERDAM", "participatiewet/bijstand", evaluations=evaluations
                 )
             except Exception:
                 bijstand = None
@@ -1403,14 +1352,8 @@ class LawSimulator:
             kinderopvangtoeslag = None
             if person["has_children"] and any(child["age"] < 12 for child in person.get("children_data", [])):
                 try:
-                    kinderopvang_input, kinderopvang_defs = self._create_law_overrides("wet_kinderopvang")
-                    kinderopvangtoeslag = self.services.evaluate(
-                        "TOESLAGEN",
-                        "wet_kinderopvang",
-                        {"BSN": person["bsn"]},
-                        self.simulation_date,
-                        overwrite_input=kinderopvang_input,
-                        overwrite_definitions=kinderopvang_defs,
+                    kinderopvangtoeslag = self._evaluate(
+                        person, "TOESLAGEN", "wet_kinderopvang", evaluations=evaluations
                     )
                 except Exception as e:
                     logger.debug(f"Error evaluating kinderopvangtoeslag for BSN {person['bsn']}: {e}")
@@ -1420,16 +1363,8 @@ class LawSimulator:
             kindgebonden_budget = None
             if person["has_children"]:
                 try:
-                    kindgebonden_budget_input, kindgebonden_budget_defs = self._create_law_overrides(
-                        "wet_op_het_kindgebonden_budget"
-                    )
-                    kindgebonden_budget = self.services.evaluate(
-                        "TOESLAGEN",
-                        "wet_op_het_kindgebonden_budget",
-                        {"BSN": person["bsn"]},
-                        self.simulation_date,
-                        overwrite_input=kindgebonden_budget_input,
-                        overwrite_definitions=kindgebonden_budget_defs,
+                    kindgebonden_budget = self._evaluate(
+                        person, "TOESLAGEN", "wet_op_het_kindgebonden_budget", evaluations=evaluations
                     )
                 except Exception as e:
                     logger.debug(f"Error evaluating kindgebonden budget for BSN {person['bsn']}: {e}")
@@ -1438,15 +1373,7 @@ class LawSimulator:
             # 7. WW-uitkering (unemployment benefit)
             ww_uitkering = None
             try:
-                ww_input, ww_defs = self._create_law_overrides("werkloosheidswet")
-                ww_uitkering = self.services.evaluate(
-                    "UWV",
-                    "werkloosheidswet",
-                    {"BSN": person["bsn"]},
-                    self.simulation_date,
-                    overwrite_input=ww_input,
-                    overwrite_definitions=ww_defs,
-                )
+                ww_uitkering = self._evaluate(person, "UWV", "werkloosheidswet", evaluations=evaluations)
             except Exception as e:
                 import traceback
 
@@ -1455,25 +1382,11 @@ class LawSimulator:
                 ww_uitkering = None
 
             # 8. Kiesrecht (voting rights)
-            kiesrecht_input, kiesrecht_defs = self._create_law_overrides("kieswet")
-            kiesrecht = self.services.evaluate(
-                "KIESRAAD",
-                "kieswet",
-                {"BSN": person["bsn"]},
-                self.simulation_date,
-                overwrite_input=kiesrecht_input,
-                overwrite_definitions=kiesrecht_defs,
-            )
+            kiesrecht = self._evaluate(person, "KIESRAAD", "kieswet", evaluations=evaluations)
 
             # 9. Inkomstenbelasting (income tax)
-            ib_overwrite_input, ib_overwrite_definitions = self._create_law_overrides("wet_inkomstenbelasting")
-            inkomstenbelasting = self.services.evaluate(
-                "BELASTINGDIENST",
-                "wet_inkomstenbelasting",
-                {"BSN": person["bsn"]},
-                self.simulation_date,
-                overwrite_input=ib_overwrite_input,
-                overwrite_definitions=ib_overwrite_definitions,
+            inkomstenbelasting = self._evaluate(
+                person, "BELASTINGDIENST", "wet_inkomstenbelasting", evaluations=evaluations
             )
         except Exception:
             return None
@@ -1563,6 +1476,75 @@ class LawSimulator:
 
         self.results.append(result)
 
+    def _evaluate(self, person, service, law, reference_date=None, overrides=True, evaluations=None):
+        """Evaluate a law for a person, unless evaluations already has its result"""
+        reference_date = reference_date or self.simulation_date
+        if evaluations and (service, law, reference_date) in evaluations:
+            return evaluations[service, law, reference_date]
+
+        overwrite_input, overwrite_definitions = self._create_law_overrides(law) if overrides else (None, None)
+        return self.services.evaluate(
+            service,
+            law,
+            {"BSN": person["bsn"]},
+            reference_date,
+            overwrite_input=overwrite_input,
+            overwrite_definitions=overwrite_definitions,
+            trace=False,
+        )
+
+    def _applicable_laws(self, person):
+        """The (service, law, reference_date, overrides) that simulate_person evaluates for a person"""
+        laws = [("TOESLAGEN", "zorgtoeslagwet", self.simulation_date, True)]
+        if self.simulation_date.startswith("2025"):
+            laws.append(("TOESLAGEN", "zorgtoeslagwet", "2024-12-31", True))
+        laws += [
+            ("SVB", "algemene_ouderdomswet", self.simulation_date, False),
+            ("TOESLAGEN", "wet_op_de_huurtoeslag", self.simulation_date, True),
+            ("GEMEENTE_AMSTERDAM", "participatiewet/bijstand", self.simulation_date, True),
+        ]
+        if person["has_children"] and any(child["age"] < 12 for child in person.get("children_data", [])):
+            laws.append(("TOESLAGEN", "wet_kinderopvang", self.simulation_date, True))
+        if person["has_children"]:
+            laws.append(("TOESLAGEN", "wet_op_het_kindgebonden_budget", self.simulation_date, True))
+        laws += [
+            ("UWV", "werkloosheidswet", self.simulation_date, True),
+            ("KIESRAAD", "kieswet", self.simulation_date, True),
+            ("BELASTINGDIENST", "wet_inkomstenbelasting", self.simulation_date, True),
+        ]
+        return laws
+
+    def _evaluate_population(self, people):
+        """
+        Evaluate every law for all people it applies to at once, with the vectorized evaluator.
+
+        Returns per BSN the results by (service, law, reference_date), to pass to simulate_person. Laws whose
+        batch fails are left out, so simulate_person evaluates them per person as before.
+        """
+        evaluations = {person["bsn"]: {} for person in people}
+        batches = {}
+        for person in people:
+            for law in self._applicable_laws(person):
+                batches.setdefault(law, []).append(person["bsn"])
+
+        for (service, law, reference_date, overrides), bsns in batches.items():
+            overwrite_input, overwrite_definitions = self._create_law_overrides(law) if overrides else (None, None)
+            try:
+                results = self.services.services[service].evaluate_many(
+                    law,
+                    reference_date,
+                    [{"BSN": bsn} for bsn in bsns],
+                    overwrite_input=overwrite_input or None,
+                    overwrite_definitions=overwrite_definitions or None,
+                    vectorized=True,
+                )
+            except Exception as e:
+                logger.debug(f"Error evaluating {law} for the population, evaluating it per person: {e}")
+                continue
+            for bsn, result in zip(bsns, results, strict=True):
+                evaluations[bsn][service, law, reference_date] = result
+        return evaluations
+
     def _create_law_overrides(self, law_name):
         """
         Create override dicts for a specific law based on UI parameters.
@@ -1626,8 +1608,14 @@ class LawSimulator:
         else:
             return None, people
 
-    def run_simulation(self, num_people=1000, population_id=None):
-        """Run simulation with either a new or existing population."""
+    def run_simulation(self, num_people=1000, population_id=None, vectorized=True, workers=1):
+        """
+        Run simulation with either a new or existing population.
+
+        With vectorized, each law is evaluated for the whole population at once (see machine.vectorized) before
+        the results are combined per person. With more than one worker, the people are simulated in forked
+        processes, see _simulate_parallel.
+        """
         import sys
 
         # Use existing population if provided
@@ -1645,11 +1633,15 @@ class LawSimulator:
         total_people = len(people)
 
         print(f"Simulating laws for {total_people} people...", file=sys.stderr)
-        progress_bar = tqdm(total=total_people, desc="Simulating", unit="person", file=sys.stderr)
-        for person in people:
-            self.simulate_person(person)
-            progress_bar.update(1)
-        progress_bar.close()
+        if workers > 1:
+            self._simulate_parallel(people, workers, vectorized)
+        else:
+            evaluations = self._evaluate_population(people) if vectorized else {}
+            progress_bar = tqdm(total=total_people, desc="Simulating", unit="person", file=sys.stderr)
+            for person in people:
+                self.simulate_person(person, evaluations.get(person["bsn"]))
+                progress_bar.update(1)
+            progress_bar.close()
 
         # Convert to DataFrame
         results_df = pd.DataFrame([r for r in self.results if r is not None])
@@ -1660,6 +1652,46 @@ class LawSimulator:
         else:
             raise ValueError("Simulation failed to generate valid results")
 
+    @staticmethod
+    def _shard_households(people, num_shards):
+        """Split the people into shards of positions, keeping partners together"""
+        households = {}
+        for position, person in enumerate(people):
+            household = min(person["bsn"], person["partner_bsn"] or person["bsn"])
+            households.setdefault(household, []).append(position)
+
+        shards = [[] for _ in range(num_shards)]
+        for i, positions in enumerate(households.values()):
+            shards[i % num_shards].extend(positions)
+        return [shard for shard in shards if shard]
+
+    def _simulate_parallel(self, people, workers, vectorized):
+        """
+        Simulate the people in forked worker processes, which share the source data copy-on-write.
+
+        People are sharded by household, so partners are simulated by the same worker. The results are merged in
+        the order of the people, so they don't depend on the number of workers.
+        """
+        global _shard_state
+
+        # A shard per worker, so each law is evaluated in batches as large as possible
+        shards = self._shard_households(people, workers)
+        results = {}
+        _shard_state = (self, people, vectorized)
+        try:
+            with (
+                multiprocessing.get_context("fork").Pool(workers) as pool,
+                tqdm(total=len(people), desc="Simulating", unit="person", file=sys.stderr) as progress_bar,
+            ):
+                for shard, shard_results in zip(shards, pool.imap(_simulate_shard, shards), strict=True):
+                    for result in shard_results:
+                        results[result["bsn"]] = result
+                    progress_bar.update(len(shard))
+        finally:
+            _shard_state = None
+
+        self.results.extend(results[person["bsn"]] for person in people if person["bsn"] in results)
+
     def setup_test_data_from_people(self, people, random_seed=None):
         """Setup test data from pre-existing people list (for loaded populations)."""
         # Convert the people list into pairs format expected by setup_test_data
@@ -2410,6 +2442,17 @@ class LawSimulator:
         }
 
 
+def _simulate_shard(positions):
+    """Simulate the people at positions in a worker process, returning their results"""
+    simulator, people, vectorized = _shard_state
+    shard = [people[position] for position in positions]
+    simulator.results = []
+    evaluations = simulator._evaluate_population(shard) if vectorized else {}
+    for person in shard:
+        simulator.simulate_person(person, evaluations.get(person["bsn"]))
+    return simulator.results
+
+
 def format_money(amount):
     """Format money values consistently"""
     return f"€{amount:.2f}"
@@ -2526,11 +2569,18 @@ def print_law_statistics(df, law_name, law_eligible_col, law_amount_col):
 
 
 def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulate Dutch laws for a synthetic population")
+    parser.add_argument("--people", type=int, default=1000, help="Number of people to simulate")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    args = parser.parse_args()
+
     print("\n🇳🇱 Starting Dutch law simulation...")
     simulator = LawSimulator()
 
     # Run the simulation with progress bar
-    results = simulator.run_simulation(num_people=1000)
+    results = simulator.run_simulation(num_people=args.people, workers=args.workers)
 
     # Print summary statistics
     print("\n📊 === POPULATION DEMOGRAPHICS ===")
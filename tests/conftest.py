@@ -0,0 +1,47 @@
+"""
+Shared fixtures for the machine tests.
+"""
+
+import pandas as pd
+import pytest
+
+from machine.service import Services
+
+BSN = "999993653"
+
+
+def load_zorgtoeslag_data(services: Services, bsn: str = BSN) -> None:
+    """Register the source tables for a single citizen that is entitled to zorgtoeslag."""
+    tables = {
+        ("RvIG", "personen"): [
+            {"bsn": bsn, "geboortedatum": "1998-01-01", "verblijfsadres": "Amsterdam", "land_verblijf": "NEDERLAND"}
+        ],
+        ("RvIG", "relaties"): [{"bsn": bsn, "partnerschap_type": "GEEN", "partner_bsn": None}],
+        ("RVZ", "verzekeringen"): [{"bsn": bsn, "polis_status": "ACTIEF"}],
+        ("BELASTINGDIENST", "box1"): [
+            {
+                "bsn": bsn,
+                "loon_uit_dienstbetrekking": 20000,
+                "uitkeringen_en_pensioenen": 0,
+                "winst_uit_onderneming": 0,
+                "resultaat_overige_werkzaamheden": 0,
+                "eigen_woning": 0,
+            }
+        ],
+        ("BELASTINGDIENST", "box2"): [{"bsn": bsn, "reguliere_voordelen": 0, "vervreemdingsvoordelen": 0}],
+        ("BELASTINGDIENST", "box3"): [
+            {"bsn": bsn, "spaargeld": 10000, "beleggingen": 0, "onroerend_goed": 0, "schulden": 0}
+        ],
+    }
+    for (service, table), rows in tables.items():
+        services.set_source_dataframe(service, table, pd.DataFrame(rows))
+
+
+@pytest.fixture
+def services() -> Services:
+    """A fresh Services instance; the eventsourcing topic cache is cleared as in the behave steps."""
+    import eventsourcing.utils
+
+    eventsourcing.utils.clear_topic_cache()
+    eventsourcing.utils._type_cache.clear()
+    return Services("2025-02-01")
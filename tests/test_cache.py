@@ -0,0 +1,147 @@
+"""
+Unit tests for the service reference cache.
+"""
+
+import pandas as pd
+import pytest
+
+from law_mcp.cache import generate_cache_key
+from machine.cache import ServiceReferenceCache, freeze
+from machine.service import Services
+
+from .conftest import BSN, load_zorgtoeslag_data
+
+
+class TestFreeze:
+    def test_equal_values_give_equal_keys(self) -> None:
+        a = {"BSN": "1", "HUISHOUDEN": {"kinderen": ["2", "3"], "partner": None}}
+        b = {"HUISHOUDEN": {"partner": None, "kinderen": ["2", "3"]}, "BSN": "1"}
+
+        assert freeze(a) == freeze(b)
+        assert hash(freeze(a)) == hash(freeze(b))
+
+    def test_different_values_give_different_keys(self) -> None:
+        assert freeze({"BSN": "1"}) != freeze({"BSN": "2"})
+        assert freeze({"a": 1}) != freeze([("a", 1)])
+        assert freeze(["1", "2"]) != freeze(["2", "1"])
+
+    def test_scalars_of_different_types_give_different_keys(self) -> None:
+        assert len({freeze({"a": True}), freeze({"a": 1}), freeze({"a": 1.0}), freeze({"a": "1"})}) == 4
+
+    def test_tables_can_not_be_frozen(self) -> None:
+        # The repr of a large table leaves rows out, so different tables could get the same key
+        with pytest.raises(TypeError):
+            freeze({"df": pd.DataFrame({"a": range(100)})})
+
+    def test_values_that_refuse_hashing_can_not_be_frozen(self) -> None:
+        class Unhashable:
+            def __hash__(self) -> int:
+                raise NotImplementedError
+
+        with pytest.raises(TypeError):
+            freeze({"ZAAK": Unhashable()})
+
+    def test_law_mcp_cache_key_ignores_argument_order(self) -> None:
+        a = generate_cache_key("law_execution", parameters={"BSN": "1", "JAAR": 2025}, law="zorgtoeslagwet")
+        b = generate_cache_key("law_execution", law="zorgtoeslagwet", parameters={"JAAR": 2025, "BSN": "1"})
+
+        assert a == b
+
+
+class TestServiceReferenceCache:
+    def test_least_recently_used_entry_is_evicted(self) -> None:
+        cache = ServiceReferenceCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+
+        cache.put("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_invalidate_evicts_entries_with_tag(self) -> None:
+        cache = ServiceReferenceCache()
+        cache.put("a", 1, [("bsn", "1")])
+        cache.put("b", 2, [("bsn", "2")])
+
+        cache.invalidate(("bsn", "1"))
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+    def test_value_computed_before_an_invalidation_is_dropped(self) -> None:
+        cache = ServiceReferenceCache()
+        generation = cache.generation
+        cache.invalidate(("bsn", "1"))
+
+        cache.put("a", 1, [("bsn", "1")], generation)
+        cache.put("b", 2, [("bsn", "2")], generation)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+
+    def test_nested_computations_pass_their_tags_on(self) -> None:
+        cache = ServiceReferenceCache()
+        cache.put("cached", 1, [("bsn", "2")])
+
+        with cache.recording() as outer:
+            cache.depends_on(("bsn", "1"))
+            with cache.recording() as inner:
+                cache.depends_on(("cases", "SVB", "algemene_ouderdomswet"))
+                cache.get("cached")
+
+        assert inner == {("cases", "SVB", "algemene_ouderdomswet"), ("bsn", "2")}
+        assert outer == {("bsn", "1"), ("cases", "SVB", "algemene_ouderdomswet"), ("bsn", "2")}
+
+
+class TestSharedServiceReferences:
+    def test_service_references_are_shared_between_evaluations(self, services: Services) -> None:
+        load_zorgtoeslag_data(services)
+        services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN})
+        hits = services.service_reference_cache.hits
+
+        result = services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN})
+
+        assert services.service_reference_cache.hits > hits
+        assert result.output["hoogte_toeslag"] == 210821
+
+    def test_claim_invalidates_cached_references_of_citizen(self, services: Services) -> None:
+        load_zorgtoeslag_data(services)
+        services.set_source_dataframe(
+            "RvIG",
+            "personen",
+            pd.DataFrame(
+                [
+                    {
+                        "bsn": BSN,
+                        "geboortedatum": "2010-01-01",
+                        "verblijfsadres": "Amsterdam",
+                        "land_verblijf": "NEDERLAND",
+                    }
+                ]
+            ),
+        )
+        assert not services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN}).requirements_met
+
+        services.claim_manager.submit_claim(
+            service="RvIG",
+            key="GEBOORTEDATUM",
+            new_value="1998-01-01",
+            reason="Geboortedatum onjuist",
+            claimant="BURGER",
+            law="wet_brp",
+            bsn=BSN,
+        )
+
+        assert services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN}).requirements_met
+
+    def test_source_dataframe_change_clears_cache(self, services: Services) -> None:
+        load_zorgtoeslag_data(services)
+        services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN})
+        assert len(services.service_reference_cache) > 0
+
+        load_zorgtoeslag_data(services)
+
+        assert len(services.service_reference_cache) == 0
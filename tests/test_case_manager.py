@@ -0,0 +1,204 @@
+"""
+Unit tests for the case manager indexes, tables, snapshots and recovery.
+"""
+
+from pathlib import Path
+from uuid import UUID
+
+import eventsourcing.utils
+import pytest
+
+from machine.events.case.aggregate import CaseStatus
+from machine.events.case.application import EventCursor
+from machine.events.table import ColumnarTable
+from machine.service import Services
+
+from .conftest import BSN
+
+SERVICE = "GEMEENTE_ROTTERDAM"
+LAW = "apv_geluidsontheffing"
+
+
+class TestApprovedCaseIndex:
+    def test_decided_approved_cases_are_indexed(self, services: Services) -> None:
+        case_manager = services.case_manager
+        case_id = case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing": True})
+
+        cases = case_manager.get_approved_cases(SERVICE, LAW)
+
+        assert [str(case.id) for case in cases] == [case_id]
+        assert cases[0].parameters == {"BSN": BSN}
+        assert case_manager.get_approved_cases(SERVICE, "other_law") == []
+
+    def test_objection_and_decision_update_the_index(self, services: Services) -> None:
+        case_manager = services.case_manager
+        case_id = case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing": True})
+
+        case_manager.objection_case(case_id, "Bezwaar")
+        assert case_manager.get_approved_cases(SERVICE, LAW) == []
+
+        case_manager.complete_manual_review(case_id, "BEOORDELAAR", approved=False, reason="Afgewezen")
+        assert case_manager.get_approved_cases(SERVICE, LAW) == []
+
+        case_manager.objection_case(case_id, "Bezwaar")
+        case_manager.complete_manual_review(case_id, "BEOORDELAAR", approved=True, reason="Toegekend")
+        assert [str(case.id) for case in case_manager.get_approved_cases(SERVICE, LAW)] == [case_id]
+
+    def test_saving_a_decided_case_keeps_its_place(self, services: Services) -> None:
+        case_manager = services.case_manager
+        case_ids = [
+            case_manager.seed_historical_case(bsn, SERVICE, LAW, {"BSN": bsn}, {"ontheffing": True})
+            for bsn in (BSN, "999993653")
+        ]
+
+        case_manager.determine_appeal_status(case_ids[0], possible=True, appeal_period=6)
+
+        assert [str(case.id) for case in case_manager.get_approved_cases(SERVICE, LAW)] == case_ids
+
+
+class TestCaseTables:
+    def test_tables_are_appended_as_cases_change(self, services: Services) -> None:
+        case_manager = services.case_manager
+        case_id = case_manager.seed_historical_case(BSN, SERVICE, LAW, {"KVK_NUMMER": "12345678"}, {"ontheffing": True})
+        cases = case_manager.cases_table.dataframe()
+        assert list(cases["case_id"]) == [case_id]
+        assert list(cases["status"]) == ["DECIDED"]
+
+        case_manager.objection_case(case_id, "Bezwaar")
+
+        cases = case_manager.cases_table.dataframe()
+        assert list(cases["status"]) == ["OBJECTED"]
+        assert list(cases["KVK_NUMMER"]) == ["12345678"]
+        events = case_manager.events_table.dataframe()
+        assert list(events["event_type"]) == ["Submitted", "AutomaticallyDecided", "Objected"]
+        assert events.to_dict("records") == case_manager.get_events()
+
+    def test_saved_cases_are_not_loaded_again(self, services: Services, monkeypatch: pytest.MonkeyPatch) -> None:
+        case_manager = services.case_manager
+        loaded = []
+        get = case_manager.repository.get
+        monkeypatch.setattr(
+            case_manager.repository, "get", lambda *args, **kwargs: loaded.append(args) or get(*args, **kwargs)
+        )
+
+        case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing": True})
+
+        assert loaded == []
+        assert len(case_manager.get_approved_cases(SERVICE, LAW)) == 1
+
+    def test_rows_missing_a_column_are_filled_with_none(self) -> None:
+        table = ColumnarTable()
+        table.append({"a": 1})
+        table.upsert("x", {"b": 2})
+        table.upsert("x", {"a": 3, "c": 4})
+
+        df = table.dataframe()
+        assert list(df["a"]) == [1, 3]
+        assert df["b"].isna().all()
+        assert df["c"].isna().tolist() == [True, False]
+        assert list(table.index().rows(table.index().select("a", 3))["c"]) == [4]
+
+    def test_index_is_kept_up_to_date(self) -> None:
+        table = ColumnarTable()
+        table.upsert("x", {"status": "DECIDED"})
+        index = table.index()
+        assert list(index.select("status", "DECIDED")) == [0]
+
+        table.upsert("y", {"status": "DECIDED"})
+        table.upsert("x", {"status": "OBJECTED"})
+
+        assert table.index() is index
+        assert list(index.select("status", "DECIDED")) == [1]
+        assert list(index.select_any("status", ["DECIDED", "OBJECTED"])) == [0, 1]
+        assert list(index.rows(index.select("status", "OBJECTED"))["status"]) == ["OBJECTED"]
+
+
+class TestEventCursor:
+    def test_cursor_only_reads_new_events(self, services: Services) -> None:
+        case_manager = services.case_manager
+        case_id = case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing": True})
+        cursor = EventCursor()
+
+        assert [e["event_type"] for e in case_manager.read_events(cursor, page_size=1)] == [
+            "Submitted",
+            "AutomaticallyDecided",
+        ]
+        assert list(case_manager.read_events(cursor)) == []
+
+        case_manager.objection_case(case_id, "Bezwaar")
+
+        assert [e["event_type"] for e in case_manager.read_events(cursor)] == ["Objected"]
+
+    def test_events_of_one_case(self, services: Services) -> None:
+        case_manager = services.case_manager
+        case_id = case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing": True})
+        case_manager.seed_historical_case("999993654", SERVICE, LAW, {"BSN": "999993654"}, {"ontheffing": True})
+        case_manager.objection_case(case_id, "Bezwaar")
+
+        events = case_manager.get_events(case_id, page_size=2)
+
+        assert [e["event_type"] for e in events] == ["Submitted", "AutomaticallyDecided", "Objected"]
+        assert {str(e["case_id"]) for e in events} == {case_id}
+
+
+@pytest.fixture
+def snapshotting(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Snapshots every 3 events, for the services created after this fixture"""
+    monkeypatch.setenv("SNAPSHOTTING_INTERVAL", "3")
+
+
+class TestSnapshots:
+    def test_case_is_loaded_from_its_snapshot(self, snapshotting: None, services: Services) -> None:
+        case_manager = services.case_manager
+        case_id = case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing": True})
+        case = case_manager.get_case_by_id(case_id)
+        case.add_claim("claim")
+        case_manager.save(case)
+        case_manager.objection_case(case_id, "Bezwaar")
+
+        snapshot = next(case_manager.snapshots.get(UUID(case_id), desc=True, limit=1))
+        case = case_manager.get_case_by_id(case_id)
+
+        assert (snapshot.originator_version, case.version) == (3, 4)
+        assert case.status == CaseStatus.OBJECTED
+        assert case.claim_ids == {"claim"}
+
+
+def durable_services(event_store: Path) -> Services:
+    """A Services instance on an event store; the eventsourcing topic cache is cleared as in the services fixture."""
+    eventsourcing.utils.clear_topic_cache()
+    eventsourcing.utils._type_cache.clear()
+    return Services("2025-02-01", event_store=event_store)
+
+
+class TestRecovery:
+    def test_indexes_are_recovered_from_the_event_store(self, tmp_path: Path) -> None:
+        services = durable_services(tmp_path)
+        case_id = services.case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing": True})
+        services.case_manager.objection_case(case_id, "Bezwaar")
+        services.claim_manager.submit_claim("TOESLAGEN", "INKOMEN", 1, "Reden", "BURGER", "zorgtoeslagwet", BSN)
+        services.runner.stop()
+
+        recovered = durable_services(tmp_path)
+
+        case_manager = recovered.case_manager
+        assert [str(case.id) for case in case_manager.get_all_cases()] == [case_id]
+        assert list(case_manager.cases_table.dataframe()["status"]) == ["OBJECTED"]
+        assert case_manager.events_table.dataframe().to_dict("records") == case_manager.get_events()
+        assert recovered.claim_manager.get_claim_values(BSN, "TOESLAGEN", "zorgtoeslagwet") == {"INKOMEN": 1}
+        assert len(recovered.claim_manager.get_claims_by_bsn(BSN)) == 1
+
+    def test_rebuilding_replaces_the_indexes(self, tmp_path: Path) -> None:
+        services = durable_services(tmp_path)
+        case_id = services.case_manager.seed_historical_case(BSN, SERVICE, LAW, {"BSN": BSN}, {"ontheffing": True})
+        services.case_manager.objection_case(case_id, "Bezwaar")
+        services.claim_manager.submit_claim("TOESLAGEN", "INKOMEN", 1, "Reden", "BURGER", "zorgtoeslagwet", BSN)
+
+        # Pages smaller than the log, so the rebuild reads more than one
+        rebuild = services.case_manager.rebuild_indexes(page_size=1)
+        services.claim_manager.rebuild_indexes(page_size=1)
+
+        assert (rebuild.events, rebuild.aggregates) == (len(services.case_manager.get_events(case_id)), 1)
+        assert [str(case.id) for case in services.case_manager.get_all_cases()] == [case_id]
+        assert len(services.case_manager.events_table) == rebuild.events
+        assert len(services.claim_manager.get_claims_by_bsn(BSN)) == 1
@@ -0,0 +1,74 @@
+"""
+Unit tests for the claim manager's projection of claim values and bulk submission.
+"""
+
+import pytest
+
+from machine.service import Services
+
+from .conftest import BSN
+
+SERVICE = "TOESLAGEN"
+LAW = "zorgtoeslagwet"
+
+
+def claim(key: str, value: int) -> dict:
+    return {
+        "service": SERVICE,
+        "key": key,
+        "new_value": value,
+        "reason": "Bulk",
+        "claimant": "BURGER",
+        "law": LAW,
+        "bsn": BSN,
+    }
+
+
+class TestClaimValues:
+    def test_values_follow_the_claim_status(self, services: Services) -> None:
+        claim_manager = services.claim_manager
+        claim_id = claim_manager.submit_claim(SERVICE, "INKOMEN", 30000, "Nieuwe baan", "BURGER", LAW, BSN)
+
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW) == {"INKOMEN": 30000}
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW, approved=True) is None
+
+        claim_manager.approve_claim(claim_id, "BEOORDELAAR", 30000)
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW, approved=True) == {"INKOMEN": 30000}
+
+        claim_manager.reject_claim(claim_id, "BEOORDELAAR", "Onjuist")
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW) is None
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW, include_rejected=True) == {"INKOMEN": 30000}
+
+    def test_resubmitted_claim_is_pending_with_the_new_value(self, services: Services) -> None:
+        claim_manager = services.claim_manager
+        claim_id = claim_manager.submit_claim(SERVICE, "INKOMEN", 30000, "Nieuwe baan", "BURGER", LAW, BSN)
+        claim_manager.approve_claim(claim_id, "BEOORDELAAR", 30000)
+
+        claim_manager.submit_claim(SERVICE, "INKOMEN", 35000, "Loonsverhoging", "BURGER", LAW, BSN)
+
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW, approved=True) is None
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW) == {"INKOMEN": 35000}
+        claims = claim_manager.get_claim_by_bsn_service_law(BSN, SERVICE, LAW)
+        assert {key: claim.new_value for key, claim in claims.items()} == {"INKOMEN": 35000}
+
+
+class TestSubmitClaimsBulk:
+    def test_claims_are_saved_and_approved_together(self, services: Services) -> None:
+        claim_manager = services.claim_manager
+        existing_id = claim_manager.submit_claim(SERVICE, "INKOMEN", 30000, "Nieuwe baan", "BURGER", LAW, BSN)
+        claims = [claim("INKOMEN", 35000), claim("VERMOGEN", 1000)]
+
+        claim_ids = claim_manager.submit_claims_bulk(claims, auto_approve=True)
+
+        assert claim_ids[0] == existing_id
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW, approved=True) == {"INKOMEN": 35000, "VERMOGEN": 1000}
+        assert [str(claim.id) for claim in claim_manager.get_claims_by_bsn(BSN, approved=True)] == claim_ids
+
+    def test_invalid_claims_save_nothing(self, services: Services) -> None:
+        claim_manager = services.claim_manager
+        claims = [claim("INKOMEN", 1), {"service": SERVICE, "key": "VERMOGEN", "new_value": 1}]
+
+        with pytest.raises(ValueError, match="Claim 1 is missing"):
+            claim_manager.submit_claims_bulk(claims)
+
+        assert claim_manager.get_claim_values(BSN, SERVICE, LAW) is None
@@ -0,0 +1,124 @@
+"""
+Concurrency tests for evaluations on the evaluation executor while cases and claims are saved on the event loop.
+"""
+
+import asyncio
+import sys
+import threading
+from collections.abc import Iterator
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from machine.service import Services
+from web.engines.py_engine.engine import PythonMachineService
+
+from .conftest import BSN, load_zorgtoeslag_data
+
+SERVICE = "GEMEENTE_ROTTERDAM"
+LAW = "algemene_plaatselijke_verordening/ontheffingspas_geluid"
+KVK_NUMMER = "10000000"
+ROUNDS = 150
+# Saves of one case while it is read: the window between two statements needs many tries to hit
+SAVES = 1500
+
+
+@pytest.fixture
+def frequent_thread_switches() -> Iterator[None]:
+    """Switch between threads as often as possible, so the evaluations and saves interleave"""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+class TestConcurrentEvaluations:
+    def test_evaluations_see_the_saved_cases_and_claims(
+        self, frequent_thread_switches: None, services: Services
+    ) -> None:
+        # Cases count for the year they were created in
+        today = date.today()
+        load_zorgtoeslag_data(services)
+        services.set_source_dataframe(
+            SERVICE, "geluidsklachten", pd.DataFrame([{"kvk_nummer": KVK_NUMMER, "heeft_actieve_klachten": False}])
+        )
+        machine_service = PythonMachineService(services)
+        ontheffing = {
+            "KVK_NUMMER": KVK_NUMMER,
+            "ACTIVITEITSDATUM": (today + timedelta(days=7)).isoformat(),
+            "ACTIVITEITSSTARTTIJD": "20:00",
+        }
+
+        async def evaluate_while_saving() -> None:
+            evaluations = []
+            for i in range(ROUNDS):
+                evaluations += [
+                    asyncio.ensure_future(
+                        machine_service.aevaluate(
+                            SERVICE,
+                            LAW,
+                            ontheffing,
+                            reference_date=today.isoformat(),
+                            overwrite_input={"KVK": {"status": "Actief"}},
+                            trace=False,
+                        )
+                    ),
+                    asyncio.ensure_future(
+                        machine_service.aevaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN}, trace=False)
+                    ),
+                ]
+                # Saved on the event loop, while the evaluations run on the executor
+                services.case_manager.seed_historical_case(
+                    f"{100000000 + i:09d}",
+                    SERVICE,
+                    LAW,
+                    # A new column in the cases table every round
+                    {"KVK_NUMMER": KVK_NUMMER, "ACTIVITEITSDATUM": today.isoformat(), f"VELD_{i}": i},
+                    {"ontheffing_verleend": True},
+                )
+                birth_date = "2010-01-01" if i % 2 == 0 else "1998-01-01"
+                services.claim_manager.submit_claim(
+                    "RvIG", "GEBOORTEDATUM", birth_date, "Geboortedatum", "BURGER", "wet_brp", BSN
+                )
+                # A new key in the claim values of the citizen every round
+                services.claim_manager.submit_claim("RvIG", f"VELD_{i}", i, "Veld", "BURGER", "wet_brp", BSN)
+                await asyncio.sleep(0)
+            await asyncio.gather(*evaluations)
+
+        asyncio.run(evaluate_while_saving())
+
+        # Nothing cached from before the last case and claim is used
+        result = services.evaluate(
+            SERVICE, LAW, ontheffing, reference_date=today.isoformat(), overwrite_input={"KVK": {"status": "Actief"}}
+        )
+        assert not result.requirements_met
+        assert services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN}).requirements_met
+        assert len(services.case_manager.cases_table.index().select("KVK_NUMMER", KVK_NUMMER)) == ROUNDS
+
+    def test_saving_an_approved_case_keeps_it_approved(
+        self, frequent_thread_switches: None, services: Services
+    ) -> None:
+        case_manager = services.case_manager
+        case_id = case_manager.seed_historical_case(BSN, SERVICE, LAW, {"KVK_NUMMER": KVK_NUMMER}, {"ontheffing": True})
+        saved = threading.Event()
+        missing = []
+
+        def read_approved_cases() -> None:
+            # Like the service references of an evaluation on the executor
+            while not saved.is_set():
+                if not case_manager.get_approved_cases(SERVICE, LAW):
+                    missing.append(True)
+
+        readers = [threading.Thread(target=read_approved_cases) for _ in range(2)]
+        for reader in readers:
+            reader.start()
+        try:
+            for _ in range(SAVES):
+                case_manager.determine_appeal_status(case_id, possible=True, appeal_period=6)
+        finally:
+            saved.set()
+            for reader in readers:
+                reader.join()
+
+        assert missing == []
@@ -0,0 +1,131 @@
+"""
+Unit tests for the rules engine.
+"""
+
+import pandas as pd
+import pytest
+
+from machine.service import Services
+
+from .conftest import BSN, load_zorgtoeslag_data
+
+
+class TestTraceMode:
+    """Evaluating with trace=False gives the same outputs without recording a trace."""
+
+    @pytest.mark.parametrize(
+        ("service", "law"),
+        [
+            ("TOESLAGEN", "zorgtoeslagwet"),
+            ("BELASTINGDIENST", "wet_inkomstenbelasting"),
+            ("TOESLAGEN", "wet_op_de_huurtoeslag"),
+        ],
+    )
+    def test_outputs_match_traced_evaluation(self, services: Services, service: str, law: str) -> None:
+        load_zorgtoeslag_data(services)
+
+        traced = services.evaluate(service, law, {"BSN": BSN})
+        untraced = services.evaluate(service, law, {"BSN": BSN}, trace=False)
+
+        assert untraced.output == traced.output
+        assert untraced.requirements_met == traced.requirements_met
+        assert untraced.missing_required == traced.missing_required
+
+    def test_no_trace_is_recorded(self, services: Services) -> None:
+        load_zorgtoeslag_data(services)
+
+        traced = services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN})
+        untraced = services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN}, trace=False)
+
+        assert traced.path is not None
+        assert traced.input
+        assert untraced.path is None
+        assert untraced.input == {}
+        assert untraced.output["hoogte_toeslag"] == 210821
+
+
+class TestEvaluateMany:
+    def test_rows_match_single_evaluations(self, services: Services) -> None:
+        load_zorgtoeslag_data(services)
+        parameters_list = [{"BSN": BSN}, {"BSN": "999999999"}, {"BSN": BSN}]
+
+        table = services.evaluate_many("TOESLAGEN", "zorgtoeslagwet", parameters_list)
+
+        assert list(table["BSN"]) == [BSN, "999999999", BSN]
+        for row, parameters in zip(table.to_dict("records"), parameters_list, strict=True):
+            result = services.evaluate("TOESLAGEN", "zorgtoeslagwet", parameters)
+            assert row["requirements_met"] == result.requirements_met
+            assert row["missing_required"] == result.missing_required
+            for name, value in result.output.items():
+                assert row[name] == value
+        assert list(table["hoogte_toeslag"])[0] == 210821
+
+    def test_empty_batch(self, services: Services) -> None:
+        table = services.evaluate_many("TOESLAGEN", "zorgtoeslagwet", [])
+
+        assert len(table) == 0
+
+
+class TestVectorized:
+    """Evaluating a batch on columns gives the same results as evaluating it row by row."""
+
+    @staticmethod
+    def summarize(results: list) -> list:
+        return [
+            (
+                result.requirements_met,
+                result.missing_required,
+                {name: value for name, value in result.output.items() if value is not None},
+            )
+            for result in results
+        ]
+
+    @pytest.mark.parametrize(
+        ("service", "law"),
+        [
+            ("TOESLAGEN", "zorgtoeslagwet"),
+            ("BELASTINGDIENST", "wet_inkomstenbelasting"),
+            ("TOESLAGEN", "wet_op_de_huurtoeslag"),
+            ("SVB", "algemene_ouderdomswet"),
+        ],
+    )
+    def test_rows_match_scalar_evaluation(self, services: Services, service: str, law: str) -> None:
+        load_zorgtoeslag_data(services)
+        parameters_list = [{"BSN": BSN}, {"BSN": "999999999"}, {"BSN": BSN}]
+        rule_service = services.services[service]
+
+        scalar = rule_service.evaluate_many(law, "2025-02-01", parameters_list)
+        vectorized = rule_service.evaluate_many(law, "2025-02-01", parameters_list, vectorized=True)
+
+        assert self.summarize(vectorized) == self.summarize(scalar)
+
+    def test_claimed_rows_use_the_claim(self, services: Services) -> None:
+        load_zorgtoeslag_data(services)
+        services.set_source_dataframe(
+            "RvIG",
+            "personen",
+            pd.DataFrame(
+                [
+                    {
+                        "bsn": BSN,
+                        "geboortedatum": "2010-01-01",
+                        "verblijfsadres": "Amsterdam",
+                        "land_verblijf": "NEDERLAND",
+                    }
+                ]
+            ),
+        )
+        services.claim_manager.submit_claim(
+            service="RvIG",
+            key="GEBOORTEDATUM",
+            new_value="1998-01-01",
+            reason="Geboortedatum onjuist",
+            claimant="BURGER",
+            law="wet_brp",
+            bsn=BSN,
+        )
+
+        table = services.evaluate_many("TOESLAGEN", "zorgtoeslagwet", [{"BSN": BSN}], vectorized=True)
+
+        assert list(table["requirements_met"]) == [True]
+        assert list(table["hoogte_toeslag"]) == [210821]
@@ -0,0 +1,61 @@
+"""
+Unit tests for the indenting logger.
+"""
+
+import logging
+import threading
+
+import pytest
+
+from machine.logging_config import GlobalIndent, IndentLogger
+
+
+@pytest.fixture
+def logger() -> IndentLogger:
+    return IndentLogger(logging.getLogger("test_indent_logger"))
+
+
+class TestIndentLogger:
+    def test_disabled_messages_are_not_formatted(self, logger: IndentLogger, caplog: pytest.LogCaptureFixture) -> None:
+        caplog.set_level(logging.WARNING, logger="test_indent_logger")
+
+        def message() -> str:
+            raise AssertionError("formatted a disabled message")
+
+        with logger.indent_block(message):
+            assert GlobalIndent.get_level() == 0
+            logger.debug(message)
+
+        assert caplog.records == []
+
+    def test_enabled_messages_are_indented(self, logger: IndentLogger, caplog: pytest.LogCaptureFixture) -> None:
+        caplog.set_level(logging.DEBUG, logger="test_indent_logger")
+
+        with logger.indent_block(lambda: "Block"):
+            logger.debug("Result of %s: %s", "x", 1)
+
+        assert [record.getMessage() for record in caplog.records] == ["Block", "├──Result of x: 1"]
+        assert GlobalIndent.get_level() == 0
+
+    def test_indentation_is_per_thread(self, logger: IndentLogger, caplog: pytest.LogCaptureFixture) -> None:
+        caplog.set_level(logging.DEBUG, logger="test_indent_logger")
+        entered, release = threading.Event(), threading.Event()
+        indents = []
+
+        def evaluate() -> None:
+            with logger.indent_block("Other thread"):
+                entered.set()
+                release.wait()
+                indents.append(GlobalIndent.get_indent())
+
+        thread = threading.Thread(target=evaluate)
+        thread.start()
+        entered.wait()
+        # The block of the other thread doesn't indent this one, nor the other way around
+        assert GlobalIndent.get_indent() == ""
+        with logger.indent_block("This thread"), logger.indent_block("Nested"):
+            release.set()
+            thread.join()
+            assert GlobalIndent.get_level() == 2
+
+        assert indents == ["├──"]
@@ -0,0 +1,82 @@
+"""
+Unit tests for the profile store.
+"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from machine.profile_loader import ProfileStore
+from machine.service import Services
+from web.engines.py_engine.engine import PythonMachineService
+
+PROFILES = """
+profiles:
+  '999993653':
+    name: Merijn
+    sources:
+      KVK:
+        inschrijvingen:
+        - bsn: '999993653'
+          kvk_nummer: '12345678'
+          handelsnaam: Bakkerij Merijn
+"""
+
+
+@pytest.fixture
+def profiles_path(tmp_path: Path) -> Path:
+    path = tmp_path / "profiles.yaml"
+    path.write_text(PROFILES)
+    return path
+
+
+class TestProfileStore:
+    def test_lookup_by_bsn_and_kvk(self, profiles_path: Path) -> None:
+        store = ProfileStore(profiles_path)
+
+        assert store.get("999993653")["name"] == "Merijn"
+        assert store.get("000000000") is None
+        assert store.get_business("12345678")["handelsnaam"] == "Bakkerij Merijn"
+        assert store.get_business("00000000") is None
+
+    def test_replacing_a_table_does_not_change_the_store(self, profiles_path: Path) -> None:
+        store = ProfileStore(profiles_path)
+
+        store.get("999993653")["sources"]["KVK"]["inschrijvingen"] = []
+
+        assert len(store.get("999993653")["sources"]["KVK"]["inschrijvingen"]) == 1
+
+    def test_parsed_once_until_the_file_changes(self, profiles_path: Path) -> None:
+        store = ProfileStore(profiles_path)
+        profiles = store.profiles
+        assert store.profiles is profiles
+
+        profiles_path.write_text(PROFILES.replace("Merijn", "Anna"))
+        # The change is noticed even within the resolution of the modification time
+        stat = profiles_path.stat()
+        os.utime(profiles_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        assert store.get("999993653")["name"] == "Anna"
+        assert store.get_business("12345678")["handelsnaam"] == "Bakkerij Anna"
+
+
+class TestBusinessProfile:
+    def test_the_kvk_table_decides_over_the_profiles(self, services: Services) -> None:
+        services.set_source_dataframe(
+            "KVK",
+            "inschrijvingen",
+            pd.DataFrame([{"bsn": "100000001", "kvk_nummer": "12345678", "handelsnaam": "Nieuwe naam"}]),
+        )
+        machine_service = PythonMachineService(services)
+
+        assert machine_service.get_business_profile("12345678")["handelsnaam"] == "Nieuwe naam"
+        # Not registered in the table, even though it is in the profiles
+        assert machine_service.get_business_profile("99001122") is None
+
+    def test_profiles_without_a_kvk_table(self, services: Services) -> None:
+        business = PythonMachineService(services).get_business_profile("12345678")
+
+        assert business["handelsnaam"] == "Thuiszorg Van der Meer"
+        assert set(business) == set(PythonMachineService.BUSINESS_FIELDS)
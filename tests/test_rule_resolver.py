@@ -0,0 +1,67 @@
+"""
+Unit tests for finding the version of a law that applies on a date.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from machine.utils import RuleResolver
+
+
+@pytest.fixture(scope="module")
+def resolver() -> RuleResolver:
+    return RuleResolver()
+
+
+class TestFindRule:
+    @pytest.mark.parametrize(
+        ("reference_date", "valid_from"),
+        [
+            ("2024-01-01", "2024-01-01"),
+            ("2024-12-31", "2024-01-01"),
+            ("2025-01-01", "2025-01-01"),
+            ("2030-06-15", "2025-01-01"),
+        ],
+    )
+    def test_the_latest_version_valid_on_the_date(
+        self, resolver: RuleResolver, reference_date: str, valid_from: str
+    ) -> None:
+        rule = resolver.find_rule("zorgtoeslagwet", reference_date, service="TOESLAGEN")
+
+        assert rule.valid_from == datetime.fromisoformat(valid_from)
+        assert resolver.find_rule("zorgtoeslagwet", reference_date) is rule
+        assert resolver.find_rule("zorgtoeslagwet", reference_date, service="") is rule
+
+    def test_no_version_before_the_first(self, resolver: RuleResolver) -> None:
+        with pytest.raises(ValueError, match="No valid rules found"):
+            resolver.find_rule("zorgtoeslagwet", "2023-12-31")
+
+    def test_unknown_law_or_service(self, resolver: RuleResolver) -> None:
+        with pytest.raises(ValueError, match="No rules found"):
+            resolver.find_rule("zorgtoeslagwet", "2025-01-01", service="SVB")
+
+
+class TestLazyLoading:
+    def test_laws_are_loaded_on_first_use(self) -> None:
+        resolver = RuleResolver()
+        assert all(rule._properties is None for rule in resolver.rules)
+
+        rule = resolver.find_rule("zorgtoeslagwet", "2025-01-01")
+
+        assert "definitions" in rule.properties
+        # The columns selected on come from the headers of the laws
+        assert resolver.select_on_columns()["personen"] == {"bsn"}
+        assert [r for r in resolver.rules if r._properties is not None] == [rule]
+
+
+class TestRulesDataframe:
+    def test_built_once_and_indexed(self, resolver: RuleResolver) -> None:
+        df = resolver.rules_dataframe()
+        assert resolver.rules_dataframe() is df
+
+        index = resolver.rules_index()
+        rows = index.rows(index.select("service", "TOESLAGEN"))
+
+        assert list(rows["path"]) == list(df[df["service"] == "TOESLAGEN"]["path"])
+        assert "zorgtoeslagwet" in set(rows["law"])
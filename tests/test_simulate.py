@@ -0,0 +1,24 @@
+"""
+Unit tests for the law simulator.
+"""
+
+from simulate import LawSimulator
+
+
+class TestShardHouseholds:
+    def test_partners_are_in_the_same_shard(self) -> None:
+        people = [
+            {"bsn": "1", "partner_bsn": "4"},
+            {"bsn": "2", "partner_bsn": None},
+            {"bsn": "3", "partner_bsn": None},
+            {"bsn": "4", "partner_bsn": "1"},
+        ]
+
+        shards = LawSimulator._shard_households(people, 2)
+
+        assert shards == [[0, 3, 2], [1]]
+
+    def test_no_empty_shards(self) -> None:
+        people = [{"bsn": "1", "partner_bsn": None}]
+
+        assert LawSimulator._shard_households(people, 4) == [[0]]
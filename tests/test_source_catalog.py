@@ -0,0 +1,30 @@
+"""
+Unit tests for the catalog of source tables shared by all services.
+"""
+
+import pandas as pd
+
+from machine.source_catalog import SourceCatalog
+
+
+class TestSourceCatalog:
+    def test_merged_tables_follow_the_services(self) -> None:
+        catalog = SourceCatalog()
+        first, _ = catalog.register("FIRST")
+        last, _ = catalog.register("LAST")
+        a, b = pd.DataFrame({"x": [1]}), pd.DataFrame({"x": [2]})
+
+        first["table"] = a
+        assert catalog.merged_tables["table"] is a
+
+        # The last service having the table wins, as merging the services in order did
+        last["table"] = b
+        first["table"] = a
+        assert catalog.merged_tables["table"] is b
+        assert catalog.tables["FIRST", "table"] is a
+
+        del last["table"]
+        assert catalog.merged_tables["table"] is a
+        first.pop("table")
+        assert "table" not in catalog.merged_tables
+        assert catalog.version == 5
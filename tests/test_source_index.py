@@ -0,0 +1,104 @@
+"""
+Unit tests for the source table indexes.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from machine.service import Services
+from machine.source_index import SourceIndex
+
+from .conftest import BSN, load_zorgtoeslag_data
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "bsn": ["1", "2", "1", "3", None],
+            "jaar": [2024, 2025, 2025, 2024, 2025],
+            "actief": [True, False, True, True, False],
+            "bedrag": [1.0, 2.5, np.nan, 2.5, 3.0],
+            "tags": [["a"], ["b"], [], ["a"], ["c"]],
+        }
+    )
+
+
+class TestSourceIndex:
+    """Selecting through the index gives the same rows as filtering the DataFrame."""
+
+    @pytest.mark.parametrize(
+        ("column", "value"),
+        [
+            ("bsn", "1"),
+            ("bsn", "4"),
+            ("bsn", 1),
+            ("bsn", None),
+            ("jaar", 2025),
+            ("jaar", "2025"),
+            ("actief", True),
+            ("bedrag", 2.5),
+            ("bedrag", np.nan),
+        ],
+    )
+    def test_select_matches_equality_filter(self, df: pd.DataFrame, column: str, value: object) -> None:
+        index = SourceIndex(df, [column])
+
+        positions = index.select(column, value)
+
+        pd.testing.assert_frame_equal(index.rows(positions), df[df[column] == value])
+
+    @pytest.mark.parametrize(
+        ("column", "values"),
+        [
+            ("bsn", ["3", "1"]),
+            ("bsn", ["4"]),
+            ("jaar", [2024, 2025]),
+            ("bsn", []),
+        ],
+    )
+    def test_select_any_matches_isin_filter(self, df: pd.DataFrame, column: str, values: list) -> None:
+        index = SourceIndex(df, [column])
+
+        positions = index.select_any(column, values)
+
+        pd.testing.assert_frame_equal(index.rows(positions), df[df[column].isin(values)])
+
+    def test_unindexed_columns_are_not_answered(self, df: pd.DataFrame) -> None:
+        index = SourceIndex(df, ["bsn", "tags", "missing"])
+
+        assert index.select("jaar", 2025) is None
+        assert index.select("missing", 1) is None
+        assert index.select("tags", "a") is None
+        assert index.select_any("bsn", "1") is None
+
+    def test_contiguous_rows_are_a_slice(self) -> None:
+        df = pd.DataFrame({"bsn": ["1", "1", "2"], "waarde": [1, 2, 3]})
+        index = SourceIndex(df, ["bsn"])
+
+        rows = index.rows(index.select("bsn", "1"))
+
+        assert list(rows["waarde"]) == [1, 2]
+        assert np.shares_memory(rows["waarde"].to_numpy(), df["waarde"].to_numpy())
+
+
+class TestIndexedSources:
+    def test_set_source_dataframe_indexes_select_on_columns(self, services: Services) -> None:
+        load_zorgtoeslag_data(services)
+
+        index = services.services["RvIG"].source_indexes["personen"]
+
+        assert index.df is services.services["RvIG"].source_dataframes["personen"]
+        assert "bsn" in index.columns
+
+    def test_replaced_dataframe_is_not_selected_through_stale_index(self, services: Services) -> None:
+        load_zorgtoeslag_data(services)
+        box1 = services.services["BELASTINGDIENST"].source_dataframes["box1"]
+
+        # Bypassing set_source_dataframe leaves the index of the previous table behind
+        services.services["BELASTINGDIENST"].source_dataframes["box1"] = box1.assign(loon_uit_dienstbetrekking=79547)
+
+        result = services.evaluate("TOESLAGEN", "zorgtoeslagwet", {"BSN": BSN})
+
+        assert result.output["hoogte_toeslag"] == 209692
@@ -0,0 +1,81 @@
+"""
+Unit tests for the bundle of parsed law specs.
+"""
+
+import os
+import pickle
+from pathlib import Path
+
+from machine.utils import SpecBundle, spec_header
+
+
+def write_law(path: Path, law: str) -> Path:
+    path.write_text(f"law: {law}\nservice: TOESLAGEN\nvalid_from: 2025-01-01\nproperties: {{}}\n")
+    return path
+
+
+class TestSpecBundle:
+    def test_specs_are_loaded_from_the_bundle(self, tmp_path: Path) -> None:
+        yaml_files = [write_law(tmp_path / "a.yaml", "a"), write_law(tmp_path / "b.yaml", "b")]
+
+        bundle = SpecBundle.load_or_build(tmp_path / "bundle", yaml_files)
+        reopened = SpecBundle.open(tmp_path / "bundle")
+
+        assert reopened.load(str(yaml_files[1]))["law"] == "b"
+        assert reopened.header(str(yaml_files[0]))["service"] == "TOESLAGEN"
+        assert reopened.content_hash == bundle.content_hash
+
+    def test_bundle_is_rebuilt_when_a_law_changes(self, tmp_path: Path) -> None:
+        yaml_files = [write_law(tmp_path / "a.yaml", "a")]
+        bundle = SpecBundle.load_or_build(tmp_path / "bundle", yaml_files)
+
+        write_law(yaml_files[0], "changed")
+        os.utime(yaml_files[0], ns=(0, 0))
+        rebuilt = SpecBundle.load_or_build(tmp_path / "bundle", yaml_files)
+
+        assert rebuilt.content_hash != bundle.content_hash
+        assert rebuilt.load(str(yaml_files[0]))["law"] == "changed"
+
+    def test_touched_laws_keep_the_bundle(self, tmp_path: Path) -> None:
+        yaml_files = [write_law(tmp_path / "a.yaml", "a")]
+        built = SpecBundle.load_or_build(tmp_path / "bundle", yaml_files)
+
+        os.utime(yaml_files[0], ns=(0, 0))
+        bundle = SpecBundle.load_or_build(tmp_path / "bundle", yaml_files)
+
+        assert bundle.content_hash == built.content_hash
+        assert bundle.load(str(yaml_files[0]))["law"] == "a"
+        # The new modification times are written, so the next process doesn't hash the laws again
+        assert SpecBundle.open(tmp_path / "bundle").manifest == SpecBundle.manifest_of(yaml_files)
+
+    def test_headers_are_read_back_exactly(self, tmp_path: Path) -> None:
+        law = tmp_path / "a.yaml"
+        law.write_text(
+            "law: a\nservice: TOESLAGEN\nvalid_from: 2025-01-01\nproperties:\n  input:\n"
+            "    - name: X\n      source_reference:\n        table: personen\n        select_on:\n"
+            "          - name: bsn\n"
+        )
+
+        SpecBundle.load_or_build(tmp_path / "bundle", [law])
+
+        header = SpecBundle.open(tmp_path / "bundle").header(str(law))
+        assert header == spec_header(SpecBundle.open(tmp_path / "bundle").load(str(law)))
+        assert header["select_on"] == {"personen": {"bsn"}}
+
+    def test_laws_with_headers_json_cant_hold_are_left_out(self, tmp_path: Path) -> None:
+        law = write_law(tmp_path / "a.yaml", "a")
+        with open(law, "a") as f:
+            f.write("  applies:\n    - from: 2025-01-01\n")
+
+        bundle = SpecBundle.load_or_build(tmp_path / "bundle", [law])
+
+        assert str(law) not in bundle
+
+    def test_the_header_is_not_unpickled(self, tmp_path: Path) -> None:
+        yaml_files = [write_law(tmp_path / "a.yaml", "a")]
+        header = pickle.dumps(os.system)
+        (tmp_path / "bundle").write_bytes(SpecBundle._HEADER.pack(SpecBundle.MAGIC, len(header)) + header)
+
+        bundle = SpecBundle.load_or_build(tmp_path / "bundle", yaml_files)
+
+        assert bundle.load(str(yaml_files[0]))["law"] == "a"
@@ -1,6 +1,10 @@
+import asyncio
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import date, datetime
+from functools import partial
 from typing import Any
 
 import pandas as pd
@@ -8,6 +12,10 @@ from dateutil.relativedelta import relativedelta
 
 from machine.service import Services
 
+# Evaluations for the async routes run on a bounded pool of threads, so they don't block the event loop
+EVALUATION_WORKERS = int(os.environ.get("EVALUATION_WORKERS", min(32, (os.cpu_count() or 1) + 4)))
+evaluation_executor = ThreadPoolExecutor(max_workers=EVALUATION_WORKERS, thread_name_prefix="evaluation")
+
 
 @dataclass
 class PathNode:
@@ -185,6 +193,7 @@ class EngineInterface(ABC):
         overwrite_input: dict[str, Any] | None = None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: bool = True,
     ) -> RuleResult:
         """
         Evaluate rules for given law and reference date.
@@ -198,11 +207,47 @@ class EngineInterface(ABC):
             overwrite_input: Optional overrides for input values
             requested_output: Optional specific output field to calculate
             approved: Whether this evaluation is for an approved claim
+            trace: Record the evaluation path; disable when only the output is needed
 
         Returns:
             Dictionary containing evaluation results
         """
 
+    async def aevaluate(
+        self,
+        service: str,
+        law: str,
+        parameters: dict[str, Any],
+        reference_date: str | None = None,
+        effective_date: str | None = None,
+        overwrite_input: dict[str, Any] | None = None,
+        requested_output: str | None = None,
+        approved: bool = False,
+        trace: bool = True,
+    ) -> RuleResult:
+        """
+        Evaluate rules like evaluate, without blocking the event loop.
+
+        By default evaluate runs on the evaluation executor, so at most EVALUATION_WORKERS evaluations run at
+        the same time and the others wait for a free worker.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            evaluation_executor,
+            partial(
+                self.evaluate,
+                service=service,
+                law=law,
+                parameters=parameters,
+                reference_date=reference_date,
+                effective_date=effective_date,
+                overwrite_input=overwrite_input,
+                requested_output=requested_output,
+                approved=approved,
+                trace=trace,
+            ),
+        )
+
     @abstractmethod
     def get_discoverable_service_laws(self, discoverable_by="CITIZEN") -> dict[str, list[str]]:
         """
@@ -268,7 +313,7 @@ class EngineInterface(ABC):
             law = law_info["law"]
 
             # Create cache key
-            cache_key = f"{bsn}:{service}:{law}:{current_date}"
+            cache_key = (bsn, service, law, current_date)
 
             # Check cache first
             if cache_key in self._impact_cache:
@@ -280,7 +325,9 @@ class EngineInterface(ABC):
                 rule_spec = self.get_rule_spec(law, current_date, service=service)
 
                 # Run the law for this person and get results
-                result = self.evaluate(service=service, law=law, parameters={"BSN": bsn}, reference_date=current_date)
+                result = self.evaluate(
+                    service=service, law=law, parameters={"BSN": bsn}, reference_date=current_date, trace=False
+                )
 
                 # Extract financial impact from result based on citizen_relevance
                 impact_value = 0
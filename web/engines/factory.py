@@ -1,10 +1,11 @@
 import logging
+import os
 from datetime import datetime
 from enum import Enum
 
 import pandas as pd
 
-from machine.profile_loader import get_project_root, load_profiles_from_yaml
+from machine.profile_loader import get_profile_store
 from machine.service import Services
 from web.config_loader import ConfigLoader
 
@@ -30,8 +31,9 @@ class MachineType(Enum):
 
 config_loader = ConfigLoader()
 
-# Configure service for the internal engine
-services = Services(datetime.today().strftime("%Y-%m-%d"))
+# Configure service for the internal engine. With EVENT_STORE set to a directory, the cases and claims are kept in
+# SQLite databases there and survive restarts, otherwise they are kept in memory.
+services = Services(datetime.today().strftime("%Y-%m-%d"), event_store=os.environ.get("EVENT_STORE"))
 
 
 def _initialize_profiles(services_instance: Services) -> None:
@@ -43,16 +45,8 @@ def _initialize_profiles(services_instance: Services) -> None:
     """
     try:
         # Load profiles from YAML
-        project_root = get_project_root()
-        profiles_path = project_root / "data" / "profiles.yaml"
-
-        logger.info(f"Loading profiles from {profiles_path}")
-
-        # Load the raw YAML to access globalServices
-        import yaml
-
-        with open(profiles_path) as f:
-            raw_data = yaml.safe_load(f)
+        profile_store = get_profile_store()
+        raw_data = profile_store.data
 
         global_services = raw_data.get("globalServices", {})
         global_service_ids = {}  # Track object IDs of global service data
@@ -78,10 +72,10 @@ def _initialize_profiles(services_instance: Services) -> None:
                     logger.warning(f"Unexpected data type for global {service_name}.{table_name}: {type(data)}")
                     continue
 
-                rule_service.source_dataframes[table_name] = df
+                rule_service.set_source_dataframe(table_name, df)
                 logger.debug(f"Loaded global {service_name}.{table_name}: {len(df)} rows")
 
-        profiles = load_profiles_from_yaml(profiles_path)
+        profiles = profile_store.profiles
 
         # Initialize each profile's data into the services
         for profile_id, profile_data in profiles.items():
@@ -120,11 +114,11 @@ def _initialize_profiles(services_instance: Services) -> None:
                     if table_name in rule_service.source_dataframes:
                         # Append to existing dataframe
                         existing_df = rule_service.source_dataframes[table_name]
-                        rule_service.source_dataframes[table_name] = pd.concat([existing_df, df], ignore_index=True)
+                        rule_service.set_source_dataframe(table_name, pd.concat([existing_df, df], ignore_index=True))
                         logger.debug(f"Appended {len(df)} rows to {service_name}.{table_name}")
                     else:
                         # Create new dataframe (this shouldn't happen if globals are loaded first)
-                        rule_service.source_dataframes[table_name] = df
+                        rule_service.set_source_dataframe(table_name, df)
                         logger.debug(f"Created {service_name}.{table_name} with {len(df)} rows")
 
         logger.info(f"Successfully initialized {len(profiles)} profiles into services")
@@ -165,13 +159,11 @@ def _seed_historical_cases(services_instance: Services) -> None:
     ```
     """
     try:
-        project_root = get_project_root()
-        profiles_path = project_root / "data" / "profiles.yaml"
-
-        import yaml
+        if services_instance.case_manager.get_all_cases():
+            logger.info("Cases were recovered from the event store, not seeding historical cases")
+            return
 
-        with open(profiles_path) as f:
-            raw_data = yaml.safe_load(f)
+        raw_data = get_profile_store().data
 
         case_seeds_config = raw_data.get("case_seeds", [])
         if not case_seeds_config:
@@ -122,16 +122,62 @@ class MachineService(EngineInterface):
         overwrite_input: dict[str, Any] | None = None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: bool = True,
     ) -> RuleResult:
         """
         Evaluate rules using HTTP calls to the Go backend service.
+        The backend always returns the evaluation path, so trace has no effect.
         """
 
         # Instantiate the API client with service-specific base URL
-        service_base_url = self._get_base_url_for_service(service)
+        client = Client(base_url=self._get_base_url_for_service(service))
+        body = self._evaluate_body(
+            service, law, parameters, reference_date, effective_date, overwrite_input, requested_output, approved
+        )
 
-        client = Client(base_url=service_base_url)
+        with client as client:
+            response = evaluate.sync_detailed(client=client, body=body)
 
+            return to_rule_result(response.parsed.data)
+
+    async def aevaluate(
+        self,
+        service: str,
+        law: str,
+        parameters: dict[str, Any],
+        reference_date: str | None = None,
+        effective_date: str | None = None,
+        overwrite_input: dict[str, Any] | None = None,
+        requested_output: str | None = None,
+        approved: bool = False,
+        trace: bool = True,
+    ) -> RuleResult:
+        """
+        Evaluate rules using async HTTP calls to the Go backend service.
+        The backend always returns the evaluation path, so trace has no effect.
+        """
+
+        client = Client(base_url=self._get_base_url_for_service(service))
+        body = self._evaluate_body(
+            service, law, parameters, reference_date, effective_date, overwrite_input, requested_output, approved
+        )
+
+        async with client as client:
+            response = await evaluate.asyncio_detailed(client=client, body=body)
+
+            return to_rule_result(response.parsed.data)
+
+    @staticmethod
+    def _evaluate_body(
+        service: str,
+        law: str,
+        parameters: dict[str, Any],
+        reference_date: str | None,
+        effective_date: str | None,
+        overwrite_input: dict[str, Any] | None,
+        requested_output: str | None,
+        approved: bool,
+    ) -> EvaluateBody:
         data = Evaluate(
             service=service, law=law, parameters=EvaluateParameters().from_dict(parameters), approved=approved
         )
@@ -148,12 +194,7 @@ class MachineService(EngineInterface):
         if requested_output:
             data.output = requested_output
 
-        body = EvaluateBody(data=data)
-
-        with client as client:
-            response = evaluate.sync_detailed(client=client, body=body)
-
-            return to_rule_result(response.parsed.data)
+        return EvaluateBody(data=data)
 
     def get_discoverable_service_laws(
         self, discoverable_by="CITIZEN", filter_disabled: bool = True
@@ -6,7 +6,7 @@ from typing import Any
 import pandas as pd
 from fastapi import HTTPException
 
-from machine.profile_loader import get_project_root, load_profiles_from_yaml
+from machine.profile_loader import get_profile_store
 from machine.service import Services
 
 from ..engine_interface import EngineInterface, PathNode, RuleResult
@@ -17,8 +17,12 @@ class PythonMachineService(EngineInterface):
     Implementation of EngineInterface using the embedded Python machine.service library.
     """
 
+    # The fields of a business profile
+    BUSINESS_FIELDS = ("kvk_nummer", "handelsnaam", "rechtsvorm", "activiteit", "status")
+
     def __init__(self, services: Services):
         self.services = services
+        self.profiles = get_profile_store()
 
     def get_services(self) -> Services:
         """
@@ -39,8 +43,7 @@ class PythonMachineService(EngineInterface):
         Returns:
             Dictionary containing profile data or None if not found
         """
-        profiles = self.get_all_profiles()
-        return profiles.get(bsn)
+        return self.profiles.get(bsn)
 
     def get_all_profiles(self, effective_date: date | None = None) -> dict[str, dict[str, Any]]:
         """
@@ -49,9 +52,7 @@ class PythonMachineService(EngineInterface):
         Returns:
             Dictionary mapping BSNs to profile data
         """
-        project_root = get_project_root()
-        profiles_path = project_root / "data" / "profiles.yaml"
-        return load_profiles_from_yaml(profiles_path)
+        return self.profiles.profiles
 
     def get_business_profile(self, kvk_nummer: str) -> dict[str, Any] | None:
         """
@@ -64,33 +65,27 @@ class PythonMachineService(EngineInterface):
             Dictionary containing business data (handelsnaam, rechtsvorm, activiteit, status)
             or None if not found
         """
-        # Get the KVK service
-        if "KVK" not in self.services.services:
-            return None
-
-        kvk_service = self.services.services["KVK"]
-
-        # Look up in the inschrijvingen table
-        if "inschrijvingen" not in kvk_service.source_dataframes:
-            return None
+        # The KVK registrations, which can be replaced at runtime, decide; the profiles only without them
+        kvk_service = self.services.services.get("KVK")
+        if kvk_service is None or "inschrijvingen" not in kvk_service.source_dataframes:
+            business = self.profiles.get_business(kvk_nummer)
+            if business is None:
+                return None
+            return {key: business.get(key) for key in self.BUSINESS_FIELDS}
 
         df = kvk_service.source_dataframes["inschrijvingen"]
 
-        # Find the business by KVK nummer
-        matches = df[df["kvk_nummer"] == kvk_nummer]
+        # Find the business by KVK nummer, through the index of the table when it has one on the column
+        index = kvk_service.source_indexes.get("inschrijvingen")
+        positions = index.select("kvk_nummer", kvk_nummer) if index is not None else None
+        matches = index.rows(positions) if positions is not None else df[df["kvk_nummer"] == kvk_nummer]
 
         if matches.empty:
             return None
 
         # Return the first match as a dictionary
         row = matches.iloc[0]
-        return {
-            "kvk_nummer": row.get("kvk_nummer"),
-            "handelsnaam": row.get("handelsnaam"),
-            "rechtsvorm": row.get("rechtsvorm"),
-            "activiteit": row.get("activiteit"),
-            "status": row.get("status"),
-        }
+        return {key: row.get(key) for key in self.BUSINESS_FIELDS}
 
     def evaluate(
         self,
@@ -102,6 +97,7 @@ class PythonMachineService(EngineInterface):
         overwrite_input: dict[str, Any] | None = None,
         requested_output: str | None = None,
         approved: bool = False,
+        trace: bool = True,
     ) -> RuleResult:
         """
         Evaluate rules using the embedded Python machine.service library.
@@ -120,6 +116,7 @@ class PythonMachineService(EngineInterface):
             overwrite_input=overwrite_input,
             requested_output=requested_output,
             approved=approved,
+            trace=trace,
         )
 
         # Convert RuleResult to dictionary
@@ -129,7 +126,7 @@ class PythonMachineService(EngineInterface):
             requirements_met=result.requirements_met,
             missing_required=result.missing_required,
             rulespec_uuid=result.rulespec_uuid,
-            path=to_path_node(result.path),
+            path=to_path_node(result.path) if result.path is not None else None,
         )
 
     def get_discoverable_service_laws(
@@ -185,6 +182,14 @@ class PythonMachineService(EngineInterface):
 
     def reset(self) -> None:
         # Restart the application. Note: the state of the application is stored in such a complicated way in memory that it is easier to just restart the application
+        # The cases and claims in an event store are removed first, otherwise the restarted application recovers them
+        for database in self.services.event_store_files:
+            for path in (
+                database,
+                database.with_name(f"{database.name}-wal"),
+                database.with_name(f"{database.name}-shm"),
+            ):
+                path.unlink(missing_ok=True)
         os.execl(sys.executable, sys.executable, *sys.argv)
 
 
@@ -105,7 +105,7 @@ async def handle_application_display(
 
         if service and law:
             # Get data for the application panel - explicitly use approved=False to include unapproved claims
-            law, result, parameters = evaluate_law(bsn, law, service, services, approved=False)
+            law, result, parameters = await evaluate_law(bsn, law, service, services, approved=False)
 
             # Get the rule spec separately
             rule_spec = services.get_rule_spec(law, TODAY, service)
@@ -218,7 +218,7 @@ async def handle_application_submission(
         law = law_path or service_obj.law_path
 
         # Get data needed for submission
-        law, result, parameters = evaluate_law(bsn, law, service_type, services, approved=False)
+        law, result, parameters = await evaluate_law(bsn, law, service_type, services, approved=False)
         rule_spec = services.get_rule_spec(law, TODAY, service_type)
 
         # Submit the case
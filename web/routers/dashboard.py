@@ -98,13 +98,14 @@ async def total_net_income(
 
         try:
             # Evaluate the law
-            result = machine_service.evaluate(
+            result = await machine_service.aevaluate(
                 service=service,
                 law=law,
                 parameters={"BSN": bsn},
                 reference_date=TODAY,
                 effective_date=date,  # Pass the date as effective_date
                 approved=False,  # Show current state including pending changes
+                trace=False,  # Only the output is shown
             )
 
             # Check if there's a condition field (e.g., is_gerechtigd for huurtoeslag)
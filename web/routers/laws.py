@@ -131,7 +131,7 @@ def get_tile_template(service: str, law: str) -> str:
         return "partials/tiles/fallback_tile.html"
 
 
-def evaluate_law(
+async def evaluate_law(
     bsn: str,
     law: str,
     service: str,
@@ -179,7 +179,7 @@ def evaluate_law(
                 overwrite_input = None
 
     # Execute the law using EngineInterface
-    result = machine_service.evaluate(
+    result = await machine_service.aevaluate(
         service=service,
         law=law,
         parameters=parameters,
@@ -241,7 +241,7 @@ async def execute_law(
 
     try:
         law = unquote(law)
-        law, result, parameters = evaluate_law(
+        law, result, parameters = await evaluate_law(
             bsn,
             law,
             service,
@@ -331,7 +331,7 @@ async def submit_case(
     if not kvk:
         kvk = request.query_params.get("kvk")
 
-    law, result, parameters = evaluate_law(
+    law, result, parameters = await evaluate_law(
         bsn,
         law,
         service,
@@ -368,7 +368,7 @@ async def submit_case(
     _process_side_effects(rule_spec, result, bsn, service, kvk, case_id, machine_service, claim_manager)
 
     # Re-evaluate the law AFTER the case is submitted so counts include the new case
-    _, result, _ = evaluate_law(
+    _, result, _ = await evaluate_law(
         bsn,
         law,
         service,
@@ -439,7 +439,7 @@ async def objection_case(
         reason=reason,
     )
 
-    law, result, parameters = evaluate_law(
+    law, result, parameters = await evaluate_law(
         bsn,
         law,
         service,
@@ -500,7 +500,7 @@ async def explanation(
     try:
         print(f"Explanation requested for {service}, {law}, with provider: {provider}")
         law = unquote(law)
-        law, result, parameters = evaluate_law(
+        law, result, parameters = await evaluate_law(
             bsn,
             law,
             service,
@@ -611,7 +611,7 @@ async def application_panel(
     """Get the application panel with tabs"""
     try:
         law = unquote(law)
-        law, result, parameters = evaluate_law(
+        law, result, parameters = await evaluate_law(
             bsn,
             law,
             service,
@@ -706,7 +706,7 @@ async def update_profile_table(
     parameters = {"BSN": bsn}
     if kvk:
         parameters["KVK_NUMMER"] = kvk
-    result = machine_service.evaluate(
+    result = await machine_service.aevaluate(
         service=service,
         law=law,
         parameters=parameters,
@@ -541,7 +541,7 @@ async def call_tool(machine_service, params: dict[str, Any]):
 
             # Use machine service to execute law
             try:
-                result = machine_service.evaluate(
+                result = await machine_service.aevaluate(
                     service=arguments["service"],
                     law=arguments["law"],
                     parameters=arguments["parameters"],
@@ -612,7 +612,7 @@ async def call_tool(machine_service, params: dict[str, Any]):
 
         elif tool_name == "check_eligibility":
             # Check eligibility using machine service
-            result = machine_service.evaluate(
+            result = await machine_service.aevaluate(
                 service=arguments["service"],
                 law=arguments["law"],
                 parameters=arguments["parameters"],
@@ -650,7 +650,7 @@ async def call_tool(machine_service, params: dict[str, Any]):
 
         elif tool_name == "calculate_benefit_amount":
             # Calculate benefit amount using machine service
-            result = machine_service.evaluate(
+            result = await machine_service.aevaluate(
                 service=arguments["service"],
                 law=arguments["law"],
                 parameters=arguments["parameters"],
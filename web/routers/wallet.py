@@ -208,7 +208,7 @@ async def get_attributes(
                 claim_manager.approve_claim(id, attestation.issuer_uri, None)
 
         # Evaluate the law with the wallet attributes as overrides
-        law, result, parameters = evaluate_law(
+        law, result, parameters = await evaluate_law(
             bsn=bsn,
             law=law,
             service=service,